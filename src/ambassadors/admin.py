@@ -1,6 +1,14 @@
 from django.contrib import admin
 
-from .models import Activity, Address, Ambassador, Program, Purpose, Status
+from .models import (
+    Activity,
+    Address,
+    Ambassador,
+    AmbassadorStats,
+    Program,
+    Purpose,
+    Status,
+)
 
 
 @admin.register(Ambassador)
@@ -57,3 +65,30 @@ class ActivityAdmin(admin.ModelAdmin):
 
     list_display = ("pk", "name", "slug")
     list_display_links = ("name",)
+
+
+@admin.register(AmbassadorStats)
+class AmbassadorStatsAdmin(admin.ModelAdmin):
+    """Displays stats of ambassadors in admin panel (read only)."""
+
+    list_display = (
+        "ambassador",
+        "review_count",
+        "content_count",
+        "last_content_date",
+        "active_promocode_count",
+        "merch_application_count",
+        "merch_spend",
+        "guide_status",
+    )
+    list_filter = ("guide_status",)
+    search_fields = ("ambassador__name",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("ambassador")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
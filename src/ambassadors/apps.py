@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AmbassadorsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "ambassadors"
+
+    def ready(self):
+        from .signals import connect_stats_signals
+
+        connect_stats_signals()
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from ambassadors.models import AmbassadorStats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalculates stats of ambassadors (numbers of reviews, content, "
+        "promocodes, merch applications, merch expenses and the guide status) "
+        "from the source tables (ambassadors are processed by chunks)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="number of ambassadors processed in one transaction",
+        )
+
+    def handle(self, *args, **options):
+        processed = AmbassadorStats.objects.rebuild(chunk_size=options["chunk_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Stats rebuilt for {processed} ambassadors")
+        )
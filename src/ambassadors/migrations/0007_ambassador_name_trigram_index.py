@@ -0,0 +1,25 @@
+# Generated by Django 5.0.2 on 2026-10-18 14:30
+
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+import core.indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ambassadors", "0006_remove_ambassador_purpose_and_more"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="ambassador",
+            index=core.indexes.TrigramIndex(
+                django.db.models.functions.text.Upper("name"),
+                name="ambassador_name_trgm",
+            ),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.0.2 on 2026-10-18 15:00
+
+from django.db import migrations, models
+
+import core.indexes
+
+CHUNK_SIZE = 1000
+
+
+def fill_search_documents(apps, schema_editor):
+    Ambassador = apps.get_model("ambassadors", "Ambassador")
+    ambassadors = []
+    for ambassador in Ambassador.objects.select_related("address").iterator(
+        chunk_size=CHUNK_SIZE
+    ):
+        ambassador.search_document = "\n".join(
+            str(value or "")
+            for value in (
+                ambassador.name,
+                ambassador.email,
+                ambassador.telegram_id,
+                ambassador.phone_number,
+                ambassador.job,
+                ambassador.education,
+                ambassador.address.city,
+            )
+        ).lower()
+        ambassadors.append(ambassador)
+        if len(ambassadors) == CHUNK_SIZE:
+            Ambassador.objects.bulk_update(ambassadors, ["search_document"])
+            ambassadors = []
+    Ambassador.objects.bulk_update(ambassadors, ["search_document"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ambassadors", "0007_ambassador_name_trigram_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ambassador",
+            name="search_document",
+            field=models.TextField(
+                blank=True,
+                editable=False,
+                help_text="Заполняется автоматически при сохранении",
+                verbose_name="Поисковый документ",
+            ),
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="ambassador",
+            index=core.indexes.TrigramIndex(
+                models.F("search_document"), name="ambassador_search_trgm"
+            ),
+        ),
+    ]
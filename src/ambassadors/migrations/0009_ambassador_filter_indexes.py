@@ -0,0 +1,51 @@
+# Generated by Django 5.0.2 on 2026-10-18 15:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ambassadors", "0008_ambassador_search_document"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="address",
+            index=models.Index(
+                fields=["country", "city"], name="address_country_city_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="address",
+            index=models.Index(fields=["city"], name="address_city_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="ambassador",
+            index=models.Index(
+                fields=["status", "created"], name="ambassador_status_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ambassador",
+            index=models.Index(
+                fields=["program", "created"], name="ambassador_program_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ambassador",
+            index=models.Index(
+                fields=["purpose", "created"], name="ambassador_purpose_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ambassador",
+            index=models.Index(
+                fields=["tutor", "created"], name="ambassador_tutor_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ambassador",
+            index=models.Index(fields=["created"], name="ambassador_created_idx"),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:00
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_emails(apps, schema_editor):
+    """
+    Stops the migration if several ambassadors have the same email: they
+    can't be merged automatically (each may have content, promocodes and
+    merch), so they are listed to be fixed by hand.
+    """
+    Ambassador = apps.get_model("ambassadors", "Ambassador")
+    duplicates = (
+        Ambassador.objects.values("email")
+        .annotate(count=Count("pk"))
+        .filter(count__gt=1)
+        .values_list("email", flat=True)
+    )
+    ids = {}
+    for pk, email in (
+        Ambassador.objects.filter(email__in=duplicates)
+        .order_by("email", "pk")
+        .values_list("pk", "email")
+    ):
+        ids.setdefault(email, []).append(str(pk))
+    if ids:
+        report = "\n".join(
+            f"  {email}: ambassadors {', '.join(pks)}" for email, pks in ids.items()
+        )
+        raise RuntimeError(
+            "Emails of ambassadors must be unique. Change or merge the "
+            f"ambassadors with repeated emails and run the migration again:\n{report}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ambassadors", "0009_ambassador_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="ambassador",
+            name="email",
+            field=models.EmailField(max_length=30, unique=True, verbose_name="Email"),
+        ),
+    ]
@@ -0,0 +1,139 @@
+# Generated by Django 5.0.2 on 2026-10-18 18:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+CHUNK_SIZE = 1000
+
+
+def aggregate(queryset, expression, default=None):
+    subquery = Subquery(
+        queryset.order_by()
+        .values("ambassador")
+        .annotate(value=expression)
+        .values("value")
+    )
+    return subquery if default is None else Coalesce(subquery, default)
+
+
+def fill_ambassador_stats(apps, schema_editor):
+    Ambassador = apps.get_model("ambassadors", "Ambassador")
+    AmbassadorStats = apps.get_model("ambassadors", "AmbassadorStats")
+    ambassador = OuterRef("ambassador")
+    content = apps.get_model("content", "Content").objects.filter(ambassador=ambassador)
+    applications = apps.get_model("promo", "MerchApplication").objects.filter(
+        ambassador=ambassador
+    )
+    AmbassadorStats.objects.bulk_create(
+        (
+            AmbassadorStats(ambassador_id=pk)
+            for pk in Ambassador.objects.values_list("pk", flat=True).iterator()
+        ),
+        batch_size=CHUNK_SIZE,
+    )
+    AmbassadorStats.objects.update(
+        review_count=aggregate(content.filter(type="review"), Count("pk"), 0),
+        content_count=aggregate(content.filter(type="content"), Count("pk"), 0),
+        last_content_date=aggregate(content, Max("created")),
+        active_promocode_count=aggregate(
+            apps.get_model("promo", "Promocode").objects.filter(
+                ambassador=ambassador, is_active=True
+            ),
+            Count("pk"),
+            0,
+        ),
+        merch_application_count=aggregate(applications, Count("pk"), 0),
+        merch_spend=aggregate(applications, Sum("total_cost"), 0.0),
+        guide_status=Coalesce(
+            Subquery(
+                apps.get_model("content", "Guide")
+                .objects.filter(ambassador=ambassador)
+                .order_by("-pk")
+                .values("status")[:1]
+            ),
+            Value(""),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ambassadors", "0010_ambassador_email_unique"),
+        ("content", "0012_content_ambassador_type_created_idx"),
+        ("promo", "0007_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AmbassadorStats",
+            fields=[
+                (
+                    "ambassador",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="ambassadors.ambassador",
+                        verbose_name="Амбассадор",
+                    ),
+                ),
+                (
+                    "review_count",
+                    models.PositiveIntegerField(
+                        db_index=True, default=0, verbose_name="Отзывов"
+                    ),
+                ),
+                (
+                    "content_count",
+                    models.PositiveIntegerField(
+                        db_index=True, default=0, verbose_name="Контента"
+                    ),
+                ),
+                (
+                    "last_content_date",
+                    models.DateTimeField(
+                        blank=True,
+                        db_index=True,
+                        null=True,
+                        verbose_name="Дата последнего контента",
+                    ),
+                ),
+                (
+                    "active_promocode_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Активных промокодов"
+                    ),
+                ),
+                (
+                    "merch_application_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Заявок на мерч"
+                    ),
+                ),
+                (
+                    "merch_spend",
+                    models.FloatField(
+                        db_index=True, default=0, verbose_name="Расходы на мерч"
+                    ),
+                ),
+                (
+                    "guide_status",
+                    models.CharField(
+                        blank=True,
+                        db_index=True,
+                        max_length=50,
+                        verbose_name="Статус гайда",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Статистика амбассадора",
+                "verbose_name_plural": "Статистика амбассадоров",
+            },
+        ),
+        migrations.RunPython(fill_ambassador_stats, migrations.RunPython.noop),
+    ]
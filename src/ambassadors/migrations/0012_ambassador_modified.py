@@ -0,0 +1,25 @@
+# Generated by Django 5.0.2 on 2026-10-18 21:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ambassadors", "0011_ambassadorstats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ambassador",
+            name="modified",
+            field=models.DateTimeField(
+                auto_now=True,
+                db_index=True,
+                default=django.utils.timezone.now,
+                verbose_name="Дата изменения",
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -1,9 +1,32 @@
-from django.db import models
+from django.apps import apps
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Max, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Upper
 from django.utils.text import slugify
 
+from core.indexes import TrigramIndex
 from users.models import User
 
 
+class CommonManager(models.Manager):
+    def get_or_create_many(self, names) -> dict:
+        """
+        Returns {name: object} for the names. Existing objects are read
+        with one query, the missing ones are created with one bulk insert
+        (slugs are made the same way as in save()).
+        """
+        names = set(names)
+        found = {obj.name: obj for obj in self.filter(name__in=names)}
+        missing = names - found.keys()
+        if missing:
+            created = self.bulk_create(
+                self.model(name=name, slug=slugify(name, allow_unicode=True))
+                for name in missing
+            )
+            found.update((obj.name, obj) for obj in created)
+        return found
+
+
 class CommonAbstractModel(models.Model):
     """Describes common abstract models for Purpose, Program, Status, Activity"""
 
@@ -12,6 +35,8 @@ class CommonAbstractModel(models.Model):
 
     slug = models.SlugField(max_length=75, unique=True, verbose_name="Slug")
 
+    objects = CommonManager()
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name, allow_unicode=True)
@@ -81,11 +106,20 @@ class Address(models.Model):
     class Meta:
         verbose_name = "Адрес"
         verbose_name_plural = "Адреса"
+        indexes = [
+            models.Index(fields=["country", "city"], name="address_country_city_idx"),
+            models.Index(fields=["city"], name="address_city_idx"),
+        ]
 
     def __str__(self):
         return f"{self.postal_code} {self.country} {self.city} {self.street}"
 
 
+def build_search_document(*values) -> str:
+    """Joins the values into a lowercased search document."""
+    return "\n".join(str(value or "") for value in values).lower()
+
+
 class Ambassador(models.Model):
     """Describes Ambassador entity"""
 
@@ -103,6 +137,9 @@ class Ambassador(models.Model):
     )
 
     created = models.DateTimeField(auto_now_add=True, verbose_name="Дата регистрации")
+    modified = models.DateTimeField(
+        auto_now=True, db_index=True, verbose_name="Дата изменения"
+    )
     name = models.CharField(max_length=50, verbose_name="ФИО")
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES, verbose_name="Пол")
     clothing_size = models.CharField(
@@ -111,7 +148,7 @@ class Ambassador(models.Model):
     shoe_size = models.CharField(max_length=4, verbose_name="Размер обуви")
     education = models.CharField(max_length=120, verbose_name="Образование")
     job = models.CharField(max_length=120, verbose_name="Место работы")
-    email = models.EmailField(max_length=30, verbose_name="Email")
+    email = models.EmailField(max_length=30, unique=True, verbose_name="Email")
     address = models.ForeignKey(
         Address,
         on_delete=models.PROTECT,
@@ -174,14 +211,106 @@ class Ambassador(models.Model):
 
     about_me = models.TextField(null=True, blank=True, verbose_name="О себе")
     comment = models.TextField(null=True, blank=True, verbose_name="Комментарий")
+    search_document = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name="Поисковый документ",
+        help_text="Заполняется автоматически при сохранении",
+    )
 
     class Meta:
         verbose_name = "Амбассадор"
         verbose_name_plural = "Амбассадоры"
+        indexes = [
+            # Trigram indexes for the search by substrings.
+            TrigramIndex(Upper("name"), name="ambassador_name_trgm"),
+            TrigramIndex("search_document", name="ambassador_search_trgm"),
+            # Composite indexes for the list filters (sorted by "created").
+            models.Index(
+                fields=["status", "created"], name="ambassador_status_created_idx"
+            ),
+            models.Index(
+                fields=["program", "created"], name="ambassador_program_created_idx"
+            ),
+            models.Index(
+                fields=["purpose", "created"], name="ambassador_purpose_created_idx"
+            ),
+            models.Index(
+                fields=["tutor", "created"], name="ambassador_tutor_created_idx"
+            ),
+            models.Index(fields=["created"], name="ambassador_created_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """Keeps the search document and the modification time up to date."""
+        self.search_document = self.build_search_document()
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {
+                *kwargs["update_fields"],
+                "search_document",
+                "modified",
+            }
+        super().save(*args, **kwargs)
+
+    def set_activities(self, activities):
+        """
+        Replaces activities of the ambassador: links to the removed activities
+        are deleted with one query, links to the new ones are created with one
+        bulk insert, the kept links are not touched.
+        """
+        AmbassadorActivity.objects.replace(
+            {self.pk: {activity.pk for activity in activities}}
+        )
+
+    def build_search_document(self) -> str:
+        """
+        Returns the lowercased text the ambassador is searched by: name, email,
+        telegram, phone number, job, education and city (one per line, the name
+        goes first).
+        """
+        return build_search_document(
+            self.name,
+            self.email,
+            self.telegram_id,
+            self.phone_number,
+            self.job,
+            self.education,
+            self.address.city if self.address_id else "",
+        )
+
+
+class AmbassadorActivityManager(models.Manager):
+    def replace(self, activity_ids: dict):
+        """
+        Replaces activities of the ambassadors ({ambassador_id: activity ids}):
+        links to the removed activities are deleted with one query, links to
+        the new ones are created with one bulk insert, the kept links are not
+        touched.
+        """
+        current = {
+            (ambassador_id, activity_id): pk
+            for pk, ambassador_id, activity_id in self.filter(
+                ambassador_id__in=activity_ids
+            ).values_list("pk", "ambassador_id", "activity_id")
+        }
+        new = {
+            (ambassador_id, activity_id)
+            for ambassador_id, ids in activity_ids.items()
+            for activity_id in ids
+        }
+        removed = [pk for link, pk in current.items() if link not in new]
+        if removed:
+            self.filter(pk__in=removed).delete()
+        added = new - current.keys()
+        if added:
+            self.bulk_create(
+                self.model(ambassador_id=ambassador_id, activity_id=activity_id)
+                for ambassador_id, activity_id in added
+            )
+
 
 class AmbassadorActivity(models.Model):
     """Describe Ambassador and Activity relations"""
@@ -194,3 +323,204 @@ class AmbassadorActivity(models.Model):
         Activity,
         on_delete=models.CASCADE,
     )
+
+    objects = AmbassadorActivityManager()
+
+
+CONTENT_STATS_FIELDS = ("review_count", "content_count", "last_content_date")
+PROMOCODE_STATS_FIELDS = ("active_promocode_count",)
+MERCH_STATS_FIELDS = ("merch_application_count", "merch_spend")
+GUIDE_STATS_FIELDS = ("guide_status",)
+STATS_FIELDS = (
+    *CONTENT_STATS_FIELDS,
+    *PROMOCODE_STATS_FIELDS,
+    *MERCH_STATS_FIELDS,
+    *GUIDE_STATS_FIELDS,
+)
+
+
+def aggregate_by_ambassador(queryset, aggregate, default=None):
+    """
+    Returns a subquery of the aggregate over the rows of the queryset which
+    belong to the outer ambassador (the queryset is filtered by it).
+    """
+    subquery = Subquery(
+        queryset.order_by()
+        .values("ambassador")
+        .annotate(value=aggregate)
+        .values("value")
+    )
+    if default is None:
+        return subquery
+    return Coalesce(subquery, default)
+
+
+class AmbassadorStatsManager(models.Manager):
+    """
+    Keeps the stats of ambassadors in sync with their content, promocodes,
+    merch applications and guides.
+
+    Rows are created together with ambassadors. New content and promocodes
+    increment the counters with F expressions, changed and deleted ones make
+    the affected fields recalculated (see ambassadors.signals). Merch numbers
+    are updated by MerchSpendMonthlyManager together with the monthly
+    expenses. The table can be recalculated with the rebuild_ambassador_stats
+    management command.
+    """
+
+    def add(self, ambassador_id, latest: dict | None = None, **deltas):
+        """
+        Adds the deltas (can be negative) to the counters of the ambassador
+        and moves the dates of latest ({field: date}) forward with one UPDATE.
+        """
+        values = {field: F(field) + delta for field, delta in deltas.items() if delta}
+        for field, date in (latest or {}).items():
+            values[field] = Case(
+                When(**{f"{field}__gte": date}, then=F(field)), default=Value(date)
+            )
+        if values:
+            self.filter(ambassador_id=ambassador_id).update(**values)
+
+    def add_many(self, deltas: dict):
+        """
+        Adds the deltas to the counters of several ambassadors with one UPDATE.
+        Takes {ambassador_id: {field: delta}} dict.
+        """
+        fields = {
+            field for item in deltas.values() for field, delta in item.items() if delta
+        }
+        if not fields:
+            return
+        self.filter(ambassador_id__in=deltas).update(
+            **{
+                field: F(field)
+                + Case(
+                    *(
+                        When(ambassador_id=ambassador_id, then=Value(item[field]))
+                        for ambassador_id, item in deltas.items()
+                        if item.get(field)
+                    ),
+                    default=Value(0),
+                    output_field=self.model._meta.get_field(field),
+                )
+                for field in fields
+            }
+        )
+
+    def get_expressions(self, fields=STATS_FIELDS) -> dict:
+        """Returns {field: expression calculating it for OuterRef("ambassador")}."""
+        ambassador = OuterRef("ambassador")
+        content = apps.get_model("content", "Content").objects.filter(
+            ambassador=ambassador
+        )
+        promocodes = apps.get_model("promo", "Promocode").objects.filter(
+            ambassador=ambassador, is_active=True
+        )
+        applications = apps.get_model("promo", "MerchApplication").objects.filter(
+            ambassador=ambassador
+        )
+        guides = apps.get_model("content", "Guide").objects.filter(
+            ambassador=ambassador
+        )
+        expressions = {
+            "review_count": aggregate_by_ambassador(
+                content.filter(type="review"), Count("pk"), 0
+            ),
+            "content_count": aggregate_by_ambassador(
+                content.filter(type="content"), Count("pk"), 0
+            ),
+            "last_content_date": aggregate_by_ambassador(content, Max("created")),
+            "active_promocode_count": aggregate_by_ambassador(
+                promocodes, Count("pk"), 0
+            ),
+            "merch_application_count": aggregate_by_ambassador(
+                applications, Count("pk"), 0
+            ),
+            "merch_spend": aggregate_by_ambassador(
+                applications, Sum("total_cost"), 0.0
+            ),
+            "guide_status": Coalesce(
+                Subquery(guides.order_by("-pk").values("status")[:1]), Value("")
+            ),
+        }
+        return {field: expressions[field] for field in fields}
+
+    def refresh(self, ambassador_ids, fields=STATS_FIELDS) -> int:
+        """
+        Recalculates the fields of the existing stats of the ambassadors from
+        the source tables with one UPDATE. Returns the number of updated rows.
+        """
+        return self.filter(ambassador_id__in=ambassador_ids).update(
+            **self.get_expressions(fields)
+        )
+
+    def create_missing(self, ambassador_ids):
+        """Creates empty stats of the ambassadors which have none."""
+        self.bulk_create(
+            (self.model(ambassador_id=pk) for pk in ambassador_ids),
+            ignore_conflicts=True,
+        )
+
+    def rebuild(self, chunk_size=500) -> int:
+        """
+        Recalculates the stats of all the ambassadors by chunks, one
+        transaction per chunk. Returns the number of processed ambassadors.
+        """
+        last_id = 0
+        processed = 0
+        while chunk := list(
+            Ambassador.objects.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:chunk_size]
+        ):
+            with transaction.atomic():
+                self.create_missing(chunk)
+                self.refresh(chunk)
+            processed += len(chunk)
+            last_id = chunk[-1]
+        return processed
+
+
+class AmbassadorStats(models.Model):
+    """
+    Describes precalculated activity numbers of an ambassador for sorting
+    and filtering lists. Maintained by AmbassadorStatsManager.
+    """
+
+    ambassador = models.OneToOneField(
+        Ambassador,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+        verbose_name="Амбассадор",
+    )
+    review_count = models.PositiveIntegerField(
+        default=0, db_index=True, verbose_name="Отзывов"
+    )
+    content_count = models.PositiveIntegerField(
+        default=0, db_index=True, verbose_name="Контента"
+    )
+    last_content_date = models.DateTimeField(
+        null=True, blank=True, db_index=True, verbose_name="Дата последнего контента"
+    )
+    active_promocode_count = models.PositiveIntegerField(
+        default=0, verbose_name="Активных промокодов"
+    )
+    merch_application_count = models.PositiveIntegerField(
+        default=0, verbose_name="Заявок на мерч"
+    )
+    merch_spend = models.FloatField(
+        default=0, db_index=True, verbose_name="Расходы на мерч"
+    )
+    guide_status = models.CharField(
+        max_length=50, blank=True, db_index=True, verbose_name="Статус гайда"
+    )
+
+    objects = AmbassadorStatsManager()
+
+    class Meta:
+        verbose_name = "Статистика амбассадора"
+        verbose_name_plural = "Статистика амбассадоров"
+
+    def __str__(self):
+        return f"Статистика {self.ambassador}"
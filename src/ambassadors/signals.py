@@ -0,0 +1,112 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .models import (
+    CONTENT_STATS_FIELDS,
+    GUIDE_STATS_FIELDS,
+    PROMOCODE_STATS_FIELDS,
+    Ambassador,
+    AmbassadorStats,
+)
+from content.models import Content, Guide
+from promo.models import Promocode
+
+# Content type: counter of the ambassador stats
+CONTENT_COUNTERS = {"review": "review_count", "content": "content_count"}
+
+
+def create_ambassador_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AmbassadorStats.objects.create(ambassador=instance)
+
+
+def remember_ambassador(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Remembers the ambassador of an updated object, it can be changed. New
+    objects and updates of other fields don't need a query.
+    """
+    instance._stats_ambassador_id = None
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and "ambassador" not in update_fields:
+        return
+    instance._stats_ambassador_id = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list("ambassador_id", flat=True)
+        .first()
+    )
+
+
+def get_affected_ambassadors(instance) -> set:
+    return {getattr(instance, "_stats_ambassador_id", None), instance.ambassador_id}
+
+
+def content_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if not created:
+        AmbassadorStats.objects.refresh(
+            get_affected_ambassadors(instance), CONTENT_STATS_FIELDS
+        )
+        return
+    counter = CONTENT_COUNTERS.get(instance.type)
+    AmbassadorStats.objects.add(
+        instance.ambassador_id,
+        latest={"last_content_date": instance.created},
+        **({counter: 1} if counter else {}),
+    )
+
+
+def content_deleted(sender, instance, **kwargs):
+    # The deleted content could be the latest one.
+    AmbassadorStats.objects.refresh([instance.ambassador_id], CONTENT_STATS_FIELDS)
+
+
+def promocode_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        AmbassadorStats.objects.add(
+            instance.ambassador_id, active_promocode_count=int(instance.is_active)
+        )
+    else:
+        AmbassadorStats.objects.refresh(
+            get_affected_ambassadors(instance), PROMOCODE_STATS_FIELDS
+        )
+
+
+def promocode_deleted(sender, instance, **kwargs):
+    if instance.is_active:
+        AmbassadorStats.objects.add(instance.ambassador_id, active_promocode_count=-1)
+
+
+def guide_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        AmbassadorStats.objects.refresh(
+            get_affected_ambassadors(instance), GUIDE_STATS_FIELDS
+        )
+
+
+def connect_stats_signals():
+    """
+    Connects the handlers keeping AmbassadorStats up to date. Changes made by
+    QuerySet.update() and bulk_create() send no signals, the stats of such
+    objects have to be refreshed explicitly.
+    """
+    receivers = [
+        (post_save, Ambassador, create_ambassador_stats),
+        (post_save, Content, content_saved),
+        (post_delete, Content, content_deleted),
+        (post_save, Promocode, promocode_saved),
+        (post_delete, Promocode, promocode_deleted),
+        (post_save, Guide, guide_changed),
+        (post_delete, Guide, guide_changed),
+    ]
+    receivers += [
+        (pre_save, model, remember_ambassador) for model in (Content, Promocode, Guide)
+    ]
+    for signal, model, receiver in receivers:
+        signal.connect(
+            receiver,
+            sender=model,
+            dispatch_uid=f"ambassador_stats_{receiver.__name__}_{model.__name__}",
+        )
@@ -1,3 +1,32 @@
-# from django.contrib import admin
+from django.contrib import admin
 
-# Register your models here.
+from .models import ExportJob, SheetSync
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    """Displays exports to Google Sheets in admin panel (read only)."""
+
+    list_display = ["pk", "kind", "status", "processed", "total", "created"]
+    list_display_links = ["kind"]
+    list_filter = ["kind", "status"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SheetSync)
+class SheetSyncAdmin(admin.ModelAdmin):
+    """Displays persistent synced spreadsheets in admin panel (read only)."""
+
+    list_display = ["pk", "kind", "spreadsheet_id", "next_row", "synced"]
+    list_display_links = ["kind"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -1,10 +1,11 @@
 from rest_framework import serializers
 
+from .dictionaries import dictionaries
 from ambassadors.models import (
     Activity,
     Address,
     Ambassador,
-    AmbassadorActivity,
+    AmbassadorStats,
     Program,
     Purpose,
     Status,
@@ -12,6 +13,29 @@ from ambassadors.models import (
 )
 
 
+class DictionaryRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key related field resolving dictionary objects from memory."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, (int, str)) and not isinstance(data, bool):
+            try:
+                instance = dictionaries.get(self.get_queryset().model, id=int(data))
+            except ValueError:
+                instance = None
+            if instance is not None:
+                return instance
+        return super().to_internal_value(data)
+
+
+def get_activities(items: list[dict]) -> list[Activity]:
+    """
+    Returns activities by the names of the items. They are resolved from the
+    dictionaries cache, the missing ones are read or created with one query each.
+    """
+    names = [item["name"] for item in items]
+    return list(dictionaries.get_or_create_many(Activity, names).values())
+
+
 class AddressSerializer(serializers.ModelSerializer):
     """Serializer for Address model."""
 
@@ -51,9 +75,7 @@ class ProgramSerializer(serializers.ModelSerializer):
 class ProgramUpdateSerializer(serializers.ModelSerializer):
     """Serializer for update Program model"""
 
-    id = serializers.PrimaryKeyRelatedField(
-        source="program", queryset=Program.objects.all()
-    )
+    id = DictionaryRelatedField(source="program", queryset=Program.objects.all())
 
     class Meta:
         model = Program
@@ -77,9 +99,7 @@ class PurposeSerializer(serializers.ModelSerializer):
 class PurposeUpdateSerializer(serializers.ModelSerializer):
     """Serializer for update Status model"""
 
-    id = serializers.PrimaryKeyRelatedField(
-        source="purpose", queryset=Purpose.objects.all()
-    )
+    id = DictionaryRelatedField(source="purpose", queryset=Purpose.objects.all())
 
     class Meta:
         model = Program
@@ -103,9 +123,7 @@ class StatusSerializer(serializers.ModelSerializer):
 class StatusUpdateSerializer(serializers.ModelSerializer):
     """Serializer for update Status model"""
 
-    id = serializers.PrimaryKeyRelatedField(
-        source="status", queryset=Status.objects.all()
-    )
+    id = DictionaryRelatedField(source="status", queryset=Status.objects.all())
 
     class Meta:
         model = Program
@@ -126,6 +144,22 @@ class TutorSerializer(serializers.ModelSerializer):
         )
 
 
+class AmbassadorStatsSerializer(serializers.ModelSerializer):
+    """Serializer for AmbassadorStats model"""
+
+    class Meta:
+        model = AmbassadorStats
+        fields = (
+            "review_count",
+            "content_count",
+            "last_content_date",
+            "active_promocode_count",
+            "merch_application_count",
+            "merch_spend",
+            "guide_status",
+        )
+
+
 class AmbassadorReadSerializer(serializers.ModelSerializer):
     """Serializer for reading Ambassador model"""
 
@@ -135,6 +169,7 @@ class AmbassadorReadSerializer(serializers.ModelSerializer):
     program = ProgramSerializer(read_only=True)
     tutor = TutorSerializer(read_only=True)
     status = StatusSerializer(read_only=True)
+    stats = AmbassadorStatsSerializer(read_only=True)
 
     class Meta:
         model = Ambassador
@@ -162,13 +197,14 @@ class AmbassadorReadSerializer(serializers.ModelSerializer):
             "program",
             "address",
             "promocodes",
+            "stats",
         )
 
     @classmethod
     def setup_eager_loading(cls, queryset):
         """Performs necessary eager loading of ambassadors data."""
         return queryset.select_related(
-            "tutor", "address", "status", "program", "purpose"
+            "tutor", "address", "status", "program", "purpose", "stats"
         ).prefetch_related("activity", "promocodes")
 
 
@@ -208,18 +244,15 @@ class AmbassadorCreateSerializer(serializers.ModelSerializer):
         purpose_data = validated_data.pop("purpose")
         activities = validated_data.pop("activity")
         address = Address.objects.create(**validated_data.pop("address"))
-        ambassador_program = Program.objects.get_or_create(**program_data)[0]
-        ambassador_purpose = Purpose.objects.get_or_create(**purpose_data)[0]
-        validated_data["program"] = ambassador_program
-        validated_data["purpose"] = ambassador_purpose
-        status = Status.objects.get(slug="active")
+        validated_data["program"] = dictionaries.get_or_create(Program, **program_data)
+        validated_data["purpose"] = dictionaries.get_or_create(Purpose, **purpose_data)
+        status = dictionaries.get(Status, slug="active") or Status.objects.get(
+            slug="active"
+        )
         ambassador = Ambassador.objects.create(
             **validated_data, address=address, status=status
         )
-
-        for activity in activities:
-            activity = Activity.objects.get_or_create(**activity)[0]
-            AmbassadorActivity(ambassador=ambassador, activity=activity).save()
+        ambassador.set_activities(get_activities(activities))
         return ambassador
 
     def to_representation(self, instance):
@@ -227,6 +260,7 @@ class AmbassadorCreateSerializer(serializers.ModelSerializer):
 
 
 class AmbassadorUpdateSerializer(serializers.ModelSerializer):
+    activity = ActivitySerializer(many=True, required=False)
     address = AddressSerializer()
     program = ProgramUpdateSerializer()
     status = StatusUpdateSerializer()
@@ -280,8 +314,9 @@ class AmbassadorUpdateSerializer(serializers.ModelSerializer):
 
         if "program" in validated_data:
             program_query = validated_data.pop("program")
-            program, status = Program.objects.get_or_create(name=program_query["name"])
-            instance.program = program
+            instance.program = dictionaries.get_or_create(
+                Program, name=program_query["name"]
+            )
 
         if "address" in validated_data:
             address = validated_data.pop("address")
@@ -298,13 +333,28 @@ class AmbassadorUpdateSerializer(serializers.ModelSerializer):
             instance.status = validated_data.pop("status")["status"]
 
         if "activity" in validated_data:
-            AmbassadorActivity.objects.filter(ambassador=instance).all().delete()
-            for activity in validated_data["activity"]:
-                activity, status = Activity.objects.get_or_create(name=activity["name"])
-                AmbassadorActivity(ambassador=instance, activity=activity).save()
+            instance.set_activities(get_activities(validated_data.pop("activity")))
 
         instance.save()
         return instance
 
     def to_representation(self, instance):
         return AmbassadorReadSerializer(instance, context=self.context).data
+
+
+class AmbassadorImportErrorSerializer(serializers.Serializer):
+    """Serializer to display errors of a rejected row of an import file."""
+
+    row = serializers.IntegerField()
+    errors = serializers.DictField(
+        child=serializers.ListField(child=serializers.CharField())
+    )
+
+
+class AmbassadorImportReportSerializer(serializers.Serializer):
+    """Serializer to display results of an ambassador import."""
+
+    total = serializers.IntegerField()
+    created = serializers.IntegerField()
+    updated = serializers.IntegerField()
+    errors = AmbassadorImportErrorSerializer(many=True)
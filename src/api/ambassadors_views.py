@@ -1,49 +1,128 @@
+from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters
+from drf_standardized_errors.openapi_serializers import (
+    ErrorResponse401Serializer,
+    ValidationErrorResponseSerializer,
+)
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import response
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.viewsets import ModelViewSet
 
+from .exports import (
+    AMBASSADOR_EXPORT_COLUMNS,
+    AMBASSADOR_FILE_FORMATS,
+    export_ambassadors_response,
+    get_export_columns,
+    get_file_format,
+)
+from .filters import AmbassadorFilter, SearchDocumentFilter, SearchRankOrderingFilter
+from .imports import IMPORT_FORMATS, get_import_format, import_ambassadors, read_records
 from .mixins import DestroyWithPayloadMixin
 from ambassadors.models import Ambassador
 from api.ambassadors_serializers import (
     AmbassadorCreateSerializer,
+    AmbassadorImportReportSerializer,
     AmbassadorReadSerializer,
     AmbassadorUpdateSerializer,
 )
 
+import_file = openapi.Parameter(
+    "file",
+    openapi.IN_FORM,
+    description="CSV, JSON (array of objects) or NDJSON file with ambassadors",
+    type=openapi.TYPE_FILE,
+    required=True,
+)
+import_file_format = openapi.Parameter(
+    "file_format",
+    openapi.IN_QUERY,
+    description="format of the file, by default taken from the file extension",
+    type=openapi.TYPE_STRING,
+    enum=list(IMPORT_FORMATS),
+)
+export_file_format = openapi.Parameter(
+    "file_format",
+    openapi.IN_QUERY,
+    description="format of the exported file",
+    type=openapi.TYPE_STRING,
+    enum=list(AMBASSADOR_FILE_FORMATS),
+    default="csv",
+)
+export_fields = openapi.Parameter(
+    "fields",
+    openapi.IN_QUERY,
+    description=(
+        "comma-separated columns to export, all by default: "
+        f"{', '.join(AMBASSADOR_EXPORT_COLUMNS)}"
+    ),
+    type=openapi.TYPE_STRING,
+)
+
 
+@method_decorator(
+    name="export",
+    decorator=swagger_auto_schema(
+        operation_summary="Download ambassadors as a file",
+        responses={
+            200: openapi.Response("CSV or NDJSON file"),
+            400: ValidationErrorResponseSerializer,
+            401: ErrorResponse401Serializer,
+        },
+        manual_parameters=[export_file_format, export_fields],
+    ),
+)
+@method_decorator(
+    name="import_file",
+    decorator=swagger_auto_schema(
+        operation_summary="Import ambassadors from a file",
+        manual_parameters=[import_file, import_file_format],
+        responses={
+            200: AmbassadorImportReportSerializer,
+            400: ValidationErrorResponseSerializer,
+            401: ErrorResponse401Serializer,
+        },
+    ),
+)
 class AmbassadorViewSet(DestroyWithPayloadMixin, ModelViewSet):
     """ViewSet for Ambassadors
     By default sorted by created date (created field) from new to old.
-    Sorting by fields: "created", "email", "phone_number", "telegram_id".
-    Searching by field: "name".
-    Filtering by fields: "status", "name", "gender", "onboarding_status",
-    "program", "country", "city", "activity".
+    Sorting by fields: "created", "email", "phone_number", "telegram_id" and
+    the precalculated stats: "stats__review_count", "stats__content_count",
+    "stats__last_content_date", "stats__merch_spend".
+    Searching (?search=) by a partial occurrence of every entered word in
+    name, email, telegram, phone number, job, education and city. Without
+    explicit sorting, ambassadors whose name starts with the search text go
+    first.
+    Filtering by fields: "status", "program", "purpose", "gender",
+    "onboarding_status", "tutor", "activity", "country", "city",
+    registration date range "start_date", "end_date" and the stats:
+    "min_review_count", "min_content_count", "min_merch_spend",
+    "no_content_days", "guide_status" (see AmbassadorFilter).
     """
 
     queryset = Ambassador.objects.all()
     serializer_class = AmbassadorReadSerializer
     filter_backends = (
         DjangoFilterBackend,
-        filters.SearchFilter,
-        filters.OrderingFilter,
-    )
-    filter_fields = (
-        "status",
-        "name",
-        "gender",
-        "onboarding_status",
-        "program",
-        "country",
-        "city",
-        "activity",
+        SearchDocumentFilter,
+        SearchRankOrderingFilter,
     )
-    search_fields = "name"
+    filterset_class = AmbassadorFilter
     ordering_fields = (
         "created",
         "email",
         "phone_number",
         "telegram_id",
+        "stats__review_count",
+        "stats__content_count",
+        "stats__last_content_date",
+        "stats__merch_spend",
     )
+    ordering = ("-created",)
 
     serializer_action_classes = {
         "list": AmbassadorReadSerializer,
@@ -64,3 +143,45 @@ class AmbassadorViewSet(DestroyWithPayloadMixin, ModelViewSet):
             Ambassador.objects.all()
         )
         return queryset.order_by("-created")
+
+    @action(methods=["get"], detail=False, pagination_class=None)
+    def export(self, request):
+        """
+        Downloads ambassadors as a CSV (default) or NDJSON file:
+        ?file_format=ndjson. Columns can be selected with
+        ?fields=name,email,activity. Filters, search and sorting work the same
+        way as for the list of ambassadors. The file is streamed, ambassadors
+        are read from the database in chunks.
+        """
+        file_format = get_file_format(request, AMBASSADOR_FILE_FORMATS)
+        columns = get_export_columns(request, AMBASSADOR_EXPORT_COLUMNS)
+        return export_ambassadors_response(
+            self.filter_queryset(self.get_queryset()), columns, file_format
+        )
+
+    @action(
+        methods=["post"],
+        detail=False,
+        filter_backends=[],
+        pagination_class=None,
+        parser_classes=[MultiPartParser],
+        url_path="import",
+    )
+    def import_file(self, request):
+        """
+        Creates or updates (found by email) ambassadors from a CSV, JSON
+        or NDJSON file sent as the "file" form field. Records have the fields
+        of an ambassador, address fields (postal_code, country, city, street),
+        names of the program and the purpose and activity names (a list or
+        a comma-separated string). New ambassadors get the "active" status.
+        The file is read and written in batches. Rows with errors are skipped
+        and reported by their number, the rest is imported.
+        """
+        uploaded = request.FILES.get("file")
+        if uploaded is None:
+            raise ValidationError({"file": "No file was submitted."})
+        file_format = get_import_format(
+            request.query_params.get("file_format"), uploaded.name
+        )
+        report = import_ambassadors(read_records(uploaded.file, file_format))
+        return response.Response(AmbassadorImportReportSerializer(report).data)
@@ -1,10 +1,15 @@
 import base64
+from collections import defaultdict
 
 from django.core.files.base import ContentFile
-from django.db.models import Prefetch
+from django.db import transaction
+from django.db.models import Case, Count, OuterRef, Prefetch, Q, Subquery, When
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
 
-from ambassadors.models import Ambassador
+from .platforms import classify_link, platform_classifier
+from .promo_serializers import does_not_exist_error
+from ambassadors.models import CONTENT_STATS_FIELDS, Ambassador, AmbassadorStats
 from content.models import (
     Content,
     Guide,
@@ -12,39 +17,10 @@ from content.models import (
     GuideTask,
     GuideTaskGuideKit,
     MerchPhoto,
+    get_link_hash,
 )
 
 
-def get_content_platfrom(link):
-    platform = link[:]
-    if "//" in platform:
-        platform = platform.split("//")[1].split("/")
-        if "www." in platform[0]:
-            platform[0] = platform[0].replace("www.", "")
-        if "yandex" in platform[0] or "google" in platform[0]:
-            return platform[0] + "/" + platform[1]
-        return platform[0]
-    return platform.split("/")[0]
-
-
-def get_content_type(platform):
-    reviews_platforms = [
-        "career.habr.com",
-        "sravni.ru",
-        "tutortop.ru",
-        "irecommend.ru",
-        "journal.tinkoff.ru",
-        "mooc.ru",
-        "katalog-kursov.ru",
-        "otzovik.com",
-        "yandex.ru/maps/",
-        "google.com/maps",
-    ]
-    if platform in reviews_platforms:
-        return "review"
-    return "content"
-
-
 class GuideTaskSerializer(serializers.ModelSerializer):
     """Сериализатор задачи для гайда."""
 
@@ -202,40 +178,54 @@ class ContentSerializer(serializers.ModelSerializer):
             "image",
         )
 
-
-class ContentUpdateSerializer(serializers.ModelSerializer):
+    def validate(self, attrs):
+        """Измененная ссылка не должна повторять другую ссылку амбассадора."""
+        if self.instance is not None and ("link" in attrs or "ambassador" in attrs):
+            duplicates = Content.objects.filter(
+                ambassador=attrs.get("ambassador", self.instance.ambassador),
+                link_hash=get_link_hash(attrs.get("link", self.instance.link)),
+            ).exclude(pk=self.instance.pk)
+            if duplicates.exists():
+                raise serializers.ValidationError(
+                    {"link": "The ambassador already has this link."}
+                )
+        return attrs
+
+
+class ContentUpdateSerializer(ContentSerializer):
     """Сериализатор обновления контента."""
 
-    image = Base64ImageField(required=False)
-
-    class Meta:
-        model = Content
-        fields = (
-            "id",
-            "created",
-            "link",
-            "is_guide_content",
-            "ambassador",
-            "platform",
-            "type",
-            "image",
-        )
+    def update(self, instance, validated_data):
+        """Платформа и тип новой ссылки определяются, если не переданы."""
+        if "link" in validated_data:
+            platform = classify_link(validated_data["link"])
+            validated_data.setdefault("platform", platform.name)
+            validated_data.setdefault("type", platform.type)
+        return super().update(instance, validated_data)
 
     # Перенести в Create
     def create(self, validated_data):
+        """
+        Ссылка сохраняется у амбассадора один раз: повторная отправка той же
+        ссылки (в том числе записанной иначе, см. normalize_link) возвращает
+        сохраненный контент, self.created показывает, создан ли он.
+        """
         is_guide_content = False
         is_guide_content_field = validated_data.pop("is_guide_content")
         if is_guide_content_field == "Да":
             is_guide_content = True
-        link = validated_data["link"]
-        platform = get_content_platfrom(link)
-        type = get_content_type(platform)
-        return Content.objects.create(
-            **validated_data,
-            is_guide_content=is_guide_content,
-            platform=platform,
-            type=type,
+        platform = classify_link(validated_data["link"])
+        content, self.created = Content.objects.get_or_create(
+            ambassador=validated_data.pop("ambassador"),
+            link_hash=get_link_hash(validated_data["link"]),
+            defaults={
+                **validated_data,
+                "is_guide_content": is_guide_content,
+                "platform": platform.name,
+                "type": platform.type,
+            },
         )
+        return content
 
 
 class ContentCreateSerializer(ContentUpdateSerializer):
@@ -244,12 +234,217 @@ class ContentCreateSerializer(ContentUpdateSerializer):
     is_guide_content = serializers.CharField()
 
 
+CONTENT_INGEST_MAX_SIZE = 5000
+CONTENT_INGEST_BATCH_SIZE = 500
+# Statuses of ingested submissions
+INGEST_CREATED = "created"
+INGEST_DUPLICATE = "duplicate"
+INGEST_INVALID = "invalid"
+
+
+def get_content_ids(link_keys) -> dict:
+    """Returns {(ambassador ID, link hash): content ID} of existing content."""
+    return {
+        (ambassador_id, link_hash): pk
+        for ambassador_id, link_hash, pk in Content.objects.filter(
+            ambassador__in={ambassador_id for ambassador_id, _ in link_keys},
+            link_hash__in={link_hash for _, link_hash in link_keys},
+        ).values_list("ambassador_id", "link_hash", "pk")
+    }
+
+
+def get_ingested_content_ids(ingest_keys) -> dict:
+    """Returns {idempotency key: content ID} of content created by ingestion."""
+    return dict(
+        Content.objects.filter(ingest_key__in=ingest_keys).values_list(
+            "ingest_key", "pk"
+        )
+    )
+
+
+class YesNoBooleanField(serializers.BooleanField):
+    """Boolean field accepting the "Да"/"Нет" answers of Yandex Forms too."""
+
+    TRUE_VALUES = {*serializers.BooleanField.TRUE_VALUES, "Да", "да"}
+    FALSE_VALUES = {*serializers.BooleanField.FALSE_VALUES, "Нет", "нет"}
+
+
+class ContentSubmissionSerializer(serializers.Serializer):
+    """Serializer for a form submission in content ingestion."""
+
+    idempotency_key = serializers.CharField(max_length=200)
+    ambassador = serializers.IntegerField()
+    link = serializers.URLField(max_length=5000)
+    is_guide_content = YesNoBooleanField(default=False)
+
+
+class ContentIngestResultSerializer(serializers.Serializer):
+    """Serializer to display the result of an ingested submission."""
+
+    idempotency_key = serializers.CharField(allow_null=True)
+    status = serializers.ChoiceField(
+        choices=(INGEST_CREATED, INGEST_DUPLICATE, INGEST_INVALID)
+    )
+    id = serializers.IntegerField(allow_null=True)
+    errors = serializers.DictField(required=False)
+
+
+class ContentIngestReportSerializer(serializers.Serializer):
+    """Serializer to display the results of content ingestion."""
+
+    created = serializers.IntegerField()
+    duplicates = serializers.IntegerField()
+    invalid = serializers.IntegerField()
+    results = ContentIngestResultSerializer(many=True)
+
+
+class ContentIngestSerializer(serializers.Serializer):
+    """
+    Serializer to ingest many form submissions at once. Unlike the bulk merch
+    applications, every submission is accepted or rejected on its own and
+    gets a result in the order of the request:
+    "created", "duplicate" or "invalid" with the errors. A submission is
+    a duplicate if its idempotency key is repeated in the request or was
+    stored by an earlier request (see Content.ingest_key), its result gets
+    the ID of the content created by the first submission with the key.
+    It's a duplicate too if the ambassador already has the link (see
+    Content.link_hash). Ambassadors are resolved by one query, submissions
+    are written by batches: two queries for existing keys and links, one bulk
+    insert and two queries for IDs of the new content per batch.
+    """
+
+    submissions = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=CONTENT_INGEST_MAX_SIZE,
+    )
+
+    def validate_submissions(self, submissions):
+        """Returns a (validated data, errors) pair for every submission."""
+        submission_serializer = ContentSubmissionSerializer()
+        validated = []
+        for submission in submissions:
+            try:
+                validated.append(
+                    (submission_serializer.run_validation(submission), None)
+                )
+            except serializers.ValidationError as error:
+                validated.append((submission, error.detail))
+        ambassadors = set(
+            Ambassador.objects.filter(
+                pk__in={data["ambassador"] for data, errors in validated if not errors}
+            ).values_list("pk", flat=True)
+        )
+        return [
+            (
+                (data, {"ambassador": [does_not_exist_error(data["ambassador"])]})
+                if not errors and data["ambassador"] not in ambassadors
+                else (data, errors)
+            )
+            for data, errors in validated
+        ]
+
+    def create(self, validated_data):
+        """Creates content of the valid submissions, returns their results."""
+        classify = platform_classifier.get().classify
+        results = []
+        # (ambassador, link hash): new content, results of its submissions
+        contents = {}
+        link_results = defaultdict(list)
+        # Idempotency key: (ambassador, link hash) of its first submission
+        keys = {}
+        for data, errors in validated_data["submissions"]:
+            result = {"idempotency_key": data.get("idempotency_key"), "id": None}
+            results.append(result)
+            if errors:
+                result.update(status=INGEST_INVALID, errors=errors)
+                continue
+            link_key = keys.setdefault(
+                data["idempotency_key"],
+                (data["ambassador"], get_link_hash(data["link"])),
+            )
+            link_results[link_key].append(result)
+            if link_key in contents:
+                result["status"] = INGEST_DUPLICATE
+                continue
+            platform = classify(data["link"])
+            contents[link_key] = Content(
+                ambassador_id=data["ambassador"],
+                link=data["link"],
+                link_hash=link_key[1],
+                ingest_key=data["idempotency_key"],
+                is_guide_content=data["is_guide_content"],
+                platform=platform.name,
+                type=platform.type,
+            )
+        link_keys = list(contents)
+        for start in range(0, len(link_keys), CONTENT_INGEST_BATCH_SIZE):
+            end = start + CONTENT_INGEST_BATCH_SIZE
+            self.create_batch(
+                {link_key: contents[link_key] for link_key in link_keys[start:end]},
+                link_results,
+            )
+        return results
+
+    @transaction.atomic
+    def create_batch(self, contents, link_results):
+        """
+        Inserts the content of a batch which doesn't exist yet, sets statuses
+        and content IDs to the results. Content is created by this request if
+        the row of its link has its idempotency key after the insert: rows
+        inserted concurrently by other submissions are skipped by the unique
+        constraints and reported as duplicates.
+        """
+        keys = [content.ingest_key for content in contents.values()]
+        existing = get_content_ids(contents)
+        ingested = get_ingested_content_ids(keys)
+        new = [
+            content
+            for link_key, content in contents.items()
+            if link_key not in existing and content.ingest_key not in ingested
+        ]
+        if new:
+            Content.objects.bulk_create(new, ignore_conflicts=True)
+            # bulk_create() sends no signals.
+            AmbassadorStats.objects.refresh(
+                {content.ambassador_id for content in new}, CONTENT_STATS_FIELDS
+            )
+        new_keys = {content.ingest_key for content in new}
+        existing = get_content_ids(contents)
+        ingested = get_ingested_content_ids(keys)
+        for link_key, content in contents.items():
+            content_id = ingested.get(content.ingest_key)
+            created = (
+                content.ingest_key in new_keys
+                and content_id is not None
+                and content_id == existing.get(link_key)
+            )
+            link_results[link_key][0]["status"] = (
+                INGEST_CREATED if created else INGEST_DUPLICATE
+            )
+            for result in link_results[link_key]:
+                result["id"] = content_id or existing.get(link_key)
+
+    def to_representation(self, instance):
+        statuses = [result["status"] for result in instance]
+        return ContentIngestReportSerializer(
+            {
+                "created": statuses.count(INGEST_CREATED),
+                "duplicates": statuses.count(INGEST_DUPLICATE),
+                "invalid": statuses.count(INGEST_INVALID),
+                "results": instance,
+            }
+        ).data
+
+
 class ContentPageSerialzier(serializers.ModelSerializer):
     """Сериализатор для страницы Контент."""
 
     review = serializers.SerializerMethodField()
     content = serializers.SerializerMethodField()
-    sending_merch = serializers.SerializerMethodField()
+    review_count = serializers.IntegerField(read_only=True)
+    content_count = serializers.IntegerField(read_only=True)
+    sending_merch = serializers.IntegerField(read_only=True)
     # guide_status = serializers.SerializerMethodField()
 
     class Meta:
@@ -260,6 +455,8 @@ class ContentPageSerialzier(serializers.ModelSerializer):
             "telegram_id",
             "review",
             "content",
+            "review_count",
+            "content_count",
             "comment",
             "sending_merch",
             # "guide_status",
@@ -267,42 +464,55 @@ class ContentPageSerialzier(serializers.ModelSerializer):
 
     @classmethod
     def setup_eager_loading(cls, queryset):
-        """Performs necessary eager loading of content page data."""
-        return queryset.prefetch_related("content")
+        """
+        Annotates ambassadors with the latest review and content links, their
+        numbers and the merch available to send (see sending_merch_expression),
+        so the page is read with one query. The annotations can be used for
+        filtering and sorting.
+        """
+        reviews = Content.objects.filter(ambassador=OuterRef("pk"), type="review")
+        content = Content.objects.filter(ambassador=OuterRef("pk"), type="content")
+        return queryset.annotate(
+            last_review=cls.latest_link(reviews),
+            last_content=cls.latest_link(content),
+            review_count=cls.count(reviews),
+            content_count=cls.count(content),
+        ).annotate(sending_merch=cls.sending_merch_expression())
+
+    @staticmethod
+    def latest_link(content):
+        return Subquery(content.order_by("-created", "-pk").values("link")[:1])
+
+    @staticmethod
+    def count(content):
+        # Counted by (ambassador, type) index without grouping the ambassadors.
+        return Coalesce(
+            Subquery(
+                content.order_by()
+                .values("ambassador")
+                .annotate(count=Count("pk"))
+                .values("count")
+            ),
+            0,
+        )
+
+    @staticmethod
+    def sending_merch_expression():
+        """
+        Доступно мерча к отправке: 0 без отзывов и контента, 1 при одном
+        отзыве или одном контенте, иначе 2.
+        """
+        return Case(
+            When(review_count=0, content_count=0, then=0),
+            When(Q(review_count=1) | Q(content_count=1), then=1),
+            default=2,
+        )
 
     def get_review(self, obj):
-        review = obj.content.filter(type="review")
-        if review:
-            return review[0].link
-        return "Еще нет отзывов"
+        return obj.last_review or "Еще нет отзывов"
 
     def get_content(self, obj):
-        content = obj.content.filter(type="content")
-        if content:
-            return content[0].link
-        return "Еще нет контента"
-
-    def get_sending_merch(self, obj):
-        """Доступно мерча к отправке."""
-        # Достаем всё, иначе очень много запросов в БД
-        content_all = obj.content.all()
-        reviews = 0
-        content = 0
-        # И поэтому считаем циклом - O(n), все нормально =)
-        for data in content_all:
-            if data.type == "review":
-                reviews += 1
-            if data.type == "content":
-                content += 1
-        if reviews == 0 and content == 0:
-            return 0
-        if reviews == 1 or content == 1:
-            return 1
-        if reviews == 1 and content >= 2:
-            return 2
-        if content == 1 and reviews >= 2:
-            return 2
-        return 2
+        return obj.last_content or "Еще нет контента"
 
     # def get_guide_status(self, obj):
     #     try:
@@ -1,11 +1,22 @@
 from django.utils.decorators import method_decorator
+from django_filters.rest_framework import DjangoFilterBackend
+from drf_standardized_errors.openapi_serializers import (
+    ErrorResponse401Serializer,
+    ValidationErrorResponseSerializer,
+)
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
 from ambassadors.models import Ambassador
 from api.content_serializers import (  # ContentPageUpdateSerializer,
     ContentCreateSerializer,
+    ContentIngestReportSerializer,
+    ContentIngestSerializer,
     ContentPageSerialzier,
     ContentSerializer,
     ContentUpdateSerializer,
@@ -16,6 +27,7 @@ from api.content_serializers import (  # ContentPageUpdateSerializer,
     GuideTaskSerializer,
     MerchPhotoSerializer,
 )
+from api.filters import ContentPageFilter
 from api.mixins import DestroyWithPayloadMixin
 from content.models import Content, Guide, GuideKit, GuideTask, MerchPhoto
 
@@ -81,8 +93,32 @@ class MerchPhotoViewSet(DestroyWithPayloadMixin, ModelViewSet):
     serializer_class = MerchPhotoSerializer
 
 
+@method_decorator(
+    name="create",
+    decorator=swagger_auto_schema(
+        responses={
+            201: ContentSerializer,
+            200: openapi.Response("The link was already added", ContentSerializer),
+        }
+    ),
+)
+@method_decorator(
+    name="ingest",
+    decorator=swagger_auto_schema(
+        operation_summary="Ingest many form submissions",
+        responses={
+            200: ContentIngestReportSerializer,
+            400: ValidationErrorResponseSerializer,
+            401: ErrorResponse401Serializer,
+        },
+    ),
+)
 class ContentViewSet(DestroyWithPayloadMixin, ModelViewSet):
-    """Представление для контента."""
+    """
+    Представление для контента.
+    Создание идемпотентно: повторно отправленная ссылка амбассадора не
+    создает новый контент, возвращается сохраненный (код 200).
+    """
 
     queryset = Content.objects.all()
     serializer_class = ContentSerializer
@@ -103,17 +139,65 @@ class ContentViewSet(DestroyWithPayloadMixin, ModelViewSet):
     def get_serializer_class(self):
         if self.action == "create":
             return ContentCreateSerializer
+        if self.action == "ingest":
+            return ContentIngestSerializer
         if self.action == "partial_update":
             return ContentUpdateSerializer
         return ContentSerializer
 
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        return Response(
+            serializer.data,
+            status=(
+                status.HTTP_201_CREATED if serializer.created else status.HTTP_200_OK
+            ),
+            headers=self.get_success_headers(serializer.data),
+        )
+
+    @action(methods=["post"], detail=False, filter_backends=[], pagination_class=None)
+    def ingest(self, request):
+        """
+        Ingests form submissions by batches (up to 5000), for example the backlog
+        of the Yandex Forms bridge. Takes {"submissions": [{"idempotency_key":
+        "answer-1", "ambassador": 1, "link": "https://...",
+        "is_guide_content": "Да"}, ...]}.
+        Every submission is accepted or rejected on its own, a repeated
+        submission (the same idempotency key, in this or an earlier request,
+        or the same link of the ambassador) creates nothing and gets the ID
+        of the existing content, so the batches can be resent safely.
+        Returns the numbers of created, duplicate and invalid submissions and
+        the result of every submission in the order of the request.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
 
 class ContentPageViewSet(ModelViewSet):
-    """Представление для страницы контент со списком амбассадоров."""
+    """
+    Представление для страницы контент со списком амбассадоров.
+    По умолчанию сортировка по дате регистрации от новых к старым.
+    Сортировка (?ordering=) по полям "created", "name", "review_count",
+    "content_count", "sending_merch", фильтры - см. ContentPageFilter.
+    """
 
     queryset = Ambassador.objects.all()
     serializer_class = ContentPageSerialzier
     http_method_names = ["get", "patch"]
+    filter_backends = (DjangoFilterBackend, OrderingFilter)
+    filterset_class = ContentPageFilter
+    ordering_fields = (
+        "created",
+        "name",
+        "review_count",
+        "content_count",
+        "sending_merch",
+    )
+    ordering = ("-created",)
 
     def get_queryset(self):
         return ContentPageSerialzier.setup_eager_loading(Ambassador.objects.all())
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import threading
+import time
+from typing import NamedTuple
+from uuid import uuid4
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models.signals import post_delete, post_save
+
+from ambassadors.models import Activity, Program, Purpose, Status
+from api.models import CacheVersion
+from content.models import GuideTask, PlatformRule
+from promo.models import MerchCategory
+
+DICTIONARIES_VERSION_NAME = "dictionaries"
+# How long (in seconds) a process trusts the version it has read, changes
+# made by other processes are seen after this delay at most.
+VERSION_CHECK_INTERVAL = 1
+
+# Dictionary name in the API: model
+DICTIONARY_MODELS = {
+    "statuses": Status,
+    "programs": Program,
+    "purposes": Purpose,
+    "activities": Activity,
+    "merch_categories": MerchCategory,
+    "guide_tasks": GuideTask,
+    "platform_rules": PlatformRule,
+}
+# Fields the dictionary objects can be looked up by (if the model has them).
+LOOKUP_FIELDS = ("id", "slug", "name")
+
+
+class DictionarySnapshot(NamedTuple):
+    """Loaded dictionaries of one version."""
+
+    version: str
+    etag: str
+    data: dict[str, list[dict]]
+    index: dict[tuple, dict]
+
+
+class DictionaryCache:
+    """
+    Process-wide cache of small reference tables (statuses, programs, merch
+    categories, etc.). The tables are loaded with one query each and kept in
+    memory while the version stored in the database (see CacheVersion) stays
+    the same. The version is read at most once per VERSION_CHECK_INTERVAL.
+    Saving or deleting a dictionary object sets a new version (see
+    invalidate_dictionaries): the current process reloads the dictionaries on
+    the next access, other processes (workers and management commands) do it
+    within VERSION_CHECK_INTERVAL. Changes made by QuerySet.update() and
+    bulk_create() send no signals and need an explicit invalidate() call.
+    """
+
+    def __init__(
+        self,
+        models: dict = DICTIONARY_MODELS,
+        check_interval: float = VERSION_CHECK_INTERVAL,
+    ):
+        self.models = models
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot = None
+        # (version, time.monotonic() of the check)
+        self._checked_version = None
+
+    def get_version(self) -> str:
+        checked = self._checked_version
+        now = time.monotonic()
+        if checked is not None and now - checked[1] < self.check_interval:
+            return checked[0]
+        versions = CacheVersion.objects.filter(name=DICTIONARIES_VERSION_NAME)
+        version = versions.values_list("version", flat=True).first()
+        if version is None:
+            try:
+                with transaction.atomic():
+                    version = CacheVersion.objects.create(
+                        name=DICTIONARIES_VERSION_NAME, version=uuid4().hex
+                    ).version
+            except IntegrityError:
+                # Another process has set the first version at the same time.
+                version = versions.values_list("version", flat=True).get()
+        self._checked_version = version, now
+        return version
+
+    def get_snapshot(self) -> DictionarySnapshot:
+        """Returns the dictionaries of the current version loading them if needed."""
+        version = self.get_version()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = self._load(version)
+            return self._snapshot
+
+    def invalidate(self):
+        """
+        Sets a new version making all processes reload the dictionaries.
+        This process reloads them on the next access. Inside a transaction
+        the version is stored after the commit, so the shared version row isn't
+        locked until the end of the transaction (e.g. a long import). After
+        a rollback the stored version stays the same and this process reloads
+        the dictionaries again once it reads it.
+        """
+        version = uuid4().hex
+        self._checked_version = version, time.monotonic()
+        transaction.on_commit(lambda: self._store_version(version))
+
+    def _store_version(self, version: str):
+        CacheVersion.objects.update_or_create(
+            name=DICTIONARIES_VERSION_NAME, defaults={"version": version}
+        )
+
+    def forget(self):
+        """Drops the loaded dictionaries and the version read by this process."""
+        with self._lock:
+            self._snapshot = None
+            self._checked_version = None
+
+    def get_all(self) -> dict[str, list[dict]]:
+        """Returns {dictionary name: list of objects as dicts}."""
+        return self.get_snapshot().data
+
+    def get(self, model, **lookup):
+        """
+        Returns a dictionary object found by one of LOOKUP_FIELDS (for example,
+        get(Status, slug="active")) without a database query or None.
+        """
+        ((field, value),) = lookup.items()
+        return self._get(self.get_snapshot(), model, field, value)
+
+    def get_or_create(self, model, **lookup):
+        """Returns a dictionary object from memory, creates it if it's missing."""
+        instance = self.get(model, **lookup)
+        if instance is None:
+            instance, _ = model.objects.get_or_create(**lookup)
+        return instance
+
+    def get_or_create_many(self, model, names) -> dict:
+        """
+        Returns {name: object} for the names of a dictionary with slugs (see
+        CommonManager.get_or_create_many). Objects missing in memory are read
+        or created with one query each.
+        """
+        snapshot = self.get_snapshot()
+        found = {name: self._get(snapshot, model, "name", name) for name in names}
+        missing = [name for name, obj in found.items() if obj is None]
+        if missing:
+            found.update(model.objects.get_or_create_many(missing))
+            # bulk_create() sends no signals.
+            self.invalidate()
+        return found
+
+    def _get(self, snapshot: DictionarySnapshot, model, field: str, value):
+        row = snapshot.index.get((model, field, value))
+        if row is None:
+            return None
+        return model.from_db(DEFAULT_DB_ALIAS, list(row), list(row.values()))
+
+    def _load(self, version: str) -> DictionarySnapshot:
+        data = {
+            name: list(model.objects.order_by("pk").values())
+            for name, model in self.models.items()
+        }
+        index = {}
+        for name, model in self.models.items():
+            for row in data[name]:
+                for field in LOOKUP_FIELDS:
+                    if field in row:
+                        index[(model, field, row[field])] = row
+        content = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+        etag = hashlib.md5(content.encode(), usedforsecurity=False).hexdigest()
+        return DictionarySnapshot(version, f'"{etag}"', data, index)
+
+
+dictionaries = DictionaryCache()
+
+
+def invalidate_dictionaries(sender, **kwargs):
+    """
+    Sets a new dictionaries version after the change is committed, so other
+    processes don't reload the dictionaries before they can see the change.
+    """
+    dictionaries.invalidate()
+
+
+def connect_dictionary_signals():
+    for model in DICTIONARY_MODELS.values():
+        for signal in (post_save, post_delete):
+            signal.connect(
+                invalidate_dictionaries,
+                sender=model,
+                dispatch_uid=f"invalidate_dictionaries_{model._meta.label_lower}",
+            )
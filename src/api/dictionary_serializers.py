@@ -0,0 +1,38 @@
+from rest_framework import serializers
+
+
+class DictionaryItemSerializer(serializers.Serializer):
+    """Serializer to display an object of a dictionary with slugs."""
+
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    slug = serializers.CharField()
+
+
+class GuideTaskItemSerializer(serializers.Serializer):
+    """Serializer to display a guide task type."""
+
+    id = serializers.IntegerField()
+    type = serializers.CharField()
+
+
+class PlatformRuleItemSerializer(serializers.Serializer):
+    """Serializer to display a rule of content platforms."""
+
+    id = serializers.IntegerField()
+    domain = serializers.CharField()
+    path_prefix = serializers.CharField()
+    platform = serializers.CharField()
+    type = serializers.CharField()
+
+
+class DictionariesSerializer(serializers.Serializer):
+    """Serializer to display all reference dictionaries."""
+
+    statuses = DictionaryItemSerializer(many=True)
+    programs = DictionaryItemSerializer(many=True)
+    purposes = DictionaryItemSerializer(many=True)
+    activities = DictionaryItemSerializer(many=True)
+    merch_categories = DictionaryItemSerializer(many=True)
+    guide_tasks = GuideTaskItemSerializer(many=True)
+    platform_rules = PlatformRuleItemSerializer(many=True)
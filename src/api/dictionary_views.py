@@ -0,0 +1,43 @@
+from django.utils.cache import parse_etags
+from django.utils.decorators import method_decorator
+from drf_standardized_errors.openapi_serializers import ErrorResponse401Serializer
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .dictionaries import dictionaries
+from .dictionary_serializers import DictionariesSerializer
+
+# Clients revalidate the dictionaries by ETag after this time (in seconds).
+DICTIONARIES_MAX_AGE = 60 * 60
+
+
+@method_decorator(
+    name="get",
+    decorator=swagger_auto_schema(
+        operation_summary="Get all reference dictionaries",
+        responses={
+            200: DictionariesSerializer,
+            304: "Not modified",
+            401: ErrorResponse401Serializer,
+        },
+    ),
+)
+class DictionaryView(APIView):
+    """
+    Returns statuses, programs, purposes, activities, merch categories and guide
+    tasks in one response. The response has an ETag header: send it back in
+    If-None-Match to get 304 Not Modified while the dictionaries are the same.
+    """
+
+    def get(self, request):
+        snapshot = dictionaries.get_snapshot()
+        headers = {
+            "ETag": snapshot.etag,
+            "Cache-Control": f"private, max-age={DICTIONARIES_MAX_AGE}",
+        }
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        if snapshot.etag in if_none_match or "*" in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(snapshot.data, headers=headers)
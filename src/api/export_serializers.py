@@ -0,0 +1,31 @@
+from rest_framework import serializers
+
+from .models import ExportJob
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    """Serializer to display status and progress of export jobs."""
+
+    kind_display = serializers.CharField(source="get_kind_display", read_only=True)
+    status_display = serializers.CharField(source="get_status_display", read_only=True)
+
+    class Meta:
+        model = ExportJob
+        fields = (
+            "id",
+            "kind",
+            "kind_display",
+            "incremental",
+            "status",
+            "status_display",
+            "total",
+            "processed",
+            "attempts",
+            "run_after",
+            "link",
+            "error",
+            "created",
+            "started",
+            "finished",
+        )
+        read_only_fields = fields
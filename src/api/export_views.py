@@ -0,0 +1,41 @@
+from django.utils.decorators import method_decorator
+from drf_standardized_errors.openapi_serializers import (
+    ErrorResponse401Serializer,
+    ErrorResponse404Serializer,
+)
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import viewsets
+
+from .export_serializers import ExportJobSerializer
+from .models import ExportJob
+
+
+@method_decorator(
+    name="list",
+    decorator=swagger_auto_schema(
+        operation_summary="Get all export jobs",
+        responses={200: ExportJobSerializer, 401: ErrorResponse401Serializer},
+    ),
+)
+@method_decorator(
+    name="retrieve",
+    decorator=swagger_auto_schema(
+        operation_summary="Get export job status, progress and link",
+        responses={
+            200: ExportJobSerializer,
+            401: ErrorResponse401Serializer,
+            404: ErrorResponse404Serializer,
+        },
+    ),
+)
+class ExportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet for exports to Google Sheets.
+    Exports are started by export_to_google_sheet actions and are processed
+    in the background by the run_export_worker command. Poll the job until
+    its status is "done" (the link field holds the spreadsheet link)
+    or "failed" (see the error field).
+    """
+
+    queryset = ExportJob.objects.all()
+    serializer_class = ExportJobSerializer
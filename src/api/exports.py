@@ -0,0 +1,476 @@
+import codecs
+import csv
+import tempfile
+from collections import defaultdict
+from datetime import datetime
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from googleapiclient.errors import HttpError
+from openpyxl import Workbook
+from rest_framework.exceptions import ValidationError
+
+from .google_sheets_examples import (
+    MERCH_APPLICATIONS_SHEET,
+    PROMOCODES_SHEET,
+    SheetExportError,
+    SheetLayout,
+    create_spreadsheet,
+    export_queryset_to_sheet,
+    get_google_services,
+    get_merch_application_row,
+    get_promocode_row,
+    sync_queryset_to_sheet,
+)
+from .imports import ACTIVITY_SEPARATOR
+from .loggers import logger
+from .models import EXPORT_MERCH_APPLICATIONS, EXPORT_PROMOCODES, ExportJob, SheetSync
+from .promo_serializers import MerchApplicationSerializer, PromocodeSerializer
+from .utils import YEAR_MONTHS
+from ambassadors.models import AmbassadorActivity
+from promo.models import MerchApplication, Promocode
+
+
+def get_merch_applications_queryset():
+    return MerchApplicationSerializer.setup_eager_loading(
+        MerchApplication.objects.all()
+    )
+
+
+def get_promocodes_queryset():
+    return PromocodeSerializer.setup_eager_loading(Promocode.objects.all())
+
+
+# Export kind: (queryset getter, row builder, spreadsheet layout)
+EXPORTS = {
+    EXPORT_MERCH_APPLICATIONS: (
+        get_merch_applications_queryset,
+        get_merch_application_row,
+        MERCH_APPLICATIONS_SHEET,
+    ),
+    EXPORT_PROMOCODES: (
+        get_promocodes_queryset,
+        get_promocode_row,
+        PROMOCODES_SHEET,
+    ),
+}
+# Export kind: modification times of the data in its rows (see
+# sync_queryset_to_sheet). Applications are marked as modified when their merch
+# items change or their merch is renamed. Renamed statuses and tutors are not
+# tracked, the rows get the new names when they are changed otherwise.
+SYNC_MODIFIED_FIELDS = {
+    EXPORT_MERCH_APPLICATIONS: ("modified", "ambassador__modified"),
+    EXPORT_PROMOCODES: ("modified", "ambassador__modified"),
+}
+
+
+def export_to_new_sheet(job: ExportJob, queryset, get_row, layout, services, **retry):
+    """Writes all objects into a new spreadsheet created for the job."""
+    if not job.spreadsheet_id:
+        service_sheets, service_drive = services
+        job.spreadsheet_id = create_spreadsheet(
+            service_sheets.spreadsheets(), service_drive, layout, **retry
+        )
+        job.processed = 0
+        job.save(update_fields=["spreadsheet_id", "processed", "updated"])
+    return export_queryset_to_sheet(
+        queryset,
+        get_row,
+        layout,
+        services=services,
+        spreadsheet_id=job.spreadsheet_id,
+        rows_written=job.rows_written,
+        progress=lambda rows_written: job.set_progress(max(rows_written - 1, 0)),
+        **retry,
+    )
+
+
+def sync_to_persistent_sheet(
+    job: ExportJob, queryset, get_row, layout, services, **retry
+):
+    """Updates the changed rows of the persistent spreadsheet of the export."""
+    sync, _ = SheetSync.objects.get_or_create(kind=job.kind)
+    try:
+        return sync_queryset_to_sheet(
+            sync,
+            queryset,
+            get_row,
+            layout,
+            services=services,
+            progress=job.set_progress,
+            modified_fields=SYNC_MODIFIED_FIELDS[job.kind],
+            **retry,
+        )
+    finally:
+        job.spreadsheet_id = sync.spreadsheet_id
+
+
+def run_export_job(job: ExportJob, services: tuple | None = None, **retry) -> ExportJob:
+    """
+    Exports data of the job into a Google spreadsheet. A job interrupted by an
+    error keeps the written rows and continues from them on the next attempt.
+    """
+    get_queryset, get_row, layout = EXPORTS[job.kind]
+    export = sync_to_persistent_sheet if job.incremental else export_to_new_sheet
+    queryset = get_queryset()
+    try:
+        services = services or get_google_services()
+        job.total = queryset.count()
+        job.save(update_fields=["total", "updated"])
+        link = export(job, queryset, get_row, layout, services, **retry)
+    except (HttpError, OSError, SheetExportError) as error:
+        logger.error(f"Export job {job.pk}: {error}")
+        job.fail(error)
+    else:
+        job.finish(link)
+    return job
+
+
+# Local file exports
+
+FILE_FORMAT_CSV = "csv"
+FILE_FORMAT_XLSX = "xlsx"
+FILE_FORMAT_NDJSON = "ndjson"
+FILE_FORMATS = {
+    FILE_FORMAT_CSV: "text/csv; charset=utf-8",
+    FILE_FORMAT_XLSX: (
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    ),
+}
+AMBASSADOR_FILE_FORMATS = {
+    FILE_FORMAT_CSV: FILE_FORMATS[FILE_FORMAT_CSV],
+    FILE_FORMAT_NDJSON: "application/x-ndjson; charset=utf-8",
+}
+EXPORT_CHUNK_SIZE = 2000
+FILE_CHUNK_SIZE = 64 * 1024
+
+MERCH_APPLICATION_LINE_FIELDS = (
+    "id",
+    "application_number",
+    "tutor__first_name",
+    "tutor__last_name",
+    "merch_in_applications__merch__name",
+    "merch_in_applications__merch__size",
+    "merch_in_applications__quantity",
+    "ambassador__clothing_size",
+    "ambassador__shoe_size",
+    "ambassador__name",
+    "ambassador__address__postal_code",
+    "ambassador__address__country",
+    "ambassador__address__city",
+    "ambassador__address__street",
+    "ambassador__phone_number",
+    "created",
+)
+PROMOCODE_FIELDS = (
+    "id",
+    "code",
+    "is_active",
+    "ambassador__name",
+    "ambassador__status__name",
+    "ambassador__telegram_id",
+)
+# Export column: lookup of the value in Ambassador.objects.values_list()
+AMBASSADOR_EXPORT_FIELDS = {
+    "id": "id",
+    "created": "created",
+    "name": "name",
+    "gender": "gender",
+    "clothing_size": "clothing_size",
+    "shoe_size": "shoe_size",
+    "education": "education",
+    "job": "job",
+    "email": "email",
+    "phone_number": "phone_number",
+    "telegram_id": "telegram_id",
+    "whatsapp": "whatsapp",
+    "blog_link": "blog_link",
+    "onboarding_status": "onboarding_status",
+    "personal_purpose": "personal_purpose",
+    "about_me": "about_me",
+    "comment": "comment",
+    "status": "status__name",
+    "program": "program__name",
+    "purpose": "purpose__name",
+    "tutor": "tutor__username",
+    "postal_code": "address__postal_code",
+    "country": "address__country",
+    "city": "address__city",
+    "street": "address__street",
+}
+# Export column with a list of values: (model linked to the ambassador, lookup)
+AMBASSADOR_EXPORT_LISTS = {
+    "activity": (AmbassadorActivity, "activity__name"),
+    "promocodes": (Promocode, "code"),
+}
+AMBASSADOR_EXPORT_COLUMNS = (*AMBASSADOR_EXPORT_FIELDS, *AMBASSADOR_EXPORT_LISTS)
+BUDGET_SHEET = SheetLayout(
+    title="Бюджет на мерч",
+    worksheet_name="Бюджет на мерч",
+    columns=("амбассадор", *(month[2] for month in YEAR_MONTHS), "всего за год"),
+)
+
+
+def iter_merch_application_rows(applications):
+    """
+    Yields rows of merch applications in the MERCH_APPLICATIONS_SHEET layout,
+    one row per merch item of an application, in the order of the queryset
+    (the ID breaks ties). IDs of the applications are streamed in chunks, only
+    the needed columns of their merch items are read with one query per chunk.
+    """
+    application_ids = (
+        applications.prefetch_related(None)
+        .order_by(*applications.query.order_by, "pk")
+        .values_list("pk", flat=True)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    # Ordering by merch repeats applications with several merch items.
+    exported = set()
+    for chunk in iter_chunks(application_ids, EXPORT_CHUNK_SIZE):
+        chunk = [pk for pk in dict.fromkeys(chunk) if pk not in exported]
+        exported.update(chunk)
+        lines = defaultdict(list)
+        for line in (
+            MerchApplication.objects.filter(pk__in=chunk)
+            .order_by("pk", "merch_in_applications__pk")
+            .values_list(*MERCH_APPLICATION_LINE_FIELDS)
+        ):
+            lines[line[0]].append(line)
+        for application_id in chunk:
+            for (
+                pk,
+                application_number,
+                tutor_first_name,
+                tutor_last_name,
+                merch_name,
+                merch_size,
+                quantity,
+                *ambassador,
+                created,
+            ) in lines[application_id]:
+                if merch_name is None:
+                    merch_name, merch_size, quantity = "Заявка без мерча", "-", 0
+                yield (
+                    pk,
+                    application_number,
+                    f"{tutor_first_name or ''} {tutor_last_name or ''}".strip(),
+                    merch_name,
+                    merch_size,
+                    quantity,
+                    *ambassador,
+                    created.isoformat(),
+                    YEAR_MONTHS[created.month - 1][2],
+                )
+
+
+def iter_promocode_rows(promocodes):
+    """
+    Yields rows of promocodes in the PROMOCODES_SHEET layout in the order
+    of the queryset (the ID breaks ties).
+    """
+    return (
+        promocodes.order_by(*promocodes.query.order_by, "pk")
+        .values_list(*PROMOCODE_FIELDS)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def iter_chunks(iterable, size: int):
+    """Yields lists of at most size items of the iterable."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def get_ambassador_lists(column: str, ambassador_ids) -> dict[int, list]:
+    """Returns {ambassador id: values} of a list column for the ambassadors."""
+    model, lookup = AMBASSADOR_EXPORT_LISTS[column]
+    values = defaultdict(list)
+    for ambassador_id, value in (
+        model.objects.filter(ambassador_id__in=ambassador_ids)
+        .order_by(lookup)
+        .values_list("ambassador_id", lookup)
+    ):
+        values[ambassador_id].append(value)
+    return values
+
+
+def iter_ambassador_records(ambassadors, columns):
+    """
+    Yields ambassadors as dicts with the columns (see AMBASSADOR_EXPORT_COLUMNS)
+    in the order of the queryset. Plain columns are read with one joined query
+    streamed in chunks, list columns (activities, promocodes) are loaded with
+    one query per chunk, so memory doesn't depend on the number of ambassadors.
+    """
+    fields = [column for column in columns if column in AMBASSADOR_EXPORT_FIELDS]
+    lists = [column for column in columns if column in AMBASSADOR_EXPORT_LISTS]
+    rows = (
+        ambassadors.prefetch_related(None)
+        .values_list("pk", *(AMBASSADOR_EXPORT_FIELDS[field] for field in fields))
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for chunk in iter_chunks(rows, EXPORT_CHUNK_SIZE):
+        ids = [row[0] for row in chunk]
+        values = {column: get_ambassador_lists(column, ids) for column in lists}
+        for pk, *row in chunk:
+            record = dict(zip(fields, row))
+            for column in lists:
+                record[column] = values[column].get(pk, [])
+            yield {column: record[column] for column in columns}
+
+
+def get_csv_row(record: dict) -> list:
+    """
+    Returns the values of an exported record for a CSV file: lists are joined
+    the way the import reads them, dates are in ISO 8601.
+    """
+    row = []
+    for value in record.values():
+        if isinstance(value, list):
+            value = ACTIVITY_SEPARATOR.join(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        row.append(value)
+    return row
+
+
+def iter_budget_rows(budget: dict | None):
+    """
+    Yields rows of the annual merch budget (in the get_year_budget format):
+    an ambassador with expenses by months and the year total per row, and the
+    row of totals in the end.
+    """
+    if budget is None:
+        return
+    for ambassador in budget["ambassadors"]:
+        yield (
+            ambassador["ambassador_name"],
+            *(
+                month["month_total"]
+                for month in ambassador["ambassador_months_budgets"]
+            ),
+            ambassador["ambassador_year_total"],
+        )
+    yield (
+        "Итого",
+        *(month["month_total"] for month in budget["months"]),
+        budget["year_total"],
+    )
+
+
+class Echo:
+    """File-like object which returns written values instead of storing them."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(columns, rows):
+    """Yields encoded CSV lines (with BOM for Excel) of the columns and rows."""
+    writer = csv.writer(Echo())
+    yield codecs.BOM_UTF8
+    yield writer.writerow(columns).encode()
+    for row in rows:
+        yield writer.writerow(row).encode()
+
+
+def iter_ndjson(records):
+    """Yields encoded lines of JSON objects, one per record."""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for record in records:
+        yield f"{encoder.encode(record)}\n".encode()
+
+
+def iter_xlsx(columns, rows, title: str):
+    """
+    Writes the rows into an XLSX file in write-only mode (rows are flushed to
+    a temporary file instead of being kept in memory) and yields its content
+    in chunks.
+    """
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(title)
+    worksheet.append(columns)
+    for row in rows:
+        worksheet.append(row)
+    with tempfile.TemporaryFile() as file:
+        workbook.save(file)
+        file.seek(0)
+        while chunk := file.read(FILE_CHUNK_SIZE):
+            yield chunk
+
+
+def get_file_format(request, formats: dict = FILE_FORMATS) -> str:
+    """Returns the export file format from the file_format query parameter."""
+    file_format = request.query_params.get("file_format", FILE_FORMAT_CSV).lower()
+    if file_format not in formats:
+        raise ValidationError({"file_format": f"Choose one of: {', '.join(formats)}."})
+    return file_format
+
+
+def get_export_columns(request, columns) -> list[str]:
+    """
+    Returns the columns selected by the comma-separated fields query parameter
+    in the requested order, all the columns by default.
+    """
+    fields = request.query_params.get("fields", "")
+    selected = list(dict.fromkeys(filter(None, map(str.strip, fields.split(",")))))
+    if not selected:
+        return list(columns)
+    unknown = [field for field in selected if field not in columns]
+    if unknown:
+        raise ValidationError(
+            {
+                "fields": f"Unknown fields: {', '.join(unknown)}. "
+                f"Choose from: {', '.join(columns)}."
+            }
+        )
+    return selected
+
+
+def file_response(
+    content, filename: str, file_format: str, content_type: str
+) -> StreamingHttpResponse:
+    """Returns a streaming response with the content as a dated attachment."""
+    return StreamingHttpResponse(
+        content,
+        content_type=content_type,
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="{filename}_{timezone.localdate()}'
+                f'.{file_format}"'
+            )
+        },
+    )
+
+
+def export_file_response(
+    layout: SheetLayout, rows, filename: str, file_format: str
+) -> StreamingHttpResponse:
+    """
+    Returns a streaming response with the rows in a CSV or XLSX file with
+    the columns of the layout.
+    """
+    if file_format == FILE_FORMAT_XLSX:
+        content = iter_xlsx(layout.columns, rows, layout.worksheet_name)
+    else:
+        content = iter_csv(layout.columns, rows)
+    return file_response(content, filename, file_format, FILE_FORMATS[file_format])
+
+
+def export_ambassadors_response(
+    ambassadors, columns, file_format: str
+) -> StreamingHttpResponse:
+    """
+    Returns a streaming response with the ambassadors in a CSV or NDJSON file
+    with the columns.
+    """
+    records = iter_ambassador_records(ambassadors, columns)
+    if file_format == FILE_FORMAT_NDJSON:
+        content = iter_ndjson(records)
+    else:
+        content = iter_csv(columns, map(get_csv_row, records))
+    return file_response(
+        content, "ambassadors", file_format, AMBASSADOR_FILE_FORMATS[file_format]
+    )
@@ -1,6 +1,13 @@
-from django.db.models import BooleanField, ExpressionWrapper, Q
+from datetime import timedelta
+
+from django.contrib.postgres.search import TrigramSimilarity, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import BooleanField, Exists, ExpressionWrapper, OuterRef, Q
+from django.utils import timezone
 from django_filters import rest_framework as rf_filters
+from rest_framework import filters
 
+from ambassadors.models import Ambassador, AmbassadorActivity
 from promo.models import Merch, MerchApplication, Promocode
 
 
@@ -10,12 +17,93 @@ class CharFilterInFilter(rf_filters.BaseInFilter, rf_filters.CharFilter):
     pass
 
 
+SEARCH_RANK_ORDERING = ["-is_start", "-similarity"]
+
+
+def rank_search_results(queryset, is_start: Q, similarity):
+    """
+    Orders search results: the ones matching is_start condition go first,
+    then (on PostgreSQL only) the most similar ones.
+    """
+    queryset = queryset.annotate(
+        is_start=ExpressionWrapper(is_start, output_field=BooleanField())
+    )
+    if connections[queryset.db].vendor != "postgresql":
+        return queryset.order_by("-is_start")
+    return queryset.annotate(similarity=similarity).order_by(*SEARCH_RANK_ORDERING)
+
+
+class TrigramSearchFilter(rf_filters.CharFilter):
+    """
+    Char filter searching by a partial occurrence (icontains) with ranking:
+    values starting with the entered string go first, then the most similar ones.
+
+    On PostgreSQL the search uses pg_trgm GIN indexes built on UPPER(field)
+    (the expression compared by icontains) and the ranking takes trigram
+    similarity into account. On SQLite (tests, local development) only the
+    prefix match is ranked and the search is case-sensitive for non-ASCII
+    letters.
+    """
+
+    def filter(self, queryset, value):
+        if not value:
+            return queryset
+        field_name = self.field_name
+        return rank_search_results(
+            queryset.filter(**{f"{field_name}__icontains": value}),
+            is_start=Q(**{f"{field_name}__istartswith": value}),
+            similarity=TrigramSimilarity(field_name, value),
+        )
+
+
+class SearchDocumentFilter(filters.SearchFilter):
+    """
+    Search filter by the search_document field of a model (lowercased text
+    made of the searched fields, the main one goes first), ?search= parameter.
+
+    Every entered word has to occur in the document. Documents starting with
+    the entered text go first, on PostgreSQL the rest is ranked by trigram word
+    similarity and the search uses a pg_trgm GIN index on the field.
+    """
+
+    search_description = "search by a partial occurrence, the best matches go first"
+
+    def filter_queryset(self, request, queryset, view):
+        terms = [term.lower() for term in self.get_search_terms(request)]
+        if not terms:
+            return queryset
+        for term in terms:
+            queryset = queryset.filter(search_document__contains=term)
+        value = " ".join(terms)
+        return rank_search_results(
+            queryset,
+            is_start=Q(search_document__startswith=value),
+            similarity=TrigramWordSimilarity(value, "search_document"),
+        )
+
+
+class SearchRankOrderingFilter(filters.OrderingFilter):
+    """
+    Ordering filter which keeps the ranking of the search filters when no
+    ordering is requested explicitly, the default ordering is used to break ties.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if self.ordering_param in request.query_params or (
+            "is_start" not in queryset.query.annotations
+        ):
+            return super().filter_queryset(request, queryset, view)
+        return queryset.order_by(
+            *queryset.query.order_by, *(self.get_default_ordering(view) or [])
+        )
+
+
 class MerchApplicationsFilter(rf_filters.FilterSet):
     """
     Class for filtering merch applications.
 
-    The filter for the 'application_number' field works on a partial occurrence
-    (istartswith and icontains).
+    The filter for the 'application_number' field works on a partial occurrence,
+    numbers starting with the entered value go first (see TrigramSearchFilter).
 
     Filters for fields 'ambassador', 'tutor' work by ID.
     The filter for the 'merch' field works by slug and accepts several comma-separated
@@ -26,9 +114,7 @@ class MerchApplicationsFilter(rf_filters.FilterSet):
     to the value of the 'created' field of each merch application.
     """
 
-    application_number = rf_filters.CharFilter(
-        method="startswith_contains_union_method"
-    )
+    application_number = TrigramSearchFilter()
     start_date = rf_filters.DateTimeFilter(field_name="created", lookup_expr="gte")
     end_date = rf_filters.DateTimeFilter(field_name="created", lookup_expr="lte")
     merch = CharFilterInFilter(field_name="merch__slug")
@@ -44,34 +130,13 @@ class MerchApplicationsFilter(rf_filters.FilterSet):
             "merch",
         ]
 
-    def startswith_contains_union_method(self, queryset, name, value):
-        """
-        When using sqlite DB, filtering will be case-sensitive;
-        when using PostgreSQL DB, filtering will be case-insensitive as it should be.
-        """
-        if not bool(value):
-            return queryset
-        return (
-            queryset.filter(
-                Q(application_number__istartswith=value)
-                | Q(application_number__icontains=value)
-            )
-            .annotate(
-                is_start=ExpressionWrapper(
-                    Q(application_number__istartswith=value),
-                    output_field=BooleanField(),
-                )
-            )
-            .order_by("-is_start")
-        )
-
 
 class PromocodeFilter(rf_filters.FilterSet):
     """
     Class for filtering promocodes.
 
-    The filter for the 'ambassador_name' works on a partial occurrence
-    (istartswith and icontains).
+    The filter for the 'ambassador_name' works on a partial occurrence,
+    names starting with the entered value go first (see TrigramSearchFilter).
 
     The filter for the 'ambassador_status' works by slug and accepts several
     comma-separated values, for example: ?ambassador_status=active,paused (in the end
@@ -82,9 +147,7 @@ class PromocodeFilter(rf_filters.FilterSet):
     to the value of the 'created' field of each merch application.
     """
 
-    ambassador_name = rf_filters.CharFilter(
-        field_name="ambassador__name", method="startswith_contains_union_method"
-    )
+    ambassador_name = TrigramSearchFilter(field_name="ambassador__name")
     ambassador_status = CharFilterInFilter(field_name="ambassador__status__slug")
     start_date = rf_filters.DateTimeFilter(field_name="created", lookup_expr="gte")
     end_date = rf_filters.DateTimeFilter(field_name="created", lookup_expr="lte")
@@ -93,33 +156,13 @@ class PromocodeFilter(rf_filters.FilterSet):
         model = Promocode
         fields = ["ambassador_name", "ambassador_status", "start_date", "end_date"]
 
-    def startswith_contains_union_method(self, queryset, name, value):
-        """
-        When using sqlite DB, filtering will be case-sensitive;
-        when using PostgreSQL DB, filtering will be case-insensitive as it should be.
-        """
-        if not bool(value):
-            return queryset
-        return (
-            queryset.filter(
-                Q(ambassador__name__istartswith=value)
-                | Q(ambassador__name__icontains=value)
-            )
-            .annotate(
-                is_start=ExpressionWrapper(
-                    Q(ambassador__name__istartswith=value),
-                    output_field=BooleanField(),
-                )
-            )
-            .order_by("-is_start")
-        )
-
 
 class MerchFilter(rf_filters.FilterSet):
     """
     Class for filtering merch species.
 
-    The filter for the 'name' works on a partial occurrence (istartswith and icontains).
+    The filter for the 'name' works on a partial occurrence, names starting with
+    the entered value go first (see TrigramSearchFilter).
 
     The filter for the 'size' works by exact match and accepts several comma-separated
     values, for example: ?size=L,M (in the end of URL).
@@ -132,7 +175,7 @@ class MerchFilter(rf_filters.FilterSet):
     the entered value.
     """
 
-    name = rf_filters.CharFilter(method="startswith_contains_union_method")
+    name = TrigramSearchFilter()
     size = CharFilterInFilter()
     category = CharFilterInFilter(field_name="category__slug")
     min_cost = rf_filters.NumberFilter(method="get_min_cost")
@@ -142,36 +185,130 @@ class MerchFilter(rf_filters.FilterSet):
         model = Merch
         fields = ["name", "size", "category", "min_cost", "max_cost"]
 
-    def startswith_contains_union_method(self, queryset, name, value):
-        """
-        When using sqlite DB, filtering will be case-sensitive;
-        when using PostgreSQL DB, filtering will be case-insensitive as it should be.
-        """
-        if not bool(value):
-            return queryset
-        return (
-            queryset.filter(Q(name__istartswith=value) | Q(name__icontains=value))
-            .annotate(
-                is_start=ExpressionWrapper(
-                    Q(name__istartswith=value),
-                    output_field=BooleanField(),
-                )
-            )
-            .order_by("-is_start")
-        )
-
     def get_min_cost(self, queryset, name, value):
         if value <= 0:
             return queryset
-        merch_ids = [obj.pk for obj in queryset if obj.cost >= value]
-        if merch_ids:
-            return queryset.filter(pk__in=merch_ids)
-        return queryset.none()
+        return queryset.filter(cost__gte=value)
 
     def get_max_cost(self, queryset, name, value):
         if value <= 0:
             return queryset
-        merch_ids = [obj.pk for obj in queryset if obj.cost <= value]
-        if merch_ids:
-            return queryset.filter(pk__in=merch_ids)
-        return queryset.none()
+        return queryset.filter(cost__lte=value)
+
+
+class AmbassadorFilter(rf_filters.FilterSet):
+    """
+    Class for filtering ambassadors.
+
+    Filters for the 'status', 'program', 'purpose' and 'activity' fields work by
+    slug and accept several comma-separated values, for example:
+    ?status=active,paused (in the end of URL). An ambassador matches the
+    'activity' filter if they have at least one of the entered activities.
+
+    Filters 'country' and 'city' work by exact match of the address fields and
+    accept several comma-separated values too.
+
+    Filters 'gender', 'onboarding_status' work by exact match, the filter for
+    the 'tutor' field works by ID.
+
+    Filters 'start_date' and 'end_date' take datetime string
+    (input examples: "2020-01-01", "2024-03-04T16:20:55") as input and compare it
+    to the value of the 'created' field of each ambassador.
+
+    Filters by the precalculated stats: 'min_review_count', 'min_content_count',
+    'min_merch_spend' take the minimal values, 'no_content_days' takes a number
+    of days and keeps ambassadors without content for that period (for example,
+    ?no_content_days=90), 'guide_status' accepts several comma-separated values.
+
+    The filtered columns are covered by composite indexes together with
+    'created' (see Ambassador.Meta.indexes), so filtered lists sorted by
+    the registration date are read by index scans.
+    """
+
+    status = CharFilterInFilter(field_name="status__slug")
+    program = CharFilterInFilter(field_name="program__slug")
+    purpose = CharFilterInFilter(field_name="purpose__slug")
+    activity = CharFilterInFilter(method="get_activity")
+    country = CharFilterInFilter(field_name="address__country")
+    city = CharFilterInFilter(field_name="address__city")
+    start_date = rf_filters.DateTimeFilter(field_name="created", lookup_expr="gte")
+    end_date = rf_filters.DateTimeFilter(field_name="created", lookup_expr="lte")
+    min_review_count = rf_filters.NumberFilter(
+        field_name="stats__review_count", lookup_expr="gte"
+    )
+    min_content_count = rf_filters.NumberFilter(
+        field_name="stats__content_count", lookup_expr="gte"
+    )
+    min_merch_spend = rf_filters.NumberFilter(
+        field_name="stats__merch_spend", lookup_expr="gte"
+    )
+    no_content_days = rf_filters.NumberFilter(method="get_no_content_days")
+    guide_status = CharFilterInFilter(field_name="stats__guide_status")
+
+    class Meta:
+        model = Ambassador
+        fields = [
+            "status",
+            "program",
+            "purpose",
+            "gender",
+            "onboarding_status",
+            "tutor",
+            "activity",
+            "country",
+            "city",
+            "start_date",
+            "end_date",
+            "min_review_count",
+            "min_content_count",
+            "min_merch_spend",
+            "no_content_days",
+            "guide_status",
+        ]
+
+    def get_no_content_days(self, queryset, name, value):
+        since = timezone.now() - timedelta(days=float(value))
+        return queryset.filter(
+            Q(stats__last_content_date__lt=since)
+            | Q(stats__last_content_date__isnull=True)
+        )
+
+    def get_activity(self, queryset, name, value):
+        # EXISTS instead of a join keeps one row per ambassador without DISTINCT.
+        return queryset.filter(
+            Exists(
+                AmbassadorActivity.objects.filter(
+                    ambassador=OuterRef("pk"), activity__slug__in=value
+                )
+            )
+        )
+
+
+class ContentPageFilter(rf_filters.FilterSet):
+    """
+    Class for filtering ambassadors on the content page.
+
+    Filters 'review_count', 'content_count' and 'sending_merch' work by exact
+    match of the values computed for each ambassador, filters
+    'min_review_count' and 'min_content_count' take the minimal numbers.
+    """
+
+    review_count = rf_filters.NumberFilter()
+    content_count = rf_filters.NumberFilter()
+    min_review_count = rf_filters.NumberFilter(
+        field_name="review_count", lookup_expr="gte"
+    )
+    min_content_count = rf_filters.NumberFilter(
+        field_name="content_count", lookup_expr="gte"
+    )
+    sending_merch = rf_filters.NumberFilter()
+
+    class Meta:
+        model = Ambassador
+        fields = [
+            "review_count",
+            "content_count",
+            "min_review_count",
+            "min_content_count",
+            "sending_merch",
+        ]
@@ -1,12 +1,24 @@
+import hashlib
+import json
 import os
+import threading
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from itertools import chain, islice
 from pathlib import Path
+from typing import NamedTuple
 
+from django.db.models import Q
+from django.utils import timezone
 from dotenv import load_dotenv
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
 
 from .loggers import logger
 from .utils import YEAR_MONTHS
@@ -20,8 +32,18 @@ from .utils import YEAR_MONTHS
 SPREADSHEET_PUBLIC_ID = "1VfxFH8l9bKNxD90NCAab_sqVL8nBmDWWgulxLOGOI7A"
 SPREADSHEET_PRIVATE_ID = "1l43PvR4rRxh-Umu7zeeRMO_XYJAzf75ZJhjGBgtr-5A"
 CELL_RANGE = "{sheet_name}!{cells}"  # cells pattern example: 'A1:D5'
+SPREADSHEET_URL = "https://docs.google.com/spreadsheets/d/{spreadsheet_id}/edit"
 API_KEY = os.getenv("GOOGLE_API_KEY")
 
+SHEETS_CHUNK_SIZE = 500  # rows written by one API call
+SHEETS_MAX_RETRIES = 5
+SHEETS_RETRY_BACKOFF = 1  # seconds, doubled after every failed attempt
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+CREDENTIALS_REFRESH_MARGIN = timedelta(minutes=5)
+# Objects modified shortly before the last sync are checked again, so clock
+# differences of the servers can't hide a change.
+SYNC_WATERMARK_OVERLAP = timedelta(minutes=1)
+
 SCOPES = [
     "https://www.googleapis.com/auth/spreadsheets",
     "https://www.googleapis.com/auth/drive",
@@ -70,14 +92,75 @@ def authenticate_sheets_by_oauth_credentials():
     return credentials
 
 
+class GoogleClientProvider:
+    """
+    Process-wide provider of Google Sheets and Google Drive services.
+    Credentials are loaded once and refreshed under a lock only when they are
+    close to expiry. Services are built once per thread (httplib2 connections
+    are not thread-safe) and share one authorized HTTP connection pool.
+    """
+
+    def __init__(
+        self,
+        load_credentials=authenticate_sheets_by_oauth_credentials,
+        refresh_margin: timedelta = CREDENTIALS_REFRESH_MARGIN,
+        token_path: str = "token.json",
+    ):
+        self.load_credentials = load_credentials
+        self.refresh_margin = refresh_margin
+        self.token_path = token_path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._credentials = None
+
+    def get_credentials(self):
+        """Returns loaded credentials refreshing them if they expire soon."""
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = self.load_credentials()
+                logger.debug("Google credentials loaded")
+            elif self._expires_soon(self._credentials):
+                self._credentials.refresh(Request())
+                with open(self.token_path, "w") as token:
+                    token.write(self._credentials.to_json())
+                logger.debug("Google credentials refreshed")
+            return self._credentials
+
+    def get_services(self) -> tuple:
+        """Returns (sheets, drive) services built for the current thread."""
+        credentials = self.get_credentials()
+        local = self._local
+        if getattr(local, "credentials", None) is not credentials:
+            http = AuthorizedHttp(credentials, http=build_http())
+            local.services = (
+                build("sheets", "v4", http=http),
+                build("drive", "v3", http=http),
+            )
+            local.credentials = credentials
+        return local.services
+
+    def reset(self):
+        """Forgets credentials, so they are loaded again on the next call."""
+        with self._lock:
+            self._credentials = None
+
+    def _expires_soon(self, credentials) -> bool:
+        if credentials.expiry is None:
+            return False
+        # google-auth keeps the expiry as a naive UTC datetime.
+        now = datetime.now(dt_timezone.utc).replace(tzinfo=None)
+        return credentials.expiry - now < self.refresh_margin
+
+
+google_clients = GoogleClientProvider()
+
+
 def get_private_sheet_values(sheet_id: str, cell_range: str) -> list[str] | None:
     """
     Returns values from a selected range of cells in a private spreadsheet using OAuth.
     """
     try:
-        service = build(
-            "sheets", "v4", credentials=authenticate_sheets_by_oauth_credentials()
-        )
+        service, _ = get_google_services()
         sheets = service.spreadsheets()
         result = sheets.values().get(spreadsheetId=sheet_id, range=cell_range).execute()
         values = result.get("values", [])
@@ -90,9 +173,7 @@ def write_to_private_sheet(
     sheet_id: str, sheet_name: str, first_row: int, last_row: int
 ) -> None:
     try:
-        service = build(
-            "sheets", "v4", credentials=authenticate_sheets_by_oauth_credentials()
-        )
+        service, _ = get_google_services()
         sheets = service.spreadsheets()
 
         for row in range(first_row, last_row + 1):
@@ -132,9 +213,7 @@ def write_to_private_sheet(
 def create_new_sheet_example(title: str) -> str:
     """Creates the Sheet the user has access to using credentials.json file."""
     try:
-        service = build(
-            "sheets", "v4", credentials=authenticate_sheets_by_oauth_credentials()
-        )
+        service, _ = get_google_services()
         spreadsheet_properties = {
             "properties": {"title": title, "locale": "ru", "timeZone": "Europe/Moscow"},
             "sheets": [{"properties": {"title": "Заявки на мерч"}}],
@@ -148,192 +227,431 @@ def create_new_sheet_example(title: str) -> str:
         return error
 
 
-def create_merch_applications_sheet(all_applications_qs) -> str:
-    """Creates a new spreadsheet and writes a list of merch applications into it."""
-    try:
-        service_sheets = build(
-            "sheets", "v4", credentials=authenticate_sheets_by_oauth_credentials()
-        )
-        service_drive = build(
-            "drive", "v3", credentials=authenticate_sheets_by_oauth_credentials()
-        )
-        sheets = service_sheets.spreadsheets()
-        worksheet_name = "Заявки на мерч"
-        spreadsheet_properties = {
-            "properties": {
-                "title": "Отправка мерча",
-                "locale": "ru",
-                "timeZone": "Europe/Moscow",
-            },
-            "sheets": [{"properties": {"title": worksheet_name}}],
-        }
-        spreadsheet = sheets.create(body=spreadsheet_properties).execute()
-        logger.debug("Empty spreadsheet for merch applications created")
+class SheetExportError(Exception):
+    """
+    Raised when a chunk of rows could not be written even after retries.
+    Keeps the number of already filled sheet rows to resume the export.
+    """
 
-        spreadsheet_id = spreadsheet.get("spreadsheetId")
+    def __init__(self, spreadsheet_id: str, rows_written: int, error: Exception):
+        super().__init__(
+            f"Export to spreadsheet {spreadsheet_id} stopped after "
+            f"{rows_written} rows: {error}"
+        )
+        self.spreadsheet_id = spreadsheet_id
+        self.rows_written = rows_written
+        self.error = error
+
+
+class SheetLayout(NamedTuple):
+    """Title, worksheet name and column names of an exported spreadsheet."""
+
+    title: str
+    worksheet_name: str
+    columns: tuple[str, ...]
+
+
+MERCH_APPLICATIONS_SHEET = SheetLayout(
+    title="Отправка мерча",
+    worksheet_name="Заявки на мерч",
+    columns=(
+        "id заявки",
+        "номер заявки",
+        "куратор",
+        "название мерча",
+        "размер",
+        "количество",
+        "размер толстовки",
+        "размер носков",
+        "ФИО",
+        "индекс",
+        "страна",
+        "город",
+        "улица, дом, квартира",
+        "телефон",
+        "дата и время создания",
+        "месяц",
+    ),
+)
+
+PROMOCODES_SHEET = SheetLayout(
+    title="Список промокодов",
+    worksheet_name="Промокоды",
+    columns=(
+        "id промокода",
+        "промокод",
+        "активный промокод",
+        "амбассадор",
+        "статус амбассадора",
+        "телеграм амбассадора",
+    ),
+)
+
+
+def get_google_services() -> tuple:
+    """Returns cached Google Sheets and Google Drive services."""
+    return google_clients.get_services()
+
+
+def execute_with_retries(
+    request, retries: int = SHEETS_MAX_RETRIES, backoff: float = SHEETS_RETRY_BACKOFF
+) -> dict:
+    """
+    Executes a Google API request, retrying rate limit, server and connection
+    errors with exponential backoff.
+    """
+    for attempt in range(retries):
+        try:
+            return request.execute()
+        except HttpError as error:
+            if error.resp.status not in RETRYABLE_STATUSES:
+                raise
+            reason = error
+        except OSError as error:
+            reason = error
+        delay = backoff * 2**attempt
+        logger.warning(f"Retrying in {delay} s after an error: {reason}")
+        time.sleep(delay)
+    return request.execute()
+
+
+def create_spreadsheet(sheets, service_drive, layout: SheetLayout, **retry) -> str:
+    """Creates an empty spreadsheet readable by anyone and returns its ID."""
+    spreadsheet_properties = {
+        "properties": {
+            "title": layout.title,
+            "locale": "ru",
+            "timeZone": "Europe/Moscow",
+        },
+        "sheets": [{"properties": {"title": layout.worksheet_name}}],
+    }
+    spreadsheet = execute_with_retries(
+        sheets.create(body=spreadsheet_properties), **retry
+    )
+    logger.debug(f"Empty spreadsheet '{layout.title}' created")
+
+    spreadsheet_id = spreadsheet.get("spreadsheetId")
+    execute_with_retries(
         service_drive.permissions().create(
             fileId=spreadsheet_id, body={"type": "anyone", "role": "reader"}
-        ).execute()
-        logger.debug("Permission created for anyone, role - reader")
-
-        column_names = [
-            (
-                "id заявки",
-                "номер заявки",
-                "куратор",
-                "название мерча",
-                "размер",
-                "количество",
-                "размер толстовки",
-                "размер носков",
-                "ФИО",
-                "индекс",
-                "страна",
-                "город",
-                "улица, дом, квартира",
-                "телефон",
-                "дата и время создания",
-                "месяц",
+        ),
+        **retry,
+    )
+    logger.debug("Permission created for anyone, role - reader")
+    return spreadsheet_id
+
+
+def write_rows(
+    sheets,
+    spreadsheet_id: str,
+    worksheet_name: str,
+    rows,
+    first_row: int = 1,
+    chunk_size: int = SHEETS_CHUNK_SIZE,
+    progress=None,
+    **retry,
+) -> int:
+    """
+    Writes rows into the worksheet starting from first_row with one batchUpdate
+    call per chunk of rows. Every chunk is written into an explicit range, so
+    a retried chunk never duplicates rows. Calls progress with the number of
+    filled sheet rows after every chunk and returns this number.
+    """
+    rows = iter(rows)
+    rows_written = first_row - 1
+    while chunk := [list(row) for row in islice(rows, chunk_size)]:
+        body = {
+            "valueInputOption": "RAW",
+            "data": [
+                {
+                    "range": f"{worksheet_name}!A{rows_written + 1}",
+                    "majorDimension": "ROWS",
+                    "values": chunk,
+                }
+            ],
+        }
+        try:
+            execute_with_retries(
+                sheets.values().batchUpdate(spreadsheetId=spreadsheet_id, body=body),
+                **retry,
             )
-        ]
-        value_range_body = {"majorDimension": "ROWS", "values": column_names}
-        sheets.values().update(
-            spreadsheetId=spreadsheet_id,
-            valueInputOption="RAW",
-            range=f"{worksheet_name}!A1",
-            body=value_range_body,
-        ).execute()
-        logger.debug("Column names inserted into the spreadsheet")
-
-        all_applications_list = list(all_applications_qs)
-        for row in range(2, len(all_applications_list) + 2):
-            try:
-                item = all_applications_list.pop()
-                merch_inside = item.merch_in_applications.all()
-                if not merch_inside:
-                    logger.error("Application without merch items inside")
-                merch_name = (
-                    item.merch_in_applications.all()[0].merch.name
-                    if merch_inside
-                    else "Заявка без мерча"
-                )
-                merch_size = (
-                    item.merch_in_applications.all()[0].merch.size
-                    if merch_inside
-                    else "-"
-                )
-                merch_quantity = (
-                    item.merch_in_applications.all()[0].quantity if merch_inside else 0
-                )
-                values = [
-                    (
-                        item.id,
-                        item.application_number,
-                        item.tutor.get_full_name(),
-                        merch_name,
-                        merch_size,
-                        merch_quantity,
-                        item.ambassador.clothing_size,
-                        item.ambassador.shoe_size,
-                        item.ambassador.name,
-                        item.ambassador.address.postal_code,
-                        item.ambassador.address.country,
-                        item.ambassador.address.city,
-                        item.ambassador.address.street,
-                        item.ambassador.phone_number,
-                        item.created.isoformat(),
-                        YEAR_MONTHS[item.created.month - 1][2],
-                    )
-                ]
-                sheets.values().update(
-                    spreadsheetId=spreadsheet_id,
-                    valueInputOption="RAW",
-                    range=f"{worksheet_name}!A{row}",
-                    body={"values": values},
-                ).execute()
-            except Exception as error:
-                logger.error(f"item - {item}, error - {str(error)}")
-                return error
+        except (HttpError, OSError) as error:
+            raise SheetExportError(spreadsheet_id, rows_written, error) from error
+        rows_written += len(chunk)
+        logger.debug(f"{rows_written} rows written into the spreadsheet")
+        if progress is not None:
+            progress(rows_written)
+    return rows_written
+
+
+def export_queryset_to_sheet(
+    queryset,
+    get_row,
+    layout: SheetLayout,
+    services: tuple | None = None,
+    spreadsheet_id: str | None = None,
+    rows_written: int = 0,
+    chunk_size: int = SHEETS_CHUNK_SIZE,
+    progress=None,
+    **retry,
+) -> str:
+    """
+    Streams the queryset into a spreadsheet in chunks and returns its link.
+    To resume an interrupted export pass the spreadsheet_id and rows_written
+    values of the raised SheetExportError.
+    """
+    service_sheets, service_drive = services or get_google_services()
+    sheets = service_sheets.spreadsheets()
+    if spreadsheet_id is None:
+        spreadsheet_id = create_spreadsheet(sheets, service_drive, layout, **retry)
+        rows_written = 0
+
+    rows = (get_row(item) for item in queryset.iterator(chunk_size=chunk_size))
+    if rows_written:
+        # The first sheet row holds the column names.
+        rows = islice(rows, rows_written - 1, None)
+    else:
+        rows = chain([layout.columns], rows)
+    write_rows(
+        sheets,
+        spreadsheet_id,
+        layout.worksheet_name,
+        rows,
+        first_row=rows_written + 1,
+        chunk_size=chunk_size,
+        progress=progress,
+        **retry,
+    )
+    return SPREADSHEET_URL.format(spreadsheet_id=spreadsheet_id)
+
+
+def get_row_hash(row) -> str:
+    """Returns the hash of spreadsheet row values to detect changed rows."""
+    return hashlib.sha256(
+        json.dumps(list(row), ensure_ascii=False, default=str).encode()
+    ).hexdigest()
+
+
+def group_consecutive_rows(rows: dict) -> list:
+    """
+    Groups {row_number: values} into [(first_row_number, [values, ...])] ranges
+    of consecutive rows, so that appended rows are sent as one range.
+    """
+    ranges = []
+    for row_number in sorted(rows):
+        if ranges and ranges[-1][0] + len(ranges[-1][1]) == row_number:
+            ranges[-1][1].append(rows[row_number])
+        else:
+            ranges.append((row_number, [rows[row_number]]))
+    return ranges
 
-        return spreadsheet.get("spreadsheetUrl")
-    except HttpError as error:
+
+class SheetSyncWriter:
+    """
+    Collects new, changed and deleted rows of a persistent spreadsheet and
+    writes them with one batchUpdate call per chunk. The state of the written
+    rows is saved after every call, so an interrupted sync continues from it.
+    """
+
+    def __init__(self, sheets, sync, layout: SheetLayout, chunk_size, **retry):
+        self.sheets = sheets
+        self.sync = sync
+        self.layout = layout
+        self.chunk_size = chunk_size
+        self.retry = retry
+        self.next_row = sync.next_row
+        self.values = {}
+        self.new_rows = []
+        self.changed_rows = []
+        self.deleted_object_ids = []
+        self.rows_written = 0
+
+    def add(self, object_id, values, content_hash, row_number=None):
+        """Adds a row of a new object or a changed row of a synced object."""
+        if row_number is None:
+            row_number = self.next_row
+            self.next_row += 1
+            self.new_rows.append((object_id, row_number, content_hash))
+        else:
+            self.changed_rows.append((object_id, row_number, content_hash))
+        self.values[row_number] = list(values)
+        if len(self.values) >= self.chunk_size:
+            self.flush()
+
+    def clear(self, object_id, row_number):
+        """Clears the row of a deleted object."""
+        self.values[row_number] = [""] * len(self.layout.columns)
+        self.deleted_object_ids.append(object_id)
+        if len(self.values) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the collected rows into the spreadsheet."""
+        if not self.values:
+            return
+        data = [
+            {
+                "range": f"{self.layout.worksheet_name}!A{row_number}",
+                "majorDimension": "ROWS",
+                "values": values,
+            }
+            for row_number, values in group_consecutive_rows(self.values)
+        ]
+        try:
+            execute_with_retries(
+                self.sheets.values().batchUpdate(
+                    spreadsheetId=self.sync.spreadsheet_id,
+                    body={"valueInputOption": "RAW", "data": data},
+                ),
+                **self.retry,
+            )
+        except (HttpError, OSError) as error:
+            raise SheetExportError(
+                self.sync.spreadsheet_id, self.rows_written, error
+            ) from error
+        self.sync.save_rows(self.new_rows, self.changed_rows, self.next_row)
+        self.sync.delete_rows(self.deleted_object_ids)
+        self.rows_written += len(self.values)
+        logger.debug(f"{self.rows_written} rows synced into the spreadsheet")
+        self.values, self.new_rows, self.changed_rows = {}, [], []
+        self.deleted_object_ids = []
+
+
+def sync_queryset_to_sheet(
+    sync,
+    queryset,
+    get_row,
+    layout: SheetLayout,
+    services: tuple | None = None,
+    chunk_size: int = SHEETS_CHUNK_SIZE,
+    progress=None,
+    modified_fields: tuple = (),
+    **retry,
+) -> str:
+    """
+    Keeps the persistent spreadsheet of the sync up to date with the queryset
+    and returns its link. Only rows of new and changed objects are written
+    (changes are detected by hashes of the row values), rows of deleted objects
+    are cleared. The spreadsheet is created on the first sync.
+
+    modified_fields are lookups of modification times of the data in the rows
+    (e.g. "modified", "ambassador__modified"). With them only objects modified
+    since the previous sync and objects without rows are read and hashed,
+    deleted objects are found by the difference of the IDs.
+    """
+    service_sheets, service_drive = services or get_google_services()
+    sheets = service_sheets.spreadsheets()
+    if not sync.spreadsheet_id:
+        sync.spreadsheet_id = create_spreadsheet(sheets, service_drive, layout, **retry)
+        write_rows(
+            sheets,
+            sync.spreadsheet_id,
+            layout.worksheet_name,
+            [layout.columns],
+            **retry,
+        )
+        sync.next_row = 2
+        sync.save(update_fields=["spreadsheet_id", "next_row"])
+
+    started = timezone.now()
+    row_index = sync.get_row_index()
+    object_ids = set(
+        queryset.prefetch_related(None).values_list("pk", flat=True).iterator()
+    )
+    candidates = queryset
+    if sync.synced is not None and modified_fields:
+        since = sync.synced - SYNC_WATERMARK_OVERLAP
+        changed = Q(pk__in=object_ids - row_index.keys())
+        for field in modified_fields:
+            changed |= Q(**{f"{field}__gte": since})
+        candidates = queryset.filter(changed)
+
+    writer = SheetSyncWriter(sheets, sync, layout, chunk_size, **retry)
+    processed = 0
+    for item in candidates.iterator(chunk_size=chunk_size):
+        values = get_row(item)
+        content_hash = get_row_hash(values)
+        row_number, synced_hash = row_index.get(item.pk, (None, None))
+        if content_hash != synced_hash:
+            writer.add(item.pk, values, content_hash, row_number)
+        processed += 1
+        if progress is not None and processed % chunk_size == 0:
+            progress(processed)
+    for object_id in row_index.keys() - object_ids:
+        writer.clear(object_id, row_index[object_id][0])
+    writer.flush()
+
+    # Changes made during the sync are checked by the next one.
+    sync.synced = started
+    sync.save(update_fields=["synced"])
+    if progress is not None:
+        progress(len(object_ids))
+    return SPREADSHEET_URL.format(spreadsheet_id=sync.spreadsheet_id)
+
+
+def get_merch_application_row(item) -> tuple:
+    """Returns the spreadsheet row of a merch application."""
+    merch_inside = item.merch_in_applications.all()
+    if merch_inside:
+        merch_name = merch_inside[0].merch.name
+        merch_size = merch_inside[0].merch.size
+        merch_quantity = merch_inside[0].quantity
+    else:
+        logger.error(f"Application without merch items inside - {item}")
+        merch_name, merch_size, merch_quantity = "Заявка без мерча", "-", 0
+    return (
+        item.id,
+        item.application_number,
+        item.tutor.get_full_name() if item.tutor else "",
+        merch_name,
+        merch_size,
+        merch_quantity,
+        item.ambassador.clothing_size,
+        item.ambassador.shoe_size,
+        item.ambassador.name,
+        item.ambassador.address.postal_code,
+        item.ambassador.address.country,
+        item.ambassador.address.city,
+        item.ambassador.address.street,
+        item.ambassador.phone_number,
+        item.created.isoformat(),
+        YEAR_MONTHS[item.created.month - 1][2],
+    )
+
+
+def get_promocode_row(item) -> tuple:
+    """Returns the spreadsheet row of a promocode."""
+    return (
+        item.id,
+        item.code,
+        item.is_active,
+        item.ambassador.name,
+        item.ambassador.status.name,
+        item.ambassador.telegram_id,
+    )
+
+
+def create_merch_applications_sheet(all_applications_qs, **kwargs) -> str:
+    """Creates a new spreadsheet and writes a list of merch applications into it."""
+    try:
+        return export_queryset_to_sheet(
+            all_applications_qs,
+            get_merch_application_row,
+            MERCH_APPLICATIONS_SHEET,
+            **kwargs,
+        )
+    except (HttpError, SheetExportError) as error:
         logger.error(f"An error occurred: {error}")
         return error
 
 
-def create_promocodes_sheet(all_promocodes_qs) -> str:
+def create_promocodes_sheet(all_promocodes_qs, **kwargs) -> str:
     """Creates a new spreadsheet and writes a list of promocodes into it."""
     try:
-        service_sheets = build(
-            "sheets", "v4", credentials=authenticate_sheets_by_oauth_credentials()
+        return export_queryset_to_sheet(
+            all_promocodes_qs, get_promocode_row, PROMOCODES_SHEET, **kwargs
         )
-        service_drive = build(
-            "drive", "v3", credentials=authenticate_sheets_by_oauth_credentials()
-        )
-        sheets = service_sheets.spreadsheets()
-        worksheet_name = "Промокоды"
-        spreadsheet_properties = {
-            "properties": {
-                "title": "Список промокодов",
-                "locale": "ru",
-                "timeZone": "Europe/Moscow",
-            },
-            "sheets": [{"properties": {"title": worksheet_name}}],
-        }
-        spreadsheet = sheets.create(body=spreadsheet_properties).execute()
-        logger.debug("Empty spreadsheet for merch applications created")
-
-        spreadsheet_id = spreadsheet.get("spreadsheetId")
-        service_drive.permissions().create(
-            fileId=spreadsheet_id, body={"type": "anyone", "role": "reader"}
-        ).execute()
-        logger.debug("Permission created for anyone, role - reader")
-
-        column_names = [
-            (
-                "id промокода",
-                "промокод",
-                "активный промокод",
-                "амбассадор",
-                "статус амбассадора",
-                "телеграм амбассадора",
-            )
-        ]
-        value_range_body = {"majorDimension": "ROWS", "values": column_names}
-        sheets.values().update(
-            spreadsheetId=spreadsheet_id,
-            valueInputOption="RAW",
-            range=f"{worksheet_name}!A1",
-            body=value_range_body,
-        ).execute()
-        logger.debug("Column names inserted into the spreadsheet")
-
-        all_promocodes_qs = list(all_promocodes_qs)
-        for row in range(2, len(all_promocodes_qs) + 2):
-            try:
-                item = all_promocodes_qs.pop()
-                values = [
-                    (
-                        item.id,
-                        item.code,
-                        item.is_active,
-                        item.ambassador.name,
-                        item.ambassador.status.name,
-                        item.ambassador.telegram_id,
-                    )
-                ]
-                sheets.values().update(
-                    spreadsheetId=spreadsheet_id,
-                    valueInputOption="RAW",
-                    range=f"{worksheet_name}!A{row}",
-                    body={"values": values},
-                ).execute()
-            except Exception as error:
-                logger.error(f"item - {item}, error - {str(error)}")
-                return error
-
-        return spreadsheet.get("spreadsheetUrl")
-    except HttpError as error:
+    except (HttpError, SheetExportError) as error:
         logger.error(f"An error occurred: {error}")
         return error
 
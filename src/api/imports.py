@@ -0,0 +1,348 @@
+import csv
+import io
+import json
+import os
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import DatabaseError, transaction
+from rest_framework.exceptions import ValidationError
+
+from .dictionaries import dictionaries
+from .loggers import logger
+from ambassadors.models import (
+    Activity,
+    Address,
+    Ambassador,
+    AmbassadorActivity,
+    AmbassadorStats,
+    Program,
+    Purpose,
+    Status,
+)
+
+IMPORT_FORMAT_CSV = "csv"
+IMPORT_FORMAT_JSON = "json"
+IMPORT_FORMAT_NDJSON = "ndjson"
+IMPORT_FORMATS = (IMPORT_FORMAT_CSV, IMPORT_FORMAT_JSON, IMPORT_FORMAT_NDJSON)
+IMPORT_BATCH_SIZE = 1000
+IMPORT_CHUNK_SIZE = 64 * 1024
+JSON_SEPARATORS = " \t\r\n,"
+
+AMBASSADOR_IMPORT_FIELDS = (
+    "name",
+    "gender",
+    "clothing_size",
+    "shoe_size",
+    "education",
+    "job",
+    "email",
+    "phone_number",
+    "telegram_id",
+    "whatsapp",
+    "blog_link",
+    "personal_purpose",
+    "about_me",
+)
+ADDRESS_IMPORT_FIELDS = ("postal_code", "country", "city", "street")
+# Fields rewritten when an ambassador with the same email already exists
+# (status, tutor, onboarding status and comment are kept).
+AMBASSADOR_UPDATE_FIELDS = (
+    *(field for field in AMBASSADOR_IMPORT_FIELDS if field != "email"),
+    "program",
+    "purpose",
+    "search_document",
+    "modified",
+)
+# Record key: model field validating it
+RECORD_FIELDS = (
+    *((name, Ambassador._meta.get_field(name)) for name in AMBASSADOR_IMPORT_FIELDS),
+    *((name, Address._meta.get_field(name)) for name in ADDRESS_IMPORT_FIELDS),
+    ("program", Program._meta.get_field("name")),
+    ("purpose", Purpose._meta.get_field("name")),
+)
+DEFAULT_STATUS_SLUG = "active"
+# Activities in CSV files are separated by commas.
+ACTIVITY_SEPARATOR = ","
+
+
+class ImportReport:
+    """Numbers of imported ambassadors and errors of the rejected rows."""
+
+    def __init__(self):
+        self.total = 0
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+
+    def add_error(self, row: int, errors: dict):
+        self.errors.append({"row": row, "errors": errors})
+
+    def iter_error_rows(self):
+        """Yields (row, field, message) for every error."""
+        for error in self.errors:
+            for field, messages in error["errors"].items():
+                for message in messages:
+                    yield error["row"], field, message
+
+
+def get_import_format(file_format: str | None, filename: str = "") -> str:
+    """
+    Returns the import file format: the requested one or the one matching
+    the file extension.
+    """
+    if not file_format:
+        file_format = os.path.splitext(filename)[1].lstrip(".")
+    file_format = file_format.lower()
+    if file_format not in IMPORT_FORMATS:
+        raise ValidationError(
+            {"file_format": f"Choose one of: {', '.join(IMPORT_FORMATS)}."}
+        )
+    return file_format
+
+
+def iter_json_records(file, chunk_size: int = IMPORT_CHUNK_SIZE):
+    """
+    Yields objects of a JSON array reading the file by chunks, so the whole
+    file is never kept in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith("["):
+        raise ValidationError({"file": "Expected a JSON array."})
+    position = 1
+    while True:
+        while position < len(buffer) and buffer[position] in JSON_SEPARATORS:
+            position += 1
+        if buffer.startswith("]", position):
+            return
+        try:
+            record, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as error:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise ValidationError({"file": f"Invalid JSON array: {error}"})
+            # The record is incomplete, read it again with the next chunk.
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield record
+
+
+def iter_ndjson_records(file):
+    """Yields objects of a file with one JSON object per line."""
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            # Reported as an error of the row.
+            yield line
+
+
+def read_records(file, file_format: str):
+    """
+    Yields records of a binary file (an uploaded file) in the format one by one.
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    if file_format == IMPORT_FORMAT_CSV:
+        return csv.DictReader(text)
+    if file_format == IMPORT_FORMAT_NDJSON:
+        return iter_ndjson_records(text)
+    return iter_json_records(text)
+
+
+def clean_value(field, value):
+    """Validates the value with the model field."""
+    if isinstance(value, str):
+        value = value.strip()
+    if value in (None, ""):
+        value = None if field.null else ""
+    return field.clean(value, None)
+
+
+def clean_activities(value) -> list[str] | None:
+    """
+    Returns names of activities from a list or a comma-separated string,
+    None if the record has no activities (links are kept then).
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(ACTIVITY_SEPARATOR)
+    if not isinstance(value, list):
+        raise DjangoValidationError("Expected a list of activity names.")
+    field = Activity._meta.get_field("name")
+    return [clean_value(field, name) for name in value if str(name).strip()]
+
+
+def clean_record(record) -> tuple[dict, dict]:
+    """Returns (validated data, errors by fields) of an imported record."""
+    if not isinstance(record, dict):
+        return {}, {"non_field_errors": ["Expected an object with ambassador data."]}
+    data, errors = {}, {}
+    for name, field in RECORD_FIELDS:
+        try:
+            data[name] = clean_value(field, record.get(name))
+        except DjangoValidationError as error:
+            errors[name] = error.messages
+    try:
+        data["activity"] = clean_activities(record.get("activity"))
+    except DjangoValidationError as error:
+        errors["activity"] = error.messages
+    return data, errors
+
+
+def get_default_status():
+    return dictionaries.get(Status, slug=DEFAULT_STATUS_SLUG) or (
+        Status.objects.filter(slug=DEFAULT_STATUS_SLUG).first()
+    )
+
+
+def import_batch(rows: list[tuple[int, dict]], report: ImportReport):
+    """
+    Creates or updates (by email) ambassadors of the validated rows with
+    a fixed number of queries: programs, purposes and activities are resolved
+    in bulk, addresses and ambassadors are written with bulk operations.
+    """
+    emails = [data["email"] for _, data in rows]
+    existing = dict(
+        Ambassador.objects.filter(email__in=emails).values_list("email", "address_id")
+    )
+    telegram_owners = dict(
+        Ambassador.objects.filter(
+            telegram_id__in=[data["telegram_id"] for _, data in rows]
+        ).values_list("telegram_id", "email")
+    )
+    valid_rows = []
+    for number, data in rows:
+        owner = telegram_owners.get(data["telegram_id"], data["email"])
+        if owner != data["email"]:
+            report.add_error(
+                number, {"telegram_id": [f"Telegram is used by ambassador {owner}."]}
+            )
+            continue
+        valid_rows.append(data)
+    if not valid_rows:
+        return
+
+    programs = dictionaries.get_or_create_many(
+        Program, {data["program"] for data in valid_rows}
+    )
+    purposes = dictionaries.get_or_create_many(
+        Purpose, {data["purpose"] for data in valid_rows}
+    )
+    activities = dictionaries.get_or_create_many(
+        Activity,
+        {name for data in valid_rows for name in data["activity"] or ()},
+    )
+    status = get_default_status()
+
+    addresses = [
+        Address(
+            pk=existing.get(data["email"]),
+            **{name: data[name] for name in ADDRESS_IMPORT_FIELDS},
+        )
+        for data in valid_rows
+    ]
+    # Addresses of the existing ambassadors are updated by primary key.
+    Address.objects.bulk_create(
+        addresses,
+        update_conflicts=True,
+        unique_fields=["pk"],
+        update_fields=ADDRESS_IMPORT_FIELDS,
+    )
+
+    ambassadors = []
+    for data, address in zip(valid_rows, addresses):
+        ambassador = Ambassador(
+            **{name: data[name] for name in AMBASSADOR_IMPORT_FIELDS},
+            address=address,
+            program=programs[data["program"]],
+            purpose=purposes[data["purpose"]],
+            status=status,
+        )
+        ambassador.search_document = ambassador.build_search_document()
+        ambassadors.append(ambassador)
+    Ambassador.objects.bulk_create(
+        ambassadors,
+        update_conflicts=True,
+        unique_fields=["email"],
+        update_fields=AMBASSADOR_UPDATE_FIELDS,
+    )
+
+    ids = dict(Ambassador.objects.filter(email__in=emails).values_list("email", "pk"))
+    # bulk_create() sends no signals, new ambassadors get empty stats here.
+    AmbassadorStats.objects.create_missing(ids.values())
+    AmbassadorActivity.objects.replace(
+        {
+            ids[data["email"]]: {activities[name].pk for name in data["activity"]}
+            for data in valid_rows
+            if data["activity"] is not None
+        }
+    )
+    report.updated += sum(data["email"] in existing for data in valid_rows)
+    report.created += sum(data["email"] not in existing for data in valid_rows)
+
+
+def write_batch(rows: list[tuple[int, dict]], report: ImportReport):
+    """
+    Imports the batch in its own transaction. If the batch fails, all its rows
+    are reported with the error and nothing of the batch is saved.
+    """
+    created, updated, errors_count = report.created, report.updated, len(report.errors)
+    try:
+        with transaction.atomic():
+            import_batch(rows, report)
+    except DatabaseError as error:
+        first, last = rows[0][0], rows[-1][0]
+        logger.error(f"Import of rows {first}-{last} failed: {error}")
+        report.created, report.updated = created, updated
+        # Rows rejected by the batch itself get the batch error only.
+        del report.errors[errors_count:]
+        # The dictionaries may have been loaded with the rolled back objects.
+        dictionaries.forget()
+        for number, _ in rows:
+            report.add_error(
+                number,
+                {"non_field_errors": [f"Rows {first}-{last} were not saved: {error}"]},
+            )
+
+
+def import_ambassadors(records, batch_size: int = IMPORT_BATCH_SIZE) -> ImportReport:
+    """
+    Imports ambassadors from the records (dicts with the fields of
+    AMBASSADOR_IMPORT_FIELDS, ADDRESS_IMPORT_FIELDS and names of the program,
+    the purpose and activities). Existing ambassadors are found by email and
+    updated, new ones get the "active" status.
+
+    Records are validated one by one and written in batches, one transaction
+    per batch. Invalid records, repeated emails or telegrams and rows of failed
+    batches are skipped and reported by their number (starting from 1),
+    the rest is imported.
+    """
+    report = ImportReport()
+    seen_emails, seen_telegrams = {}, {}
+    batch = []
+    for number, record in enumerate(records, start=1):
+        report.total += 1
+        data, errors = clean_record(record)
+        if not errors:
+            for field, seen in (
+                ("email", seen_emails),
+                ("telegram_id", seen_telegrams),
+            ):
+                if data[field] in seen:
+                    errors[field] = [f"Duplicate of row {seen[data[field]]}."]
+        if errors:
+            report.add_error(number, errors)
+            continue
+        seen_emails[data["email"]] = seen_telegrams[data["telegram_id"]] = number
+        batch.append((number, data))
+        if len(batch) == batch_size:
+            write_batch(batch, report)
+            batch = []
+    if batch:
+        write_batch(batch, report)
+    report.errors.sort(key=lambda error: error["row"])
+    return report
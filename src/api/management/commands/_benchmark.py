@@ -0,0 +1,109 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ambassadors.models import Address, Ambassador
+from promo.models import Merch, MerchApplication, MerchCategory, MerchInApplication
+from users.models import User
+
+BATCH_SIZE = 5000
+
+
+@contextmanager
+def rollback_afterwards():
+    """Runs a block in a transaction which is always rolled back."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def measure(func, repeat=3):
+    """Returns the result, the best time (ms) and the number of queries of a call."""
+    timings = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+    return result, min(timings), len(context.captured_queries)
+
+
+def create_ambassadors(count, prefix="bench"):
+    """Creates ambassadors with addresses for benchmarks."""
+    addresses = Address.objects.bulk_create(
+        [
+            Address(
+                postal_code="123456",
+                country="Россия",
+                city=f"Город {number % 50}",
+                street=f"Улица {number}",
+            )
+            for number in range(count)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    return Ambassador.objects.bulk_create(
+        [
+            Ambassador(
+                name=f"{prefix} амбассадор {number}",
+                gender="М",
+                clothing_size="M",
+                shoe_size="42",
+                education="МГУ",
+                job=f"Компания {number % 100}",
+                email=f"{prefix}{number}@example.com",
+                phone_number=f"8800{number:07d}",
+                telegram_id=f"@{prefix}{number}",
+                address=address,
+            )
+            for number, address in enumerate(addresses)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def create_merch_applications(count, ambassadors, year, merch_species=10):
+    """Creates merch applications (1-3 merch items each) during the year."""
+    category = MerchCategory.objects.create(name="benchmark")
+    merch = Merch.objects.bulk_create(
+        [
+            Merch(
+                name=f"benchmark {number}",
+                slug=f"benchmark-{number}",
+                category=category,
+                cost=random.randrange(100, 1000),
+            )
+            for number in range(merch_species)
+        ]
+    )
+    tutor = User.objects.create_user(
+        username="benchmark", email="benchmark@example.com", password="benchmark"
+    )
+    year_start = timezone.make_aware(datetime(year, 1, 1))
+    applications = []
+    merch_in_applications = []
+    for number in range(count):
+        application = MerchApplication(
+            application_number=f"benchmark-{number}",
+            ambassador=random.choice(ambassadors),
+            tutor=tutor,
+            created=year_start + timedelta(minutes=random.randrange(525000)),
+        )
+        for item in random.sample(merch, random.randrange(1, 4)):
+            merch_in_application = MerchInApplication(
+                application=application,
+                merch=item,
+                quantity=random.randrange(1, 5),
+                unit_cost=item.cost,
+            )
+            application.total_cost += item.cost * merch_in_application.quantity
+            merch_in_applications.append(merch_in_application)
+        applications.append(application)
+    MerchApplication.objects.bulk_create(applications, batch_size=BATCH_SIZE)
+    MerchInApplication.objects.bulk_create(merch_in_applications, batch_size=BATCH_SIZE)
+    return applications
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from ._benchmark import (
+    create_ambassadors,
+    create_merch_applications,
+    measure,
+    rollback_afterwards,
+)
+from api.utils import get_year_budget
+from promo.models import MerchSpendMonthly
+
+YEAR = 2000
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the query count and latency of the annual merch budget "
+        "calculation. Test data is created in a transaction and rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "sizes",
+            nargs="*",
+            type=int,
+            default=[10000, 100000],
+            help="numbers of merch applications to benchmark",
+        )
+        parser.add_argument("--ambassadors", type=int, default=3000)
+
+    def handle(self, *args, **options):
+        for size in options["sizes"]:
+            with rollback_afterwards():
+                ambassadors = create_ambassadors(options["ambassadors"])
+                create_merch_applications(size, ambassadors, YEAR)
+                _, rebuild_latency, _ = measure(MerchSpendMonthly.objects.rebuild, 1)
+                budget, latency, queries = measure(lambda: get_year_budget(YEAR))
+                self.stdout.write(
+                    f"{size} applications, {len(budget['ambassadors'])} "
+                    f"ambassadors: {queries} queries, {latency:.1f} ms "
+                    f"(monthly expenses rebuilt in {rebuild_latency:.1f} ms)"
+                )
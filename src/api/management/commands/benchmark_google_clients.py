@@ -0,0 +1,65 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand
+from googleapiclient.discovery import build
+
+from ._benchmark import measure
+from api.google_sheets_examples import (
+    GoogleClientProvider,
+    authenticate_sheets_by_oauth_credentials,
+)
+
+
+def build_services_uncached():
+    """Repeats the setup every export did before the services were cached."""
+    return (
+        build("sheets", "v4", credentials=authenticate_sheets_by_oauth_credentials()),
+        build("drive", "v3", credentials=authenticate_sheets_by_oauth_credentials()),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the setup overhead of Google API clients per export: "
+        "credentials loading and services building. Works offline with a "
+        "temporary token.json, no API requests are sent."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        current_dir = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                self.write_token()
+                _, uncached, _ = measure(build_services_uncached, repeat)
+                _, cold, _ = measure(
+                    lambda: GoogleClientProvider().get_services(), repeat
+                )
+                provider = GoogleClientProvider()
+                provider.get_services()
+                _, warm, _ = measure(provider.get_services, repeat)
+            finally:
+                os.chdir(current_dir)
+        self.stdout.write(f"uncached clients: {uncached:.2f} ms per export")
+        self.stdout.write(f"cached provider, first export: {cold:.2f} ms")
+        self.stdout.write(f"cached provider, next exports: {warm:.3f} ms per export")
+
+    @staticmethod
+    def write_token():
+        expiry = datetime.now(timezone.utc) + timedelta(hours=1)
+        token = {
+            "token": "benchmark-token",
+            "refresh_token": "benchmark-refresh-token",
+            "client_id": "benchmark-client-id",
+            "client_secret": "benchmark-client-secret",
+            "expiry": expiry.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+        with open("token.json", "w") as file:
+            json.dump(token, file)
@@ -0,0 +1,101 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import BooleanField, ExpressionWrapper, Q
+
+from ._benchmark import (
+    create_ambassadors,
+    create_merch_applications,
+    measure,
+    rollback_afterwards,
+)
+from api.filters import MerchApplicationsFilter, MerchFilter, PromocodeFilter
+from promo.models import Merch, MerchApplication, Promocode
+
+YEAR = 2000
+PAGE_SIZE = 10
+
+# Filter class, searched field, filter parameter, queryset getter
+SEARCHES = (
+    (MerchFilter, "name", "name", Merch.objects.all),
+    (
+        MerchApplicationsFilter,
+        "application_number",
+        "application_number",
+        MerchApplication.objects.all,
+    ),
+    (PromocodeFilter, "ambassador__name", "ambassador_name", Promocode.objects.all),
+)
+
+
+def legacy_search(queryset, field_name, value):
+    """The search used before TrigramSearchFilter: istartswith OR icontains."""
+    return (
+        queryset.filter(
+            Q(**{f"{field_name}__istartswith": value})
+            | Q(**{f"{field_name}__icontains": value})
+        )
+        .annotate(
+            is_start=ExpressionWrapper(
+                Q(**{f"{field_name}__istartswith": value}),
+                output_field=BooleanField(),
+            )
+        )
+        .order_by("-is_start")
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the latency of the search filters of merch, merch applications "
+        "and promocodes (the first page of results) compared to the old "
+        "istartswith OR icontains search. Test data is created in a transaction "
+        "and rolled back. Trigram indexes are used on PostgreSQL only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "sizes",
+            nargs="*",
+            type=int,
+            default=[100000],
+            help="numbers of rows of every searched table",
+        )
+        parser.add_argument(
+            "--term",
+            action="append",
+            dest="terms",
+            help="search terms (can be repeated), '1234' and 'benchmark' by default",
+        )
+
+    def handle(self, *args, **options):
+        terms = options["terms"] or ["1234", "benchmark"]
+        self.stdout.write(f"database: {connection.vendor}")
+        for size in options["sizes"]:
+            with rollback_afterwards():
+                ambassadors = create_ambassadors(size, prefix="benchmark")
+                create_merch_applications(size, ambassadors, YEAR, merch_species=size)
+                Promocode.objects.bulk_create(
+                    Promocode(code=f"benchmark{number}", ambassador=ambassador)
+                    for number, ambassador in enumerate(ambassadors)
+                )
+                for term in terms:
+                    self.benchmark(size, term)
+
+    def benchmark(self, size, term):
+        for filterset_class, field_name, param, get_queryset in SEARCHES:
+            _, legacy, _ = measure(
+                lambda: list(
+                    legacy_search(get_queryset(), field_name, term)[:PAGE_SIZE]
+                )
+            )
+            found, latency, queries = measure(
+                lambda: list(
+                    filterset_class({param: term}, queryset=get_queryset()).qs[
+                        :PAGE_SIZE
+                    ]
+                )
+            )
+            self.stdout.write(
+                f"{size} rows, {param}={term!r}: {legacy:.1f} ms before, "
+                f"{latency:.1f} ms now ({queries} queries, {len(found)} found)"
+            )
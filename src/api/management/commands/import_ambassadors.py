@@ -0,0 +1,63 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from api.imports import (
+    IMPORT_BATCH_SIZE,
+    IMPORT_FORMATS,
+    get_import_format,
+    import_ambassadors,
+    read_records,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates or updates (found by email) ambassadors from a CSV, JSON or "
+        "NDJSON file. Rows with errors are skipped and can be written to a report."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="file with ambassadors")
+        parser.add_argument(
+            "--format",
+            choices=IMPORT_FORMATS,
+            help="format of the file, by default taken from the file extension",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help="number of rows written at once",
+        )
+        parser.add_argument(
+            "--report",
+            help="CSV file to write errors of the rejected rows to (row, field, error)",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        started = time.perf_counter()
+        try:
+            file_format = get_import_format(options["format"], path)
+            with open(path, "rb") as file:
+                report = import_ambassadors(
+                    read_records(file, file_format), options["batch_size"]
+                )
+        except ValidationError as error:
+            raise CommandError(error.detail)
+        except OSError as error:
+            raise CommandError(error)
+
+        if options["report"]:
+            with open(options["report"], "w", newline="", encoding="utf-8") as file:
+                writer = csv.writer(file)
+                writer.writerow(("row", "field", "error"))
+                writer.writerows(report.iter_error_rows())
+        self.stdout.write(
+            f"Rows: {report.total}, created: {report.created}, "
+            f"updated: {report.updated}, rejected: {len(report.errors)} "
+            f"({time.perf_counter() - started:.1f} s)"
+        )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api.platforms import RECLASSIFY_CHUNK_SIZE, reclassify_content
+
+
+class Command(BaseCommand):
+    help = (
+        "Sets platforms and types (review/content) of all the content by the "
+        "current platform rules. Run it after changing the rules."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=RECLASSIFY_CHUNK_SIZE,
+            help="number of content rows processed in one transaction",
+        )
+
+    def handle(self, *args, **options):
+        processed, changed = reclassify_content(options["chunk_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Content processed: {processed}, changed: {changed}")
+        )
@@ -0,0 +1,58 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from api.exports import run_export_job
+from api.loggers import logger
+from api.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Processes queued exports to Google Sheets. Several workers can run "
+        "at the same time, every job is taken by one of them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="process the queued jobs and exit instead of waiting for new ones",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2,
+            help="seconds to wait before checking an empty queue again",
+        )
+        parser.add_argument(
+            "--stale-timeout",
+            type=int,
+            default=600,
+            help="seconds without progress after which a running job is requeued",
+        )
+
+    def handle(self, *args, **options):
+        stale_timeout = timedelta(seconds=options["stale_timeout"])
+        try:
+            while True:
+                ExportJob.objects.requeue_stale(stale_timeout)
+                job = ExportJob.objects.claim()
+                if job is None:
+                    if options["once"]:
+                        return
+                    time.sleep(options["poll_interval"])
+                    continue
+                self.process(job)
+        except KeyboardInterrupt:
+            self.stdout.write("Export worker stopped")
+
+    def process(self, job):
+        self.stdout.write(f"Export job {job.pk} ({job.kind}) started")
+        try:
+            run_export_job(job)
+        except Exception as error:
+            logger.exception(f"Export job {job.pk} failed")
+            job.fail(error)
+        self.stdout.write(f"Export job {job.pk}: {job.status}")
@@ -0,0 +1,134 @@
+# Generated by Django 5.0.2 on 2026-10-18 12:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SheetSync",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("merch_applications", "Заявки на мерч"),
+                            ("promocodes", "Промокоды"),
+                        ],
+                        max_length=30,
+                        unique=True,
+                        verbose_name="Kind",
+                    ),
+                ),
+                (
+                    "spreadsheet_id",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="Spreadsheet ID"
+                    ),
+                ),
+                (
+                    "next_row",
+                    models.PositiveIntegerField(
+                        default=2, verbose_name="Next free row"
+                    ),
+                ),
+                (
+                    "synced",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Last sync time"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Синхронизируемая таблица",
+                "verbose_name_plural": "Синхронизируемые таблицы",
+                "ordering": ["kind"],
+            },
+        ),
+        migrations.CreateModel(
+            name="SheetSyncRow",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("object_id", models.PositiveIntegerField(verbose_name="Object ID")),
+                ("row_number", models.PositiveIntegerField(verbose_name="Row number")),
+                (
+                    "content_hash",
+                    models.CharField(max_length=64, verbose_name="Content hash"),
+                ),
+                ("synced", models.DateTimeField(verbose_name="Last write time")),
+            ],
+            options={
+                "verbose_name": "Строка синхронизируемой таблицы",
+                "verbose_name_plural": "Строки синхронизируемых таблиц",
+                "ordering": ["sync", "row_number"],
+            },
+        ),
+        migrations.RemoveConstraint(
+            model_name="exportjob",
+            name="unique_active_export_job",
+        ),
+        migrations.AddField(
+            model_name="exportjob",
+            name="incremental",
+            field=models.BooleanField(
+                default=False,
+                help_text="Update the persistent spreadsheet instead of creating a new one",
+                verbose_name="Incremental",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="exportjob",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status__in", ("pending", "running"))),
+                fields=("kind", "incremental"),
+                name="unique_active_export_job",
+            ),
+        ),
+        migrations.AddField(
+            model_name="sheetsyncrow",
+            name="sync",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="rows",
+                to="api.sheetsync",
+                verbose_name="Sync",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="sheetsyncrow",
+            constraint=models.UniqueConstraint(
+                fields=("sync", "object_id"), name="unique_sheet_sync_object"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="sheetsyncrow",
+            constraint=models.UniqueConstraint(
+                fields=("sync", "row_number"), name="unique_sheet_sync_row_number"
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-18 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_sheetsync"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exportjob",
+            name="run_after",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="A failed job is not taken by workers before this time",
+                null=True,
+                verbose_name="Retry time",
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.2 on 2026-10-18 22:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0003_exportjob_run_after"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CacheVersion",
+            fields=[
+                (
+                    "name",
+                    models.CharField(
+                        max_length=50,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Name",
+                    ),
+                ),
+                (
+                    "version",
+                    models.CharField(max_length=32, verbose_name="Version"),
+                ),
+            ],
+            options={
+                "verbose_name": "Версия кэша",
+                "verbose_name_plural": "Версии кэша",
+            },
+        ),
+    ]
@@ -1,5 +1,8 @@
+from django.urls import reverse
 from rest_framework import response, status
 
+from .export_serializers import ExportJobSerializer
+from .models import ExportJob
 from .promo_serializers import DestroyObjectSuccessSerializer
 
 MESSAGE_ON_DELETE = "Строка удалена"
@@ -14,3 +17,31 @@ class DestroyWithPayloadMixin(object):
             DestroyObjectSuccessSerializer({"message": MESSAGE_ON_DELETE}).data,
             status=status.HTTP_200_OK,
         )
+
+
+class ExportJobMixin(object):
+    """
+    Mixin to queue background exports and respond with 202 Accepted.
+    Exports queued by GET (the deprecated way) get the Deprecation header.
+    """
+
+    def enqueue_export(self, request, kind):
+        incremental = request.query_params.get("incremental", "").lower() in (
+            "1",
+            "true",
+        )
+        job, _ = ExportJob.objects.enqueue(
+            kind, user=request.user, incremental=incremental
+        )
+        headers = {
+            "Location": request.build_absolute_uri(
+                reverse("api:exportjob-detail", kwargs={"pk": job.pk})
+            )
+        }
+        if request.method == "GET":
+            headers["Deprecation"] = "true"
+        return response.Response(
+            ExportJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED,
+            headers=headers,
+        )
@@ -1,3 +1,292 @@
-# from django.db import models
+from datetime import timedelta
 
-# Create your models here.
+from django.db import IntegrityError, models, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from users.models import User
+
+EXPORT_MERCH_APPLICATIONS = "merch_applications"
+EXPORT_PROMOCODES = "promocodes"
+EXPORT_KIND_CHOICES = (
+    (EXPORT_MERCH_APPLICATIONS, "Заявки на мерч"),
+    (EXPORT_PROMOCODES, "Промокоды"),
+)
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CHOICES = (
+    (STATUS_PENDING, "В очереди"),
+    (STATUS_RUNNING, "Выполняется"),
+    (STATUS_DONE, "Готово"),
+    (STATUS_FAILED, "Ошибка"),
+)
+ACTIVE_STATUSES = (STATUS_PENDING, STATUS_RUNNING)
+
+EXPORT_MAX_ATTEMPTS = 3
+# Delay before the second attempt of a failed job, it doubles with every attempt.
+EXPORT_RETRY_DELAY = timedelta(minutes=1)
+
+
+class ExportJobQuerySet(models.QuerySet):
+    def active(self):
+        """Returns jobs waiting in the queue or being processed."""
+        return self.filter(status__in=ACTIVE_STATUSES)
+
+    def enqueue(self, kind: str, user: User | None = None, incremental=False):
+        """
+        Puts an export into the queue. If the same export is already queued
+        or running, returns that job instead of creating a new one.
+        Returns (job, created) tuple.
+        """
+        same_jobs = self.active().filter(kind=kind, incremental=incremental)
+        job = same_jobs.first()
+        if job is not None:
+            return job, False
+        try:
+            with transaction.atomic():
+                job = self.create(kind=kind, incremental=incremental, created_by=user)
+            return job, True
+        except IntegrityError:
+            # A concurrent request has just queued the same export.
+            return same_jobs.get(), False
+
+    def claim(self):
+        """
+        Takes the oldest pending job for processing and marks it as running.
+        Jobs locked by other workers and failed jobs waiting for their retry
+        time are skipped. Returns None if the queue is empty.
+        """
+        with transaction.atomic():
+            job = (
+                self.filter(status=STATUS_PENDING)
+                .filter(Q(run_after__isnull=True) | Q(run_after__lte=timezone.now()))
+                .select_for_update(skip_locked=True)
+                .order_by("created")
+                .first()
+            )
+            if job is None:
+                return None
+            now = timezone.now()
+            claimed = self.filter(pk=job.pk, status=STATUS_PENDING).update(
+                status=STATUS_RUNNING,
+                attempts=models.F("attempts") + 1,
+                started=now,
+                updated=now,
+            )
+        if not claimed:
+            return None
+        job.refresh_from_db()
+        return job
+
+    def requeue_stale(self, timeout: timedelta) -> int:
+        """
+        Returns running jobs without progress updates for longer than timeout
+        (their worker has died) to the queue. They will resume from the last
+        written row.
+        """
+        return self.filter(
+            status=STATUS_RUNNING, updated__lt=timezone.now() - timeout
+        ).update(status=STATUS_PENDING, updated=timezone.now())
+
+
+class ExportJob(models.Model):
+    """Describes a background export of data to a Google spreadsheet."""
+
+    kind = models.CharField("Kind", max_length=30, choices=EXPORT_KIND_CHOICES)
+    incremental = models.BooleanField(
+        "Incremental",
+        default=False,
+        help_text="Update the persistent spreadsheet instead of creating a new one",
+    )
+    status = models.CharField(
+        "Status", max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING
+    )
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="export_jobs",
+        verbose_name="Created by",
+    )
+    total = models.PositiveIntegerField("Objects to export", null=True, blank=True)
+    processed = models.PositiveIntegerField("Exported objects", default=0)
+    attempts = models.PositiveSmallIntegerField("Attempts", default=0)
+    spreadsheet_id = models.CharField("Spreadsheet ID", max_length=100, blank=True)
+    link = models.URLField("Link", blank=True)
+    error = models.TextField("Error", blank=True)
+    created = models.DateTimeField("Creation time", auto_now_add=True)
+    updated = models.DateTimeField("Update time", auto_now=True)
+    started = models.DateTimeField("Start time", null=True, blank=True)
+    finished = models.DateTimeField("Finish time", null=True, blank=True)
+    run_after = models.DateTimeField(
+        "Retry time",
+        null=True,
+        blank=True,
+        help_text="A failed job is not taken by workers before this time",
+    )
+
+    objects = ExportJobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Выгрузка"
+        verbose_name_plural = "Выгрузки"
+        ordering = ["-created"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "incremental"],
+                condition=Q(status__in=ACTIVE_STATUSES),
+                name="unique_active_export_job",
+            )
+        ]
+        indexes = [models.Index(fields=["status", "created"])]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} - {self.get_status_display()}"
+
+    @property
+    def rows_written(self) -> int:
+        """Number of filled spreadsheet rows including the column names row."""
+        return self.processed + 1 if self.processed else 0
+
+    def set_progress(self, processed: int):
+        """Saves the number of exported objects (called after every chunk)."""
+        self.processed = processed
+        self.save(update_fields=["processed", "updated"])
+
+    def finish(self, link: str):
+        """Marks the job as successfully done."""
+        self.status = STATUS_DONE
+        self.link = link
+        self.error = ""
+        self.finished = timezone.now()
+        self.save()
+
+    def fail(self, error: Exception):
+        """
+        Returns the job to the queue to resume it after a delay growing with
+        every attempt or marks it as failed when there are no attempts left.
+        """
+        self.error = str(error)
+        if self.attempts < EXPORT_MAX_ATTEMPTS:
+            self.status = STATUS_PENDING
+            delay = EXPORT_RETRY_DELAY * 2 ** max(self.attempts - 1, 0)
+            self.run_after = timezone.now() + delay
+        else:
+            self.status = STATUS_FAILED
+            self.finished = timezone.now()
+        self.save()
+
+
+class SheetSync(models.Model):
+    """
+    Describes a persistent spreadsheet which is kept up to date by incremental
+    exports. The rows of exported objects are tracked by SheetSyncRow.
+    """
+
+    kind = models.CharField(
+        "Kind", max_length=30, choices=EXPORT_KIND_CHOICES, unique=True
+    )
+    spreadsheet_id = models.CharField("Spreadsheet ID", max_length=100, blank=True)
+    next_row = models.PositiveIntegerField("Next free row", default=2)
+    synced = models.DateTimeField("Last sync time", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Синхронизируемая таблица"
+        verbose_name_plural = "Синхронизируемые таблицы"
+        ordering = ["kind"]
+
+    def __str__(self):
+        return self.get_kind_display()
+
+    def get_row_index(self) -> dict:
+        """Returns {object_id: (row_number, content_hash)} of the synced rows."""
+        return {
+            object_id: (row_number, content_hash)
+            for object_id, row_number, content_hash in self.rows.values_list(
+                "object_id", "row_number", "content_hash"
+            ).iterator()
+        }
+
+    @transaction.atomic
+    def save_rows(self, new_rows: list, changed_rows: list, next_row: int):
+        """
+        Saves (object_id, row_number, content_hash) of rows written into the
+        spreadsheet and the next free row number.
+        """
+        now = timezone.now()
+        SheetSyncRow.objects.bulk_create(
+            [
+                SheetSyncRow(
+                    sync=self,
+                    object_id=object_id,
+                    row_number=row_number,
+                    content_hash=content_hash,
+                    synced=now,
+                )
+                for object_id, row_number, content_hash in new_rows
+            ]
+        )
+        changed = {
+            object_id: content_hash for object_id, _, content_hash in changed_rows
+        }
+        rows = list(self.rows.filter(object_id__in=changed))
+        for row in rows:
+            row.content_hash = changed[row.object_id]
+            row.synced = now
+        SheetSyncRow.objects.bulk_update(rows, ["content_hash", "synced"])
+        self.next_row = next_row
+        self.save(update_fields=["next_row"])
+
+    def delete_rows(self, object_ids):
+        """Forgets rows of deleted objects (their rows are cleared)."""
+        self.rows.filter(object_id__in=object_ids).delete()
+
+
+class SheetSyncRow(models.Model):
+    """Describes a spreadsheet row holding an exported object."""
+
+    sync = models.ForeignKey(
+        SheetSync, on_delete=models.CASCADE, related_name="rows", verbose_name="Sync"
+    )
+    object_id = models.PositiveIntegerField("Object ID")
+    row_number = models.PositiveIntegerField("Row number")
+    content_hash = models.CharField("Content hash", max_length=64)
+    synced = models.DateTimeField("Last write time")
+
+    class Meta:
+        verbose_name = "Строка синхронизируемой таблицы"
+        verbose_name_plural = "Строки синхронизируемых таблиц"
+        ordering = ["sync", "row_number"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sync", "object_id"], name="unique_sheet_sync_object"
+            ),
+            models.UniqueConstraint(
+                fields=["sync", "row_number"], name="unique_sheet_sync_row_number"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.sync} - {self.row_number}"
+
+
+class CacheVersion(models.Model):
+    """
+    Version of data cached in the memory of every process (see
+    api.dictionaries.DictionaryCache). It's kept in the database, so a change
+    made by one process is seen by all of them.
+    """
+
+    name = models.CharField("Name", max_length=50, primary_key=True)
+    version = models.CharField("Version", max_length=32)
+
+    class Meta:
+        verbose_name = "Версия кэша"
+        verbose_name_plural = "Версии кэша"
+
+    def __str__(self):
+        return f"{self.name} - {self.version}"
@@ -1,4 +1,17 @@
-from rest_framework.pagination import PageNumberPagination
+import binascii
+import datetime
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from decimal import Decimal
+from uuid import UUID
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F, OrderBy, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+KEYSET_ALIAS = "_keyset_{}"
 
 
 class CustomPageNumberPagination(PageNumberPagination):
@@ -6,3 +19,185 @@ class CustomPageNumberPagination(PageNumberPagination):
 
     page_size_query_param = "limit"
     page_size = 10
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over a composite key (seek method).
+    The ordering is taken from the queryset (so it follows OrderingFilter and
+    get_queryset), then from the model Meta.ordering, and is always completed
+    with the primary key to make it unique. The cursor stores the values of
+    the key of the boundary object, so every page is fetched with one indexed
+    WHERE condition without OFFSET and costs the same as the first one.
+    NULL values are sorted last in ascending and first in descending order.
+    """
+
+    page_size = 10
+    page_size_query_param = "limit"
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+
+        queryset = queryset.annotate(
+            **{
+                KEYSET_ALIAS.format(index): F(field.lstrip("-"))
+                for index, field in enumerate(self.ordering)
+            }
+        ).order_by(*self._get_order_by(reverse))
+        if self.cursor is not None:
+            queryset = queryset.filter(
+                self._get_keyset_filter(self.cursor.position, reverse)
+            )
+
+        # One extra object shows whether there is a page after this one.
+        results = list(queryset[: self.page_size + 1])
+        has_following = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.cursor is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Returns the ordering of the queryset completed with the primary key.
+        """
+        ordering = [
+            self._get_ordering_name(field)
+            for field in queryset.query.order_by or queryset.model._meta.ordering
+        ]
+        ordering = [field for field in ordering if field and field != "?"]
+        pk_names = {"pk", queryset.model._meta.pk.name}
+        if not any(field.lstrip("-") in pk_names for field in ordering):
+            ordering.append("pk")
+        return tuple(ordering)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=self._get_position(self.page[-1]))
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=self._get_position(self.page[0]))
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            data = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            reverse, ordering, position = data["r"], data["o"], data["p"]
+        except (
+            binascii.Error,
+            KeyError,
+            TypeError,
+            UnicodeError,
+            ValueError,
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        # A cursor is only valid for the ordering it was issued for.
+        if (
+            not isinstance(reverse, bool)
+            or ordering != list(self.ordering)
+            or not isinstance(position, list)
+            or len(position) != len(self.ordering)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        data = {
+            "r": cursor.reverse,
+            "o": list(self.ordering),
+            "p": cursor.position,
+        }
+        encoded = urlsafe_b64encode(
+            json.dumps(data, default=self._encode_value, separators=(",", ":")).encode()
+        ).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_order_by(self, reverse):
+        order_by = []
+        for index, field in enumerate(self.ordering):
+            key = F(KEYSET_ALIAS.format(index))
+            if field.startswith("-") != reverse:
+                order_by.append(key.desc(nulls_first=True))
+            else:
+                order_by.append(key.asc(nulls_last=True))
+        return order_by
+
+    def _get_keyset_filter(self, position, reverse):
+        """
+        Builds (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ... for the key position.
+        """
+        keyset_filter = Q(pk__in=[])
+        equal = Q()
+        for index, (field, value) in enumerate(zip(self.ordering, position)):
+            alias = KEYSET_ALIAS.format(index)
+            descending = field.startswith("-") != reverse
+            following = self._get_following_filter(alias, value, descending)
+            if following is not None:
+                keyset_filter |= equal & following
+            if value is None:
+                equal &= Q(**{f"{alias}__isnull": True})
+            else:
+                equal &= Q(**{alias: value})
+        return keyset_filter
+
+    @staticmethod
+    def _get_following_filter(alias, value, descending):
+        """Returns the condition for key values following the given one."""
+        if value is None:
+            # NULLs are last in ascending order and first in descending order.
+            return Q(**{f"{alias}__isnull": False}) if descending else None
+        if descending:
+            return Q(**{f"{alias}__lt": value})
+        return Q(**{f"{alias}__gt": value}) | Q(**{f"{alias}__isnull": True})
+
+    def _get_position(self, instance):
+        aliases = [KEYSET_ALIAS.format(index) for index in range(len(self.ordering))]
+        if isinstance(instance, dict):
+            return [instance[alias] for alias in aliases]
+        return [getattr(instance, alias) for alias in aliases]
+
+    @staticmethod
+    def _get_ordering_name(field):
+        if isinstance(field, str):
+            return field
+        if isinstance(field, OrderBy) and isinstance(field.expression, F):
+            return ("-" if field.descending else "") + field.expression.name
+        if isinstance(field, F):
+            return field.name
+        raise ImproperlyConfigured(
+            f"Keyset pagination does not support ordering by {field!r}."
+        )
+
+    @staticmethod
+    def _encode_value(value):
+        if isinstance(value, (datetime.date, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, (Decimal, UUID)):
+            return str(value)
+        raise TypeError(f"Cannot use {type(value).__name__} in a pagination cursor.")
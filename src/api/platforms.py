@@ -0,0 +1,141 @@
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+from django.db import transaction
+
+from .dictionaries import dictionaries
+from ambassadors.models import CONTENT_STATS_FIELDS, AmbassadorStats
+from content.models import Content
+
+# Dictionary with the rules (see DICTIONARY_MODELS)
+PLATFORM_RULES = "platform_rules"
+DEFAULT_CONTENT_TYPE = "content"
+RECLASSIFY_CHUNK_SIZE = 1000
+
+
+class Platform(NamedTuple):
+    """Platform of a content link and the type of the content."""
+
+    name: str
+    type: str
+
+
+def normalize_domain(domain: str) -> str:
+    return domain.strip().rstrip(".").lower().removeprefix("www.")
+
+
+def split_path(path: str) -> tuple[str, ...]:
+    return tuple(segment for segment in path.lower().split("/") if segment)
+
+
+def split_link(link: str) -> tuple[str, tuple[str, ...]]:
+    """
+    Returns the normalized host of the link (lowercased, without "www.", port
+    and credentials) and the segments of its path. Links without a scheme
+    (habr.com/ru/articles/1/) are parsed too.
+    """
+    link = link.strip()
+    try:
+        parts = urlsplit(link)
+        if not parts.netloc:
+            parts = urlsplit(f"//{link}")
+        host = parts.hostname or ""
+    except ValueError:
+        return "", ()
+    return normalize_domain(host), split_path(parts.path)
+
+
+class PlatformClassifier:
+    """
+    Finds platforms of content links by the rules (PlatformRule values).
+
+    The rules are compiled into a dict by domain with the rules of each domain
+    sorted from the longest path prefix. A host is looked up by its suffixes
+    from the longest one (a.career.habr.com, career.habr.com, habr.com, com),
+    so the most specific domain and then the longest path prefix win and
+    a link costs a few dict lookups whatever the number of rules is.
+    Links without a matching rule get their host as the platform and
+    the "content" type.
+    """
+
+    def __init__(self, rules):
+        self.rules = {}
+        for rule in rules:
+            self.rules.setdefault(normalize_domain(rule["domain"]), []).append(
+                (
+                    split_path(rule["path_prefix"]),
+                    Platform(rule["platform"], rule["type"]),
+                )
+            )
+        for domain_rules in self.rules.values():
+            domain_rules.sort(key=lambda item: len(item[0]), reverse=True)
+
+    def classify(self, link: str) -> Platform:
+        host, segments = split_link(link)
+        labels = host.split(".")
+        for start in range(len(labels)):
+            for prefix, platform in self.rules.get(".".join(labels[start:]), ()):
+                if segments[: len(prefix)] == prefix:
+                    return platform
+        return Platform(host or link, DEFAULT_CONTENT_TYPE)
+
+
+class PlatformClassifierCache:
+    """
+    Keeps the classifier compiled from the rules of the cached dictionaries,
+    it's compiled again when the dictionaries version changes. The version is
+    shared by all processes (see DictionaryCache), so a rule changed by one
+    process is picked up by the others as well.
+    """
+
+    def __init__(self):
+        self._cached = None
+
+    def get(self) -> PlatformClassifier:
+        snapshot = dictionaries.get_snapshot()
+        cached = self._cached
+        if cached is None or cached[0] != snapshot.version:
+            cached = snapshot.version, PlatformClassifier(snapshot.data[PLATFORM_RULES])
+            self._cached = cached
+        return cached[1]
+
+
+platform_classifier = PlatformClassifierCache()
+
+
+def classify_link(link: str) -> Platform:
+    """Returns the platform and the content type of the link."""
+    return platform_classifier.get().classify(link)
+
+
+def reclassify_content(chunk_size: int = RECLASSIFY_CHUNK_SIZE) -> tuple[int, int]:
+    """
+    Sets platforms and types of all the content by the current rules.
+    Content is read by chunks, changed rows of a chunk are written with one
+    bulk update in one transaction (bulk_update sends no signals, so content
+    stats of the affected ambassadors are refreshed explicitly).
+    Returns the numbers of processed and changed content.
+    """
+    classifier = platform_classifier.get()
+    processed = changed = 0
+    last_id = 0
+    while chunk := list(
+        Content.objects.filter(pk__gt=last_id)
+        .order_by("pk")
+        .only("pk", "ambassador_id", "link", "platform", "type")[:chunk_size]
+    ):
+        updated = []
+        for content in chunk:
+            platform = classifier.classify(content.link)
+            if (content.platform, content.type) != platform:
+                content.platform, content.type = platform
+                updated.append(content)
+        with transaction.atomic():
+            Content.objects.bulk_update(updated, ["platform", "type"])
+            AmbassadorStats.objects.refresh(
+                {content.ambassador_id for content in updated}, CONTENT_STATS_FIELDS
+            )
+        processed += len(chunk)
+        changed += len(updated)
+        last_id = chunk[-1].pk
+    return processed, changed
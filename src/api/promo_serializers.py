@@ -1,21 +1,50 @@
 from collections import OrderedDict
 
 from django.db import transaction
-from django.db.models import F, Prefetch, Sum
+from django.db.models import Prefetch
 from rest_framework import serializers
+from rest_framework.exceptions import ErrorDetail
 
-from .utils import YEAR_MONTHS
+from .utils import YEAR_MONTHS, generate_application_numbers
 from ambassadors.models import Address, Ambassador, Status
 from promo.models import (
     Merch,
     MerchApplication,
     MerchCategory,
     MerchInApplication,
+    MerchSpendMonthly,
     Promocode,
 )
 from users.models import User
 
 
+def does_not_exist_error(pk) -> ErrorDetail:
+    """Returns the error of PrimaryKeyRelatedField for a missing object."""
+    return ErrorDetail(
+        f'Invalid pk "{pk}" - object does not exist.', code="does_not_exist"
+    )
+
+
+def sum_merch_quantities(lines, quantity_field) -> tuple[dict, list]:
+    """
+    Sums up quantities of repeated merch in (merch_id, quantity) pairs, the sums
+    are validated like the quantities of the lines. Returns {merch_id: quantity}
+    dict and the errors of the lines (empty dicts for the valid ones).
+    """
+    quantities = {}
+    for pk, quantity in lines:
+        quantities[pk] = quantities.get(pk, 0) + quantity
+    errors = []
+    for pk, _ in lines:
+        try:
+            quantity_field.run_validators(quantities[pk])
+        except serializers.ValidationError as error:
+            errors.append({"quantity": error.detail})
+        else:
+            errors.append({})
+    return quantities, errors
+
+
 class AddressMerchSerializer(serializers.ModelSerializer):
     """Serializer to display ambassador address in merch applications."""
 
@@ -84,7 +113,7 @@ class MerchInApplicationSerializer(serializers.ModelSerializer):
     category = serializers.ReadOnlyField(source="merch.category.name")
     slug = serializers.SlugField(source="merch.slug", read_only=True)
     size = serializers.ReadOnlyField(source="merch.size")
-    cost = serializers.FloatField(source="merch.cost", read_only=True)
+    cost = serializers.FloatField(source="unit_cost", read_only=True)
     name_and_size = serializers.SerializerMethodField()
 
     class Meta:
@@ -108,9 +137,7 @@ class MerchInApplicationSerializer(serializers.ModelSerializer):
 class MerchInApplicationCreateUpdateSerializer(serializers.ModelSerializer):
     """Serializer to create/edit merch in an application."""
 
-    id = serializers.PrimaryKeyRelatedField(
-        source="merch.id", queryset=Merch.objects.all()
-    )
+    id = serializers.IntegerField(source="merch.id")
 
     class Meta:
         model = MerchInApplication
@@ -124,7 +151,7 @@ class MerchInApplicationCreateUpdateSerializer(serializers.ModelSerializer):
         new_repr["category"] = instance.merch.category.name
         new_repr["slug"] = instance.merch.slug
         new_repr["size"] = instance.merch.size
-        new_repr["cost"] = instance.merch.cost
+        new_repr["cost"] = instance.unit_cost
         new_repr["quantity"] = old_repr["quantity"]
         return new_repr
 
@@ -157,28 +184,16 @@ class MerchApplicationSerializer(serializers.ModelSerializer):
     @classmethod
     def setup_eager_loading(cls, queryset):
         """Performs necessary eager loading of merch applications data."""
-        return (
-            queryset.select_related("ambassador__address", "tutor")
-            .prefetch_related(
-                Prefetch(
-                    "merch_in_applications",
-                    queryset=MerchInApplication.objects.select_related(
-                        "merch__category"
-                    ),
-                )
-            )
-            .annotate(
-                merch_cost=Sum(
-                    F("merch_in_applications__quantity")
-                    * F("merch_in_applications__merch__cost"),
-                    default=0,
-                ),
+        return queryset.select_related("ambassador__address", "tutor").prefetch_related(
+            Prefetch(
+                "merch_in_applications",
+                queryset=MerchInApplication.objects.select_related("merch__category"),
             )
         )
 
     def get_merch_cost(self, obj) -> float:
-        """Shows the total cost of the merch in the application (annotated field)."""
-        return obj.merch_cost
+        """Shows the total cost of the merch in the application (stored field)."""
+        return obj.total_cost
 
     def get_created_month(self, obj) -> str:
         """Shows the merch application creation month."""
@@ -210,41 +225,237 @@ class MerchApplicationCreateUpdateSerializer(serializers.ModelSerializer):
         )
 
     def get_merch_cost(self, obj) -> float:
-        """Calculates the total cost of the merch in the application."""
-        return sum(
-            [
-                item.quantity * item.merch.cost
-                for item in obj.merch_in_applications.all()
-            ]
+        """Shows the total cost of the merch in the application (stored field)."""
+        return obj.total_cost
+
+    def validate_merch(self, merch):
+        """
+        Checks all the merch with one query and replaces IDs with objects.
+        Quantities of repeated merch are summed up, the sums are validated
+        like the quantities of the lines.
+        Returns {merch_id: (merch, quantity)} dict.
+        """
+        merch_ids = [item["merch"]["id"] for item in merch]
+        merch_objects = Merch.objects.in_bulk(merch_ids)
+        errors = [
+            {"id": [does_not_exist_error(pk)]} if pk not in merch_objects else {}
+            for pk in merch_ids
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        quantities, errors = sum_merch_quantities(
+            [(item["merch"]["id"], item.get("quantity", 1)) for item in merch],
+            self.fields["merch"].child.fields["quantity"],
         )
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return {
+            pk: (merch_objects[pk], quantity) for pk, quantity in quantities.items()
+        }
 
     @transaction.atomic
     def create(self, validated_data):
         """Creates an application for merch taking into account m2m connections."""
-        merch = validated_data.pop("merch_in_applications")
-        application = MerchApplication.objects.create(**validated_data)
-        for item in merch:
-            MerchInApplication.objects.create(
+        lines = validated_data.pop("merch_in_applications")
+        application = MerchApplication.objects.create(
+            **validated_data,
+            total_cost=sum(quantity * merch.cost for merch, quantity in lines.values()),
+        )
+        MerchInApplication.objects.bulk_create(
+            MerchInApplication(
                 application=application,
-                merch=item["merch"]["id"],
-                quantity=item["quantity"],
+                merch=merch,
+                quantity=quantity,
+                unit_cost=merch.cost,
             )
+            for merch, quantity in lines.values()
+        )
+        MerchSpendMonthly.objects.add_applications(
+            MerchApplication.objects.filter(pk=application.pk)
+        )
         return application
 
+    def update_merch_lines(self, instance, lines):
+        """
+        Applies the difference between the current merch items of the application
+        and the new ones: changed quantities are updated, new items are added
+        and missing ones are deleted, one query for each kind of change.
+        Unit costs of the kept items stay the same. Returns the new total cost.
+        """
+        current = {}
+        removed = []
+        for line in instance.merch_in_applications.all():
+            if line.merch_id in lines and line.merch_id not in current:
+                current[line.merch_id] = line
+            else:
+                removed.append(line.pk)
+        changed = []
+        for merch_id, line in current.items():
+            quantity = lines[merch_id][1]
+            if line.quantity != quantity:
+                line.quantity = quantity
+                changed.append(line)
+        added = MerchInApplication.objects.bulk_create(
+            MerchInApplication(
+                application=instance,
+                merch=merch,
+                quantity=quantity,
+                unit_cost=merch.cost,
+            )
+            for merch_id, (merch, quantity) in lines.items()
+            if merch_id not in current
+        )
+        MerchInApplication.objects.bulk_update(changed, ["quantity"])
+        if removed:
+            MerchInApplication.objects.filter(pk__in=removed).delete()
+        return sum(
+            line.quantity * line.unit_cost for line in [*current.values(), *added]
+        )
+
     @transaction.atomic
     def update(self, instance, validated_data):
-        """Updates some fields in merch application during PATCH-requests."""
-        if validated_data.get("merch_in_applications") is not None:
-            merch = validated_data.pop("merch_in_applications")
-            instance.merch.clear()
-            for item in merch:
-                MerchInApplication.objects.create(
-                    application=instance,
-                    merch=item["merch"]["id"],
-                    quantity=item["quantity"],
-                )
+        """
+        Updates some fields in merch application during PATCH-requests.
+        Monthly expenses are adjusted by the difference of the total cost.
+        """
+        old_spend = MerchSpendMonthly.objects.get_key(instance), instance.total_cost
+        lines = validated_data.pop("merch_in_applications", None)
+        if lines is not None:
+            instance.total_cost = self.update_merch_lines(instance, lines)
         super().update(instance, validated_data)
-        return instance
+        MerchSpendMonthly.objects.move(
+            *old_spend, MerchSpendMonthly.objects.get_key(instance), instance.total_cost
+        )
+        return MerchApplication.objects.prefetch_related(
+            Prefetch(
+                "merch_in_applications",
+                queryset=MerchInApplication.objects.select_related("merch__category"),
+            )
+        ).get(pk=instance.pk)
+
+
+BULK_APPLICATIONS_MAX_SIZE = 500
+
+
+class MerchLineBulkSerializer(serializers.Serializer):
+    """Serializer for merch items of an application in bulk creation."""
+
+    id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, max_value=100, default=1)
+
+
+class MerchApplicationBulkItemSerializer(serializers.Serializer):
+    """Serializer for an application in bulk creation."""
+
+    ambassador = serializers.IntegerField()
+    merch = MerchLineBulkSerializer(many=True, allow_empty=False)
+
+
+class MerchApplicationBulkResultSerializer(serializers.ModelSerializer):
+    """Serializer to display merch applications created in bulk."""
+
+    merch_cost = serializers.FloatField(source="total_cost")
+
+    class Meta:
+        model = MerchApplication
+        fields = ("id", "application_number", "ambassador", "merch_cost")
+
+
+class MerchApplicationBulkCreateSerializer(serializers.Serializer):
+    """
+    Serializer to create many merch applications at once. Ambassadors and merch
+    of all the applications are checked by one query each, applications and
+    their merch items are inserted by bulk queries in one transaction.
+    """
+
+    applications = MerchApplicationBulkItemSerializer(
+        many=True, allow_empty=False, max_length=BULK_APPLICATIONS_MAX_SIZE
+    )
+
+    def validate_applications(self, applications):
+        """
+        Replaces IDs with objects, reports unknown IDs for every application.
+        Quantities of repeated merch in an application are summed up and
+        validated like in MerchApplicationCreateUpdateSerializer.
+        """
+        ambassadors = Ambassador.objects.in_bulk(
+            {item["ambassador"] for item in applications}
+        )
+        merch = Merch.objects.in_bulk(
+            {line["id"] for item in applications for line in item["merch"]}
+        )
+        quantity_field = MerchLineBulkSerializer().fields["quantity"]
+        quantities = []
+        errors = []
+        for item in applications:
+            item_errors = {}
+            if item["ambassador"] not in ambassadors:
+                item_errors["ambassador"] = [does_not_exist_error(item["ambassador"])]
+            item_quantities, merch_errors = sum_merch_quantities(
+                [(line["id"], line["quantity"]) for line in item["merch"]],
+                quantity_field,
+            )
+            unknown_merch = [
+                line["id"] for line in item["merch"] if line["id"] not in merch
+            ]
+            if unknown_merch:
+                item_errors["merch"] = [
+                    does_not_exist_error(pk) for pk in unknown_merch
+                ]
+            elif any(merch_errors):
+                item_errors["merch"] = merch_errors
+            quantities.append(item_quantities)
+            errors.append(item_errors)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return [
+            {
+                "ambassador": ambassadors[item["ambassador"]],
+                "merch": [
+                    (merch[pk], quantity) for pk, quantity in item_quantities.items()
+                ],
+            }
+            for item, item_quantities in zip(applications, quantities)
+        ]
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """Creates the applications, returns them in the order of the request."""
+        items = validated_data["applications"]
+        applications = MerchApplication.objects.bulk_create(
+            MerchApplication(
+                application_number=number,
+                ambassador=item["ambassador"],
+                tutor=validated_data["tutor"],
+                total_cost=sum(
+                    quantity * merch.cost for merch, quantity in item["merch"]
+                ),
+            )
+            for item, number in zip(items, generate_application_numbers(len(items)))
+        )
+        MerchInApplication.objects.bulk_create(
+            MerchInApplication(
+                application=application,
+                merch=merch,
+                quantity=quantity,
+                unit_cost=merch.cost,
+            )
+            for application, item in zip(applications, items)
+            for merch, quantity in item["merch"]
+        )
+        MerchSpendMonthly.objects.add_applications(
+            MerchApplication.objects.filter(
+                pk__in=[application.pk for application in applications]
+            )
+        )
+        return applications
+
+    def to_representation(self, instance):
+        return {
+            "applications": MerchApplicationBulkResultSerializer(
+                instance, many=True
+            ).data
+        }
 
 
 class MonthBudgetSerializer(serializers.Serializer):
@@ -294,6 +505,46 @@ class MerchSerializer(serializers.ModelSerializer):
         return queryset.select_related("category")
 
 
+class CostBucketSerializer(serializers.Serializer):
+    """Serializer to display a merch cost histogram bucket."""
+
+    min_cost = serializers.FloatField()
+    max_cost = serializers.FloatField()
+    count = serializers.IntegerField()
+
+
+class CategoryFacetSerializer(serializers.Serializer):
+    """Serializer to display the number of merch in a category."""
+
+    slug = serializers.SlugField()
+    name = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class SizeFacetSerializer(serializers.Serializer):
+    """Serializer to display the number of merch of a size."""
+
+    size = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class MerchFacetsSerializer(serializers.Serializer):
+    """Serializer to display facets of the merch catalogue."""
+
+    count = serializers.IntegerField()
+    min_cost = serializers.FloatField(allow_null=True)
+    max_cost = serializers.FloatField(allow_null=True)
+    cost_buckets = CostBucketSerializer(many=True)
+    categories = CategoryFacetSerializer(many=True)
+    sizes = SizeFacetSerializer(many=True)
+
+
+class MerchFacetsQuerySerializer(serializers.Serializer):
+    """Serializer to validate query parameters of merch facets."""
+
+    bucket_size = serializers.FloatField(min_value=0.01, default=100)
+
+
 class MerchCreateUpdateSerializer(serializers.ModelSerializer):
     """Serializer to create/edit merch species."""
 
@@ -329,9 +580,3 @@ class DestroyObjectSuccessSerializer(serializers.Serializer):
     """Serializer to provide json response after objects deletion."""
 
     message = serializers.CharField()
-
-
-class GoogleSheetAPISerializer(serializers.Serializer):
-    """Serializer for link to Google Sheet."""
-
-    link = serializers.URLField()
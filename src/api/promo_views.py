@@ -6,36 +6,54 @@ from drf_standardized_errors.openapi_serializers import (
     ErrorResponse401Serializer,
     ErrorResponse403Serializer,
     ErrorResponse404Serializer,
-    ValidationErrorEnum,
     ValidationErrorResponseSerializer,
 )
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework import filters, permissions, response, status, viewsets
+from rest_framework import permissions, response, status, viewsets
 from rest_framework.decorators import action
 
-from .filters import MerchApplicationsFilter, MerchFilter, PromocodeFilter
-from .google_sheets_examples import (
-    create_merch_applications_sheet,
-    create_promocodes_sheet,
+from .export_serializers import ExportJobSerializer
+from .exports import (
+    BUDGET_SHEET,
+    export_file_response,
+    get_file_format,
+    iter_budget_rows,
+    iter_merch_application_rows,
+    iter_promocode_rows,
 )
-from .mixins import DestroyWithPayloadMixin
+from .filters import (
+    MerchApplicationsFilter,
+    MerchFilter,
+    PromocodeFilter,
+    SearchRankOrderingFilter,
+)
+from .google_sheets_examples import MERCH_APPLICATIONS_SHEET, PROMOCODES_SHEET
+from .mixins import DestroyWithPayloadMixin, ExportJobMixin
+from .models import EXPORT_MERCH_APPLICATIONS, EXPORT_PROMOCODES
 from .permissions import IsTutorOrReadOnly
 from .promo_serializers import (
     DestroyObjectSuccessSerializer,
-    GoogleSheetAPISerializer,
+    MerchApplicationBulkCreateSerializer,
     MerchApplicationCreateUpdateSerializer,
     MerchApplicationSerializer,
     MerchCategorySerializer,
     MerchCreateUpdateSerializer,
+    MerchFacetsQuerySerializer,
+    MerchFacetsSerializer,
     MerchSerializer,
     PromocodeCreateUpdateSerializer,
     PromocodeSerializer,
     YearBudgetSerializer,
 )
-from .utils import YEAR_MONTHS, generate_application_number
-from ambassadors.models import Ambassador
-from promo.models import Merch, MerchApplication, MerchCategory, Promocode
+from .utils import generate_application_number, get_merch_facets, get_year_budget
+from promo.models import (
+    Merch,
+    MerchApplication,
+    MerchCategory,
+    MerchSpendMonthly,
+    Promocode,
+)
 
 year = openapi.Parameter(
     "year",
@@ -43,6 +61,24 @@ year = openapi.Parameter(
     description=("desired year, enter 4 digits in the format 1XXX or 2XXX"),
     type=openapi.TYPE_INTEGER,
 )
+incremental = openapi.Parameter(
+    "incremental",
+    openapi.IN_QUERY,
+    description=(
+        "update the persistent spreadsheet of the export (only changed rows are "
+        "written, the link stays the same) instead of creating a new one"
+    ),
+    type=openapi.TYPE_BOOLEAN,
+)
+EXPORT_JOB_RESPONSES = {202: ExportJobSerializer, 401: ErrorResponse401Serializer}
+file_format = openapi.Parameter(
+    "file_format",
+    openapi.IN_QUERY,
+    description="format of the exported file",
+    type=openapi.TYPE_STRING,
+    enum=["csv", "xlsx"],
+    default="csv",
+)
 ambassadors = openapi.Parameter(
     "ambassadors",
     openapi.IN_QUERY,
@@ -172,24 +208,51 @@ ambassadors = openapi.Parameter(
     ),
 )
 @method_decorator(
-    name="export_to_google_sheet",
+    name="bulk_create",
     decorator=swagger_auto_schema(
-        operation_summary="Export to Google sheet",
+        operation_summary="Create many merch applications",
         responses={
-            200: GoogleSheetAPISerializer,
+            201: MerchApplicationBulkCreateSerializer,
             400: ValidationErrorResponseSerializer,
             401: ErrorResponse401Serializer,
         },
     ),
 )
-class MerchApplicationViewSet(DestroyWithPayloadMixin, viewsets.ModelViewSet):
+@method_decorator(
+    name="budget_export",
+    decorator=swagger_auto_schema(
+        operation_summary="Download the annual merch budget as a file",
+        responses={
+            200: openapi.Response("CSV or XLSX file"),
+            400: ValidationErrorResponseSerializer,
+            401: ErrorResponse401Serializer,
+        },
+        manual_parameters=[year, ambassadors, file_format],
+    ),
+)
+@method_decorator(
+    name="export",
+    decorator=swagger_auto_schema(
+        operation_summary="Download merch applications as a file",
+        responses={
+            200: openapi.Response("CSV or XLSX file"),
+            400: ValidationErrorResponseSerializer,
+            401: ErrorResponse401Serializer,
+        },
+        manual_parameters=[file_format],
+    ),
+)
+class MerchApplicationViewSet(
+    DestroyWithPayloadMixin, ExportJobMixin, viewsets.ModelViewSet
+):
     """
     ViewSet for merch applications and annual merch budgets.
     By default, sorting is done by ID.
     You can also sort them by the following fields: ambassador__name,
     ambassador__clothing_size, ambassador__shoe_size, ambassador__address__postal_code,
     application_number, merch__name, 'tutor__first_name,tutor__last_name' (combined
-    curator's first and last names), created. Example: ?ordering=ambassador__name
+    curator's first and last names), created, total_cost (merch cost).
+    Example: ?ordering=ambassador__name
     (in the end of URL).
     For reverse sorting insert a minus sign before the field name
     like this: ?ordering=-ambassador__name (in the end of URL).
@@ -204,7 +267,7 @@ class MerchApplicationViewSet(DestroyWithPayloadMixin, viewsets.ModelViewSet):
     queryset = MerchApplication.objects.all()
     serializer_class = MerchApplicationSerializer
     permission_classes = [permissions.IsAuthenticated, IsTutorOrReadOnly]
-    filter_backends = [rf_filters.DjangoFilterBackend, filters.OrderingFilter]
+    filter_backends = [rf_filters.DjangoFilterBackend, SearchRankOrderingFilter]
     filterset_class = MerchApplicationsFilter
     ordering_fields = [
         "ambassador__name",
@@ -216,6 +279,7 @@ class MerchApplicationViewSet(DestroyWithPayloadMixin, viewsets.ModelViewSet):
         "tutor__first_name",
         "tutor__last_name",
         "created",
+        "total_cost",
     ]
     ordering = ["pk"]
 
@@ -228,7 +292,9 @@ class MerchApplicationViewSet(DestroyWithPayloadMixin, viewsets.ModelViewSet):
         if self.action == "budget_info":
             return YearBudgetSerializer
         if self.action == "export_to_google_sheet":
-            return GoogleSheetAPISerializer
+            return ExportJobSerializer
+        if self.action == "bulk_create":
+            return MerchApplicationBulkCreateSerializer
         if self.action in ["create", "partial_update"]:
             return MerchApplicationCreateUpdateSerializer
         return MerchApplicationSerializer
@@ -238,6 +304,45 @@ class MerchApplicationViewSet(DestroyWithPayloadMixin, viewsets.ModelViewSet):
             tutor=self.request.user, application_number=generate_application_number()
         )
 
+    def get_year_budget(self):
+        """Calculates the annual budget for the year and ambassadors parameters."""
+        year_param = self.request.query_params.get("year", "")
+        year = year_param if re.match(r"[1-2][0-9]{3}", year_param) else None
+        ambassadors_ids = self.request.query_params.get("ambassadors")
+        return get_year_budget(
+            year,
+            (
+                [pk for pk in ambassadors_ids.split(",") if pk.strip().isdigit()]
+                if ambassadors_ids
+                else None
+            ),
+        )
+
+    def perform_destroy(self, instance):
+        with MerchSpendMonthly.objects.track([instance.pk]):
+            instance.delete()
+
+    @action(
+        methods=["post"],
+        detail=False,
+        filter_backends=[],
+        pagination_class=None,
+        url_path="bulk",
+    )
+    def bulk_create(self, request):
+        """
+        Creates many merch applications at once (up to 500), for example for all
+        ambassadors of a cohort. Takes {"applications": [{"ambassador": 1,
+        "merch": [{"id": 1, "quantity": 2}]}, ...]}.
+        Either all the applications are created or none of them: errors are
+        reported for every application by its index in the list.
+        Returns the created applications in the order of the request.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(tutor=request.user)
+        return response.Response(serializer.data, status=status.HTTP_201_CREATED)
+
     @action(methods=["get"], detail=False, filter_backends=[])
     def budget_info(self, request):
         """
@@ -249,63 +354,13 @@ class MerchApplicationViewSet(DestroyWithPayloadMixin, viewsets.ModelViewSet):
         to view their annual budgets.
         You can specify several comma-separated ambassador IDs like this:
         ?year=2023&ambassadors=1,2
+
+        Ambassadors who have not received any merch during the year are not shown.
         """
-        year_param = self.request.query_params.get("year", "")
-        year = year_param if re.match(r"[1-2][0-9]{3}", year_param) else None
-        ambassadors_ids = self.request.query_params.get("ambassadors")
-        ambassadors = (
-            Ambassador.objects.filter(id__in=ambassadors_ids.split(","))
-            if ambassadors_ids
-            else Ambassador.objects.all()
-        )
-        year_qs = (
-            self.get_queryset().filter(created__year=year, ambassador__in=ambassadors)
-            if ambassadors_ids
-            else self.get_queryset().filter(created__year=year)
-        )
-        year_list = [application for application in year_qs]
-        year_total = sum([application.merch_cost for application in year_list])
-        if year_total == 0:
+        payload = self.get_year_budget()
+        if payload is None:
             return response.Response([], status=status.HTTP_200_OK)
 
-        months = []
-        for month in YEAR_MONTHS:
-            month_list = [app for app in year_list if app.created.month == month[1]]
-            month_total = sum([application.merch_cost for application in month_list])
-            months.append({"month": month[0], "month_total": month_total})
-
-        ambassadors_budgets = []
-        for person in ambassadors:
-            ambassador_list = [app for app in year_list if app.ambassador == person]
-            ambassador_year_total = sum(
-                [application.merch_cost for application in ambassador_list]
-            )
-            ambassador_months_budgets = []
-            for month in YEAR_MONTHS:
-                ambassador_month_list = [
-                    app for app in ambassador_list if app.created.month == month[1]
-                ]
-                ambassador_month_total = sum(
-                    [application.merch_cost for application in ambassador_month_list]
-                )
-                ambassador_months_budgets.append(
-                    {"month": month[0], "month_total": ambassador_month_total}
-                )
-
-            ambassadors_budgets.append(
-                {
-                    "ambassador_name": person.name,
-                    "ambassador_year_total": ambassador_year_total,
-                    "ambassador_months_budgets": ambassador_months_budgets,
-                }
-            )
-
-        payload = {
-            "year": year,
-            "year_total": year_total,
-            "months": months,
-            "ambassadors": ambassadors_budgets,
-        }
         serializer = self.get_serializer_class()(
             data=payload,
             context={"request": request, "format": self.format_kwarg, "view": self},
@@ -316,31 +371,64 @@ class MerchApplicationViewSet(DestroyWithPayloadMixin, viewsets.ModelViewSet):
             )
         return response.Response(serializer.data, status=status.HTTP_200_OK)
 
-    @action(methods=["get"], detail=False, filter_backends=[])
+    @swagger_auto_schema(
+        method="post",
+        operation_summary="Export to Google sheet",
+        responses=EXPORT_JOB_RESPONSES,
+        manual_parameters=[incremental],
+    )
+    # GET is kept for the clients written before the exports were queued.
+    @swagger_auto_schema(
+        method="get",
+        operation_summary="Export to Google sheet (deprecated, use POST)",
+        deprecated=True,
+        responses=EXPORT_JOB_RESPONSES,
+        manual_parameters=[incremental],
+    )
+    @action(methods=["post", "get"], detail=False, filter_backends=[])
     def export_to_google_sheet(self, request):
-        """Returns a link to Google sheet with information about sending merch."""
-        all_applications_qs = self.get_queryset()
-        spreadsheet_link = create_merch_applications_sheet(all_applications_qs)
-        serializer = self.get_serializer_class()(
-            data={"link": spreadsheet_link},
-            context={"request": request, "format": self.format_kwarg, "view": self},
+        """
+        Queues an export of sending merch to Google sheet and returns the export job.
+        The link to the sheet appears in the job when it is done,
+        see /export_jobs/{id}/ (the URL is in the Location header).
+        With ?incremental=true the persistent spreadsheet is updated instead
+        of creating a new one.
+        """
+        return self.enqueue_export(request, EXPORT_MERCH_APPLICATIONS)
+
+    @action(methods=["get"], detail=False, pagination_class=None)
+    def export(self, request):
+        """
+        Downloads merch applications as a CSV (default) or XLSX file:
+        ?file_format=xlsx. Every merch item of an application gets its own row.
+        Filters and ordering work the same way as for the list of applications.
+        """
+        return export_file_response(
+            MERCH_APPLICATIONS_SHEET,
+            iter_merch_application_rows(self.filter_queryset(self.get_queryset())),
+            "merch_applications",
+            get_file_format(request),
+        )
+
+    @action(
+        methods=["get"],
+        detail=False,
+        filter_backends=[],
+        pagination_class=None,
+        url_path="budget_info/export",
+    )
+    def budget_export(self, request):
+        """
+        Downloads the annual merch budget as a CSV (default) or XLSX file:
+        ?year=2023&file_format=xlsx. Takes the same parameters as budget_info.
+        """
+        file_format = get_file_format(request)
+        return export_file_response(
+            BUDGET_SHEET,
+            iter_budget_rows(self.get_year_budget()),
+            "merch_budget",
+            file_format,
         )
-        if not serializer.is_valid():
-            payload = {
-                "type": ValidationErrorEnum.VALIDATION_ERROR,
-                "errors": [
-                    {
-                        "code": "invalid",
-                        "detail": serializer.errors["link"][0],
-                        "attr": "link",
-                    }
-                ],
-            }
-            return response.Response(
-                ValidationErrorResponseSerializer(payload).data,
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        return response.Response(serializer.data, status=status.HTTP_200_OK)
 
 
 @method_decorator(
@@ -403,6 +491,12 @@ class MerchCategoryViewSet(DestroyWithPayloadMixin, viewsets.ModelViewSet):
     serializer_class = MerchCategorySerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def perform_destroy(self, instance):
+        with MerchSpendMonthly.objects.track_merch(
+            Merch.objects.filter(category=instance)
+        ):
+            instance.delete()
+
 
 @method_decorator(
     name="list",
@@ -499,6 +593,18 @@ class MerchCategoryViewSet(DestroyWithPayloadMixin, viewsets.ModelViewSet):
         },
     ),
 )
+@method_decorator(
+    name="facets",
+    decorator=swagger_auto_schema(
+        operation_summary="Get facets of merch",
+        responses={
+            200: MerchFacetsSerializer,
+            400: ValidationErrorResponseSerializer,
+            401: ErrorResponse401Serializer,
+        },
+        query_serializer=MerchFacetsQuerySerializer,
+    ),
+)
 class MerchViewSet(DestroyWithPayloadMixin, viewsets.ModelViewSet):
     """
     ViewSet for merch species.
@@ -513,7 +619,7 @@ class MerchViewSet(DestroyWithPayloadMixin, viewsets.ModelViewSet):
     queryset = Merch.objects.all()
     serializer_class = MerchSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [rf_filters.DjangoFilterBackend, filters.OrderingFilter]
+    filter_backends = [rf_filters.DjangoFilterBackend, SearchRankOrderingFilter]
     filterset_class = MerchFilter
     ordering = ["pk"]
 
@@ -521,10 +627,40 @@ class MerchViewSet(DestroyWithPayloadMixin, viewsets.ModelViewSet):
         return MerchSerializer.setup_eager_loading(Merch.objects.all())
 
     def get_serializer_class(self):
+        if self.action == "facets":
+            return MerchFacetsSerializer
         if self.action in ["create", "partial_update"]:
             return MerchCreateUpdateSerializer
         return MerchSerializer
 
+    def perform_update(self, serializer):
+        renamed = {"name", "size"} & serializer.validated_data.keys()
+        merch = serializer.save()
+        if renamed:
+            # The name and the size are shown in the rows of the applications.
+            MerchApplication.objects.filter(merch=merch).touch()
+
+    def perform_destroy(self, instance):
+        with MerchSpendMonthly.objects.track_merch([instance]):
+            instance.delete()
+
+    @action(methods=["get"], detail=False, pagination_class=None)
+    def facets(self, request):
+        """
+        Shows facets of merch for the catalogue: the number of merch, the cost
+        range, the cost histogram and the numbers of merch by categories and
+        sizes. Takes the same filters as the list of merch.
+        The width of the histogram buckets can be set like this: ?bucket_size=500
+        (100 by default). Empty buckets are not shown.
+        """
+        params = MerchFacetsQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        facets = get_merch_facets(
+            self.filter_queryset(self.get_queryset()),
+            params.validated_data["bucket_size"],
+        )
+        return response.Response(self.get_serializer(facets).data)
+
 
 @method_decorator(
     name="list",
@@ -622,17 +758,18 @@ class MerchViewSet(DestroyWithPayloadMixin, viewsets.ModelViewSet):
     ),
 )
 @method_decorator(
-    name="export_to_google_sheet",
+    name="export",
     decorator=swagger_auto_schema(
-        operation_summary="Export to Google sheet",
+        operation_summary="Download promocodes as a file",
         responses={
-            200: GoogleSheetAPISerializer,
+            200: openapi.Response("CSV or XLSX file"),
             400: ValidationErrorResponseSerializer,
             401: ErrorResponse401Serializer,
         },
+        manual_parameters=[file_format],
     ),
 )
-class PromocodeViewSet(DestroyWithPayloadMixin, viewsets.ModelViewSet):
+class PromocodeViewSet(DestroyWithPayloadMixin, ExportJobMixin, viewsets.ModelViewSet):
     """
     ViewSet for promocodes.
     By default, sorting is done by ID.
@@ -647,7 +784,7 @@ class PromocodeViewSet(DestroyWithPayloadMixin, viewsets.ModelViewSet):
     queryset = Promocode.objects.all()
     serializer_class = PromocodeSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [rf_filters.DjangoFilterBackend, filters.OrderingFilter]
+    filter_backends = [rf_filters.DjangoFilterBackend, SearchRankOrderingFilter]
     filterset_class = PromocodeFilter
     ordering_fields = [
         "code",
@@ -663,33 +800,45 @@ class PromocodeViewSet(DestroyWithPayloadMixin, viewsets.ModelViewSet):
 
     def get_serializer_class(self):
         if self.action == "export_to_google_sheet":
-            return GoogleSheetAPISerializer
+            return ExportJobSerializer
         if self.action in ["create", "partial_update"]:
             return PromocodeCreateUpdateSerializer
         return PromocodeSerializer
 
-    @action(methods=["get"], detail=False, filter_backends=[])
+    @swagger_auto_schema(
+        method="post",
+        operation_summary="Export to Google sheet",
+        responses=EXPORT_JOB_RESPONSES,
+        manual_parameters=[incremental],
+    )
+    # GET is kept for the clients written before the exports were queued.
+    @swagger_auto_schema(
+        method="get",
+        operation_summary="Export to Google sheet (deprecated, use POST)",
+        deprecated=True,
+        responses=EXPORT_JOB_RESPONSES,
+        manual_parameters=[incremental],
+    )
+    @action(methods=["post", "get"], detail=False, filter_backends=[])
     def export_to_google_sheet(self, request):
-        """Returns a link to Google sheet with information about promocodes."""
-        all_promocodes_qs = self.get_queryset()
-        spreadsheet_link = create_promocodes_sheet(all_promocodes_qs)
-        serializer = self.get_serializer_class()(
-            data={"link": spreadsheet_link},
-            context={"request": request, "format": self.format_kwarg, "view": self},
+        """
+        Queues an export of promocodes to Google sheet and returns the export job.
+        The link to the sheet appears in the job when it is done,
+        see /export_jobs/{id}/ (the URL is in the Location header).
+        With ?incremental=true the persistent spreadsheet is updated instead
+        of creating a new one.
+        """
+        return self.enqueue_export(request, EXPORT_PROMOCODES)
+
+    @action(methods=["get"], detail=False, pagination_class=None)
+    def export(self, request):
+        """
+        Downloads promocodes as a CSV (default) or XLSX file: ?file_format=xlsx.
+        Filters and ordering work the same way as for the list of promocodes.
+        """
+        return export_file_response(
+            PROMOCODES_SHEET,
+            iter_promocode_rows(self.filter_queryset(self.get_queryset())),
+            "promocodes",
+            get_file_format(request),
         )
-        if not serializer.is_valid():
-            payload = {
-                "type": ValidationErrorEnum.VALIDATION_ERROR,
-                "errors": [
-                    {
-                        "code": "invalid",
-                        "detail": serializer.errors["link"][0],
-                        "attr": "link",
-                    }
-                ],
-            }
-            return response.Response(
-                ValidationErrorResponseSerializer(payload).data,
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        return response.Response(serializer.data, status=status.HTTP_200_OK)
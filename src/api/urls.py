@@ -5,6 +5,8 @@ from rest_framework import permissions
 from rest_framework.routers import DefaultRouter
 
 from .ambassadors_views import AmbassadorViewSet
+from .dictionary_views import DictionaryView
+from .export_views import ExportJobViewSet
 from .promo_views import (
     MerchApplicationViewSet,
     MerchCategoryViewSet,
@@ -37,6 +39,9 @@ router.register("promocodes", PromocodeViewSet)
 # History
 router.register("edit_history", UserActionsViewSet)
 
+# Exports
+router.register("export_jobs", ExportJobViewSet)
+
 # Guides
 router.register("guides", GuideViewSet)
 router.register("guide_tasks", GuideTaskViewSet)
@@ -51,6 +56,7 @@ router.register("content_page", ContentPageViewSet)
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("dictionaries/", DictionaryView.as_view(), name="dictionaries"),
     path("auth/", include("djoser.urls")),
     path("auth/", include("djoser.urls.jwt")),
 ]
@@ -1,8 +1,10 @@
-import random
+from collections import Counter
 
+from django.db.models import Count, F, Max, Min
+from django.db.models.functions import Floor
 from django.utils import timezone
 
-from promo.models import MerchApplication
+from promo.models import ApplicationNumberCounter, MerchSpendMonthly
 
 YEAR_MONTHS = [
     ("january", 1, "январь"),
@@ -22,11 +24,122 @@ YEAR_MONTHS = [
 LENGTH = 6
 
 
-def generate_application_number():
-    """Generates random ID for a merch application."""
-    time = timezone.localdate()
-    random_int = random.randrange(100000, 1000000)
-    number = str(time) + "-" + str(random_int)
-    if MerchApplication.objects.filter(application_number=number):
-        number += str(random.randrange(100000, 1000000))
-    return number
+def generate_application_numbers(count: int) -> list[str]:
+    """
+    Generates unique numbers for merch applications in the YYYY-MM-DD-NNNNNN
+    format, numbers of every day start from 000001. A block of numbers is
+    reserved by one database query.
+    """
+    day = timezone.localdate()
+    return [
+        f"{day}-{number:0{LENGTH}d}"
+        for number in ApplicationNumberCounter.objects.reserve(day, count)
+    ]
+
+
+def generate_application_number() -> str:
+    """Generates a unique number for a merch application."""
+    return generate_application_numbers(1)[0]
+
+
+def get_year_budget(year, ambassadors_ids=None) -> dict | None:
+    """
+    Calculates the annual merch budget with detailed information by months
+    and ambassadors.
+
+    Precalculated monthly expenses of ambassadors (MerchSpendMonthly) are used,
+    so only ambassadors x 12 rows are read. Ambassadors who have not received
+    any merch during the year are skipped. Returns None if there were no merch
+    expenses.
+    """
+    spend = MerchSpendMonthly.objects.filter(year=year)
+    if ambassadors_ids:
+        spend = spend.filter(ambassador_id__in=ambassadors_ids)
+    return build_year_budget(
+        year,
+        spend.values_list("ambassador_id", "ambassador__name", "month", "total")
+        .order_by("ambassador_id", "month")
+        .iterator(),
+    )
+
+
+def build_year_budget(year, rows) -> dict | None:
+    """
+    Assembles the annual merch budget in the YearBudgetSerializer format.
+    Takes (ambassador_id, ambassador_name, month_number, total) rows.
+    """
+    year_months = [0] * len(YEAR_MONTHS)
+    ambassadors = {}
+    for ambassador_id, ambassador_name, month_number, total in rows:
+        if not total:
+            continue
+        month_index = month_number - 1
+        year_months[month_index] += total
+        if ambassador_id not in ambassadors:
+            ambassadors[ambassador_id] = (ambassador_name, [0] * len(YEAR_MONTHS))
+        ambassadors[ambassador_id][1][month_index] += total
+
+    year_total = sum(year_months)
+    if year_total == 0:
+        return None
+    return {
+        "year": year,
+        "year_total": year_total,
+        "months": [
+            {"month": month[0], "month_total": month_total}
+            for month, month_total in zip(YEAR_MONTHS, year_months)
+        ],
+        "ambassadors": [
+            {
+                "ambassador_name": ambassador_name,
+                "ambassador_year_total": sum(ambassador_months),
+                "ambassador_months_budgets": [
+                    {"month": month[0], "month_total": month_total}
+                    for month, month_total in zip(YEAR_MONTHS, ambassador_months)
+                ],
+            }
+            for ambassador_name, ambassador_months in ambassadors.values()
+        ],
+    }
+
+
+def get_merch_facets(queryset, bucket_size: float) -> dict:
+    """
+    Calculates facets of the merch queryset: cost histogram with buckets of
+    the given size, numbers of merch by categories and sizes.
+
+    All the facets are taken from one query grouped by category, size and cost
+    bucket, the groups are summed up afterwards. Empty buckets are skipped.
+    """
+    groups = list(
+        queryset.order_by()
+        .annotate(bucket=Floor(F("cost") / bucket_size))
+        .values("category__slug", "category__name", "size", "bucket")
+        .annotate(count=Count("pk"), min_cost=Min("cost"), max_cost=Max("cost"))
+    )
+    buckets, categories, sizes = Counter(), Counter(), Counter()
+    for group in groups:
+        buckets[int(group["bucket"])] += group["count"]
+        categories[group["category__slug"], group["category__name"]] += group["count"]
+        sizes[group["size"]] += group["count"]
+    return {
+        "count": sum(group["count"] for group in groups),
+        "min_cost": min((group["min_cost"] for group in groups), default=None),
+        "max_cost": max((group["max_cost"] for group in groups), default=None),
+        "cost_buckets": [
+            {
+                "min_cost": bucket * bucket_size,
+                "max_cost": (bucket + 1) * bucket_size,
+                "count": bucket_count,
+            }
+            for bucket, bucket_count in sorted(buckets.items())
+        ],
+        "categories": [
+            {"slug": slug, "name": name, "count": category_count}
+            for (slug, name), category_count in sorted(categories.items())
+        ],
+        "sizes": [
+            {"size": size, "count": size_count}
+            for size, size_count in sorted(sizes.items())
+        ],
+    }
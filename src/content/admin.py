@@ -7,6 +7,7 @@ from content.models import (
     GuideTask,
     GuideTaskGuideKit,
     MerchPhoto,
+    PlatformRule,
 )
 
 
@@ -58,3 +59,10 @@ class ContentAdmin(admin.ModelAdmin):
         "link",
         "is_guide_content",
     ]
+
+
+@admin.register(PlatformRule)
+class PlatformRuleAdmin(admin.ModelAdmin):
+    list_display = ["id", "domain", "path_prefix", "platform", "type"]
+    list_filter = ["type"]
+    search_fields = ["domain", "platform"]
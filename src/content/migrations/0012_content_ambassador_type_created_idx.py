@@ -0,0 +1,20 @@
+# Generated by Django 5.0.2 on 2026-10-18 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content", "0011_remove_content_comment"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="content",
+            index=models.Index(
+                fields=["ambassador", "type", "created"],
+                name="content_amb_type_created_idx",
+            ),
+        ),
+    ]
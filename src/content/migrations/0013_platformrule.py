@@ -0,0 +1,92 @@
+# Generated by Django 5.0.2 on 2026-10-18 19:00
+
+from django.db import migrations, models
+
+# Review platforms recognized before the rules were stored in the database
+# (domain, path prefix, platform)
+REVIEW_PLATFORMS = [
+    ("career.habr.com", "", "career.habr.com"),
+    ("sravni.ru", "", "sravni.ru"),
+    ("tutortop.ru", "", "tutortop.ru"),
+    ("irecommend.ru", "", "irecommend.ru"),
+    ("journal.tinkoff.ru", "", "journal.tinkoff.ru"),
+    ("mooc.ru", "", "mooc.ru"),
+    ("katalog-kursov.ru", "", "katalog-kursov.ru"),
+    ("otzovik.com", "", "otzovik.com"),
+    ("yandex.ru", "maps", "yandex.ru/maps"),
+    ("google.com", "maps", "google.com/maps"),
+]
+
+
+def create_review_platform_rules(apps, schema_editor):
+    PlatformRule = apps.get_model("content", "PlatformRule")
+    PlatformRule.objects.bulk_create(
+        PlatformRule(domain=domain, path_prefix=path, platform=platform, type="review")
+        for domain, path, platform in REVIEW_PLATFORMS
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content", "0012_content_ambassador_type_created_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlatformRule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "domain",
+                    models.CharField(
+                        help_text="Без www, например career.habr.com",
+                        max_length=253,
+                        verbose_name="Домен",
+                    ),
+                ),
+                (
+                    "path_prefix",
+                    models.CharField(
+                        blank=True,
+                        help_text="Без слешей по краям, например maps",
+                        max_length=200,
+                        verbose_name="Начало пути",
+                    ),
+                ),
+                (
+                    "platform",
+                    models.CharField(max_length=200, verbose_name="Платформа"),
+                ),
+                (
+                    "type",
+                    models.CharField(
+                        choices=[("review", "Отзыв"), ("content", "Контент")],
+                        default="content",
+                        max_length=200,
+                        verbose_name="Тип (отзыв/контент)",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Правило платформы",
+                "verbose_name_plural": "Правила платформ",
+                "ordering": ["domain", "path_prefix"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="platformrule",
+            constraint=models.UniqueConstraint(
+                fields=("domain", "path_prefix"), name="unique_platform_rule"
+            ),
+        ),
+        migrations.RunPython(create_review_platform_rules, migrations.RunPython.noop),
+    ]
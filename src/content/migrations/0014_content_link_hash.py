@@ -0,0 +1,137 @@
+# Generated by Django 5.0.2 on 2026-10-18 20:00
+
+import hashlib
+import logging
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+# Copies of content.models.normalize_link and get_link_hash as of this
+# migration, the hashes of the existing links must not follow later changes.
+TRACKING_PARAMS = ("utm_", "yclid", "gclid", "fbclid", "_openstat")
+DEFAULT_PORTS = {80, 443}
+NO_IMAGE_VALUES = (None, "", "None")
+
+
+def normalize_link(link: str) -> str:
+    link = link.strip()
+    try:
+        parts = urlsplit(link)
+        if not parts.netloc:
+            parts = urlsplit(f"//{link}")
+        port = parts.port
+    except ValueError:
+        return link
+    host = (parts.hostname or "").rstrip(".").removeprefix("www.")
+    if port and port not in DEFAULT_PORTS:
+        host = f"{host}:{port}"
+    query = urlencode(
+        sorted(
+            (name, value)
+            for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not name.lower().startswith(TRACKING_PARAMS)
+        )
+    )
+    path = parts.path.rstrip("/")
+    return f"{host}{path}?{query}" if query else f"{host}{path}"
+
+
+def get_link_hash(link: str) -> str:
+    return hashlib.sha256(normalize_link(link).encode()).hexdigest()
+
+
+def aggregate(queryset, expression):
+    return Subquery(
+        queryset.order_by()
+        .values("ambassador")
+        .annotate(value=expression)
+        .values("value")
+    )
+
+
+def fill_link_hashes(apps, schema_editor):
+    """
+    Fills hashes of the links and merges duplicates into the earliest content
+    of an ambassador with the link, so the unique constraint can be added.
+    The kept content becomes guide content if any duplicate was and gets an
+    image of a duplicate if it has none. The deleted rows are logged.
+    """
+    Content = apps.get_model("content", "Content")
+    last_id = 0
+    while chunk := list(
+        Content.objects.filter(pk__gt=last_id)
+        .order_by("pk")
+        .only("pk", "link")[:CHUNK_SIZE]
+    ):
+        for content in chunk:
+            content.link_hash = get_link_hash(content.link)
+        Content.objects.bulk_update(chunk, ["link_hash"])
+        last_id = chunk[-1].pk
+
+    duplicates = (
+        Content.objects.order_by()
+        .values("ambassador", "link_hash")
+        .annotate(count=Count("pk"))
+        .filter(count__gt=1)
+    )
+    ambassador_ids = set()
+    for duplicate in duplicates.iterator():
+        kept, *repeated = Content.objects.filter(
+            ambassador=duplicate["ambassador"], link_hash=duplicate["link_hash"]
+        ).order_by("pk")
+        for content in repeated:
+            logger.warning(
+                "Content %s (ambassador %s, %s, created %s) is deleted as "
+                "a duplicate of content %s.",
+                content.pk,
+                content.ambassador_id,
+                content.link,
+                content.created,
+                kept.pk,
+            )
+            kept.is_guide_content |= content.is_guide_content
+            if kept.image.name in NO_IMAGE_VALUES:
+                kept.image = content.image
+        kept.save(update_fields=["is_guide_content", "image"])
+        Content.objects.filter(pk__in=[content.pk for content in repeated]).delete()
+        ambassador_ids.add(duplicate["ambassador"])
+
+    # Deleted duplicates were counted in the ambassador stats.
+    content = Content.objects.filter(ambassador=OuterRef("ambassador"))
+    apps.get_model("ambassadors", "AmbassadorStats").objects.filter(
+        ambassador__in=ambassador_ids
+    ).update(
+        review_count=Coalesce(aggregate(content.filter(type="review"), Count("pk")), 0),
+        content_count=Coalesce(
+            aggregate(content.filter(type="content"), Count("pk")), 0
+        ),
+        last_content_date=aggregate(content, Max("created")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ambassadors", "0011_ambassadorstats"),
+        ("content", "0013_platformrule"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="content",
+            name="link_hash",
+            field=models.CharField(
+                default="",
+                editable=False,
+                max_length=64,
+                verbose_name="Хеш нормализованной ссылки",
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_link_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-18 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content", "0014_content_link_hash"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="content",
+            constraint=models.UniqueConstraint(
+                fields=("ambassador", "link_hash"), name="unique_ambassador_link"
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.2 on 2026-10-18 22:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content", "0015_content_unique_ambassador_link"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="content",
+            name="ingest_key",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Ключ заявки из формы, по которой создан контент",
+                max_length=200,
+                null=True,
+                unique=True,
+                verbose_name="Ключ идемпотентности загрузки",
+            ),
+        ),
+    ]
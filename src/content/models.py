@@ -1,7 +1,48 @@
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
 from django.db import models
 
 from ambassadors.models import Ambassador
 
+# Параметры ссылок, которые добавляют счетчики и рекламные метки.
+TRACKING_PARAMS = ("utm_", "yclid", "gclid", "fbclid", "_openstat")
+DEFAULT_PORTS = {80, 443}
+
+
+def normalize_link(link: str) -> str:
+    """
+    Приводит варианты одной ссылки к общему виду: без схемы, логина, www,
+    стандартного порта, фрагмента, слеша в конце и меток счетчиков,
+    с хостом в нижнем регистре и отсортированными параметрами.
+    Регистр пути сохраняется (например, id видео на YouTube).
+    """
+    link = link.strip()
+    try:
+        parts = urlsplit(link)
+        if not parts.netloc:
+            parts = urlsplit(f"//{link}")
+        port = parts.port
+    except ValueError:
+        return link
+    host = (parts.hostname or "").rstrip(".").removeprefix("www.")
+    if port and port not in DEFAULT_PORTS:
+        host = f"{host}:{port}"
+    query = urlencode(
+        sorted(
+            (name, value)
+            for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not name.lower().startswith(TRACKING_PARAMS)
+        )
+    )
+    path = parts.path.rstrip("/")
+    return f"{host}{path}?{query}" if query else f"{host}{path}"
+
+
+def get_link_hash(link: str) -> str:
+    """Хеш нормализованной ссылки (см. normalize_link)."""
+    return hashlib.sha256(normalize_link(link).encode()).hexdigest()
+
 
 class GuideTask(models.Model):
     """Модель такси для гайда."""
@@ -140,6 +181,20 @@ class Content(models.Model):
         verbose_name="Ссылка",
         max_length=5000,
     )
+    link_hash = models.CharField(
+        max_length=64,
+        editable=False,
+        verbose_name="Хеш нормализованной ссылки",
+    )
+    ingest_key = models.CharField(
+        max_length=200,
+        null=True,
+        blank=True,
+        unique=True,
+        editable=False,
+        verbose_name="Ключ идемпотентности загрузки",
+        help_text="Ключ заявки из формы, по которой создан контент",
+    )
     is_guide_content = models.BooleanField(
         default=False,
         verbose_name="Контент в рамках гайда",
@@ -167,6 +222,76 @@ class Content(models.Model):
         verbose_name = "Контент"
         verbose_name_plural = "Контент"
         ordering = ["-created"]
+        indexes = [
+            # Latest links and numbers of reviews/content on the content page.
+            models.Index(
+                fields=["ambassador", "type", "created"],
+                name="content_amb_type_created_idx",
+            ),
+        ]
+        constraints = [
+            # Одна и та же ссылка у амбассадора хранится один раз.
+            models.UniqueConstraint(
+                fields=["ambassador", "link_hash"], name="unique_ambassador_link"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.ambassador.name} на {self.platform}"
+
+    def save(self, *args, **kwargs):
+        self.link_hash = get_link_hash(self.link)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "link" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "link_hash"}
+        super().save(*args, **kwargs)
+
+    def validate_constraints(self, exclude=None):
+        # Хеш не редактируется в формах, но проверяется по введенной ссылке.
+        self.link_hash = get_link_hash(self.link)
+        if exclude is not None and "link" not in exclude:
+            exclude = set(exclude) - {"link_hash"}
+        super().validate_constraints(exclude)
+
+
+class PlatformRule(models.Model):
+    """
+    Модель правила определения платформы контента по ссылке.
+    Правило подходит ссылкам на домен или его поддомены, путь которых
+    начинается с префикса (по целым сегментам).
+    """
+
+    domain = models.CharField(
+        max_length=253,
+        verbose_name="Домен",
+        help_text="Без www, например career.habr.com",
+    )
+    path_prefix = models.CharField(
+        max_length=200,
+        blank=True,
+        verbose_name="Начало пути",
+        help_text="Без слешей по краям, например maps",
+    )
+    platform = models.CharField(
+        max_length=200,
+        verbose_name="Платформа",
+    )
+    type = models.CharField(
+        max_length=200,
+        choices=Content.TYPES,
+        default="content",
+        verbose_name="Тип (отзыв/контент)",
+    )
+
+    class Meta:
+        verbose_name = "Правило платформы"
+        verbose_name_plural = "Правила платформ"
+        ordering = ["domain", "path_prefix"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["domain", "path_prefix"], name="unique_platform_rule"
+            )
+        ]
+
+    def __str__(self):
+        return self.platform
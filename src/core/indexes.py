@@ -0,0 +1,27 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models import Index
+
+
+class TrigramIndex(GinIndex):
+    """
+    Index for the search by substrings: a GIN index with the pg_trgm operator
+    class on each expression on PostgreSQL and a plain index on the same
+    expressions on other databases, so the schema (and the migration state)
+    is the same for all of them.
+    """
+
+    def get_index(self, schema_editor) -> Index:
+        if schema_editor.connection.vendor == "postgresql":
+            return GinIndex(
+                *(
+                    OpClass(expression, name="gin_trgm_ops")
+                    for expression in self.expressions
+                ),
+                name=self.name,
+            )
+        return Index(*self.expressions, name=self.name)
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        return self.get_index(schema_editor).create_sql(
+            model, schema_editor, using=using, **kwargs
+        )
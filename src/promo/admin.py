@@ -1,11 +1,12 @@
 from django.contrib import admin
-from django.db.models import F, Prefetch, Sum
+from django.db.models import Prefetch
 
 from .models import (
     Merch,
     MerchApplication,
     MerchCategory,
     MerchInApplication,
+    MerchSpendMonthly,
     Promocode,
 )
 
@@ -27,6 +28,19 @@ class MerchAdmin(admin.ModelAdmin):
     list_filter = ["category", "size", "cost"]
     ordering = ["pk"]
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and {"name", "size"} & set(form.changed_data):
+            MerchApplication.objects.filter(merch=obj).touch()
+
+    def delete_model(self, request, obj):
+        with MerchSpendMonthly.objects.track_merch([obj]):
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with MerchSpendMonthly.objects.track_merch(queryset):
+            super().delete_queryset(request, queryset)
+
 
 @admin.register(MerchCategory)
 class MerchCategoryAdmin(admin.ModelAdmin):
@@ -37,6 +51,16 @@ class MerchCategoryAdmin(admin.ModelAdmin):
     search_fields = ["name", "slug"]
     ordering = ["pk"]
 
+    def delete_model(self, request, obj):
+        with MerchSpendMonthly.objects.track_merch(Merch.objects.filter(category=obj)):
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with MerchSpendMonthly.objects.track_merch(
+            Merch.objects.filter(category__in=queryset)
+        ):
+            super().delete_queryset(request, queryset)
+
 
 @admin.register(MerchApplication)
 class MerchApplicationAdmin(admin.ModelAdmin):
@@ -55,45 +79,97 @@ class MerchApplicationAdmin(admin.ModelAdmin):
     search_fields = ["application_number", "ambassador"]
     inlines = [MerchInApplicationInline]
 
-    # TODO: make it in model under @property?
     def get_queryset(self, request):
         queryset = super().get_queryset(request)
-        return (
-            queryset.select_related(
-                "ambassador__program",
-                "ambassador__status",
-                "ambassador__purpose",
-                "ambassador__tutor",
-                "tutor",
-            )
-            .prefetch_related(
-                Prefetch(
-                    "merch_in_applications",
-                    queryset=MerchInApplication.objects.select_related("merch"),
-                )
-            )
-            .annotate(
-                merch_cost=Sum(
-                    F("merch_in_applications__quantity")
-                    * F("merch_in_applications__merch__cost"),
-                    default=0,
-                ),
+        return queryset.select_related(
+            "ambassador__program",
+            "ambassador__status",
+            "ambassador__purpose",
+            "ambassador__tutor",
+            "tutor",
+        ).prefetch_related(
+            Prefetch(
+                "merch_in_applications",
+                queryset=MerchInApplication.objects.select_related("merch"),
             )
         )
 
-    @admin.display(description="Merch cost", ordering="merch_cost")
+    @admin.display(description="Merch cost", ordering="total_cost")
     def merch_cost(self, obj):
-        return obj.merch_cost
+        return obj.total_cost
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            MerchSpendMonthly.objects.remove_applications(
+                MerchApplication.objects.filter(pk=obj.pk)
+            )
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        application = MerchApplication.objects.filter(pk=form.instance.pk)
+        application.update_total_cost()
+        MerchSpendMonthly.objects.add_applications(application)
+
+    def delete_model(self, request, obj):
+        with MerchSpendMonthly.objects.track([obj.pk]):
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with MerchSpendMonthly.objects.track(queryset.values_list("pk", flat=True)):
+            super().delete_queryset(request, queryset)
 
 
 @admin.register(MerchInApplication)
 class MerchInApplicationAdmin(admin.ModelAdmin):
     """Displays m2m connections between the merch applications and merch species."""
 
-    list_display = ["pk", "application", "merch", "quantity"]
+    list_display = ["pk", "application", "merch", "quantity", "unit_cost"]
     list_display_links = ["application"]
     list_filter = ["quantity", "merch"]
 
+    def save_model(self, request, obj, form, change):
+        application_ids = {obj.application_id}
+        if change:
+            application_ids.add(
+                MerchInApplication.objects.get(pk=obj.pk).application_id
+            )
+        with MerchSpendMonthly.objects.track(application_ids):
+            super().save_model(request, obj, form, change)
+            MerchApplication.objects.filter(pk__in=application_ids).update_total_cost()
+
+    def delete_model(self, request, obj):
+        with MerchSpendMonthly.objects.track([obj.application_id]):
+            super().delete_model(request, obj)
+            MerchApplication.objects.filter(pk=obj.application_id).update_total_cost()
+
+    def delete_queryset(self, request, queryset):
+        application_ids = list(
+            queryset.values_list("application_id", flat=True).distinct()
+        )
+        with MerchSpendMonthly.objects.track(application_ids):
+            super().delete_queryset(request, queryset)
+            MerchApplication.objects.filter(pk__in=application_ids).update_total_cost()
+
+
+@admin.register(MerchSpendMonthly)
+class MerchSpendMonthlyAdmin(admin.ModelAdmin):
+    """Displays monthly merch expenses of ambassadors in admin panel (read only)."""
+
+    list_display = ["pk", "ambassador", "year", "month", "total"]
+    list_display_links = ["ambassador"]
+    list_filter = ["year", "month"]
+    search_fields = ["ambassador__name"]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("ambassador")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(Promocode)
 class PromocodeAdmin(admin.ModelAdmin):
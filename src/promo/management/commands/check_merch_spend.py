@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from promo.models import MerchSpendMonthly
+
+
+class Command(BaseCommand):
+    help = (
+        "Checks that monthly merch expenses of ambassadors match merch applications. "
+        "Exits with an error if inconsistencies are found."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="number of ambassadors checked by one query",
+        )
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="rebuild monthly expenses of inconsistent ambassadors",
+        )
+
+    def handle(self, *args, **options):
+        inconsistencies = MerchSpendMonthly.objects.find_inconsistencies(
+            chunk_size=options["chunk_size"]
+        )
+        for ambassador_id, year, month, stored, expected in inconsistencies:
+            self.stdout.write(
+                f"ambassador {ambassador_id}, {year}-{month:02d}: "
+                f"stored {stored}, expected {expected}"
+            )
+        if not inconsistencies:
+            self.stdout.write(
+                self.style.SUCCESS("Monthly merch expenses are consistent")
+            )
+            return
+        if options["fix"]:
+            ambassador_ids = {item[0] for item in inconsistencies}
+            MerchSpendMonthly.objects.rebuild(ambassador_ids=list(ambassador_ids))
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Monthly merch expenses rebuilt for {len(ambassador_ids)} "
+                    "ambassadors"
+                )
+            )
+            return
+        raise CommandError(f"{len(inconsistencies)} inconsistencies found")
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from promo.models import MerchSpendMonthly
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalculates monthly merch expenses of ambassadors from merch applications "
+        "(ambassadors are processed by chunks)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="number of ambassadors processed in one transaction",
+        )
+        parser.add_argument(
+            "--total-cost",
+            action="store_true",
+            help="recalculate total costs of merch applications from their merch items",
+        )
+
+    def handle(self, *args, **options):
+        processed = MerchSpendMonthly.objects.rebuild(
+            chunk_size=options["chunk_size"], update_total_cost=options["total_cost"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Monthly merch expenses rebuilt for {processed} ambassadors"
+            )
+        )
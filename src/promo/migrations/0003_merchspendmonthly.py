@@ -0,0 +1,95 @@
+# Generated by Django 5.0.2 on 2026-10-18 12:00
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def fill_merch_spend_monthly(apps, schema_editor):
+    MerchApplication = apps.get_model("promo", "MerchApplication")
+    MerchSpendMonthly = apps.get_model("promo", "MerchSpendMonthly")
+    rows = (
+        MerchApplication.objects.annotate(
+            year=ExtractYear("created"), month=ExtractMonth("created")
+        )
+        .values("ambassador_id", "year", "month")
+        .annotate(
+            total=Sum(
+                F("merch_in_applications__quantity")
+                * F("merch_in_applications__merch__cost"),
+                default=0,
+            )
+        )
+        .order_by()
+    )
+    MerchSpendMonthly.objects.bulk_create(
+        (MerchSpendMonthly(**row) for row in rows.iterator() if row["total"]),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ambassadors", "0006_remove_ambassador_purpose_and_more"),
+        ("promo", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MerchSpendMonthly",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveSmallIntegerField(verbose_name="Year")),
+                (
+                    "month",
+                    models.PositiveSmallIntegerField(
+                        validators=[
+                            django.core.validators.MinValueValidator(1),
+                            django.core.validators.MaxValueValidator(12),
+                        ],
+                        verbose_name="Month",
+                    ),
+                ),
+                ("total", models.FloatField(default=0, verbose_name="Total")),
+                (
+                    "ambassador",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="merch_spend_monthly",
+                        to="ambassadors.ambassador",
+                        verbose_name="Ambassador",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Расходы на мерч за месяц",
+                "verbose_name_plural": "Расходы на мерч по месяцам",
+                "ordering": ["ambassador", "year", "month"],
+                "indexes": [
+                    models.Index(
+                        fields=["year", "ambassador"],
+                        name="promo_merch_year_953d9e_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="merchspendmonthly",
+            constraint=models.UniqueConstraint(
+                fields=("ambassador", "year", "month"),
+                name="ambassador_year_month_unique_merch_spend",
+            ),
+        ),
+        migrations.RunPython(fill_merch_spend_monthly, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.0.2 on 2026-10-18 13:00
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_costs(apps, schema_editor):
+    Merch = apps.get_model("promo", "Merch")
+    MerchApplication = apps.get_model("promo", "MerchApplication")
+    MerchInApplication = apps.get_model("promo", "MerchInApplication")
+    MerchInApplication.objects.update(
+        unit_cost=Subquery(Merch.objects.filter(pk=OuterRef("merch_id")).values("cost"))
+    )
+    merch_cost = (
+        MerchInApplication.objects.filter(application=OuterRef("pk"))
+        .values("application")
+        .annotate(total=Sum(F("quantity") * F("unit_cost")))
+        .values("total")
+    )
+    MerchApplication.objects.update(total_cost=Coalesce(Subquery(merch_cost), 0.0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("promo", "0003_merchspendmonthly"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="merchapplication",
+            name="total_cost",
+            field=models.FloatField(
+                db_index=True, default=0, editable=False, verbose_name="Total cost"
+            ),
+        ),
+        migrations.AddField(
+            model_name="merchinapplication",
+            name="unit_cost",
+            field=models.FloatField(
+                blank=True,
+                null=True,
+                validators=[django.core.validators.MinValueValidator(0)],
+                verbose_name="Unit cost",
+            ),
+        ),
+        migrations.RunPython(fill_costs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="merchinapplication",
+            name="unit_cost",
+            field=models.FloatField(
+                blank=True,
+                validators=[django.core.validators.MinValueValidator(0)],
+                verbose_name="Unit cost",
+            ),
+        ),
+    ]
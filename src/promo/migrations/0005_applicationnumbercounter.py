@@ -0,0 +1,33 @@
+# Generated by Django 5.0.2 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("promo", "0004_merchapplication_total_cost_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ApplicationNumberCounter",
+            fields=[
+                (
+                    "day",
+                    models.DateField(
+                        primary_key=True, serialize=False, verbose_name="Day"
+                    ),
+                ),
+                (
+                    "last_number",
+                    models.PositiveIntegerField(default=0, verbose_name="Last number"),
+                ),
+            ],
+            options={
+                "verbose_name": "Счётчик номеров заявок",
+                "verbose_name_plural": "Счётчики номеров заявок",
+                "ordering": ["-day"],
+            },
+        ),
+    ]
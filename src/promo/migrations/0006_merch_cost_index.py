@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-18 14:00
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("promo", "0005_applicationnumbercounter"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="merch",
+            name="cost",
+            field=models.FloatField(
+                db_index=True,
+                validators=[django.core.validators.MinValueValidator(0)],
+                verbose_name="Cost",
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.2 on 2026-10-18 14:30
+
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+import core.indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("promo", "0006_merch_cost_index"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="merch",
+            index=core.indexes.TrigramIndex(
+                django.db.models.functions.text.Upper("name"), name="merch_name_trgm"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="merchapplication",
+            index=core.indexes.TrigramIndex(
+                django.db.models.functions.text.Upper("application_number"),
+                name="application_number_trgm",
+            ),
+        ),
+    ]
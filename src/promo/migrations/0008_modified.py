@@ -0,0 +1,36 @@
+# Generated by Django 5.0.2 on 2026-10-18 21:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("promo", "0007_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="merchapplication",
+            name="modified",
+            field=models.DateTimeField(
+                auto_now=True,
+                db_index=True,
+                default=django.utils.timezone.now,
+                verbose_name="Modification time",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="promocode",
+            name="modified",
+            field=models.DateTimeField(
+                auto_now=True,
+                db_index=True,
+                default=django.utils.timezone.now,
+                verbose_name="Modification time",
+            ),
+            preserve_default=False,
+        ),
+    ]
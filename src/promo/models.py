@@ -1,9 +1,14 @@
+from contextlib import contextmanager
+
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear, Now, Upper
 from django.utils import timezone
 from django.utils.text import slugify
 
-from ambassadors.models import Ambassador
+from ambassadors.models import MERCH_STATS_FIELDS, Ambassador, AmbassadorStats
+from core.indexes import TrigramIndex
 from users.models import User
 
 
@@ -44,7 +49,7 @@ class Merch(models.Model):
     )
     slug = models.SlugField("Slug", max_length=100, unique=True, blank=True)
     size = models.CharField("Size", max_length=20, blank=True)
-    cost = models.FloatField("Cost", validators=[MinValueValidator(0)])
+    cost = models.FloatField("Cost", validators=[MinValueValidator(0)], db_index=True)
 
     class Meta:
         verbose_name = "Мерч"
@@ -54,6 +59,10 @@ class Merch(models.Model):
                 fields=["name", "size"], name="name_size_unique_merch"
             )
         ]
+        indexes = [
+            # Trigram index for the name search.
+            TrigramIndex(Upper("name"), name="merch_name_trgm")
+        ]
         ordering = ["id"]
 
     def save(self, *args, **kwargs):
@@ -79,6 +88,7 @@ class Promocode(models.Model):
         verbose_name="Ambassador",
     )
     created = models.DateTimeField("Creation time", default=timezone.now)
+    modified = models.DateTimeField("Modification time", auto_now=True, db_index=True)
     is_active = models.BooleanField("Is active", default=True)
 
     class Meta:
@@ -90,8 +100,36 @@ class Promocode(models.Model):
         return self.code
 
 
+class MerchApplicationQuerySet(models.QuerySet):
+    def touch(self):
+        """
+        Bumps the modification time of the applications, e.g. after changing
+        their merch items or the merch itself (see the incremental sheet sync).
+        """
+        return self.update(modified=Now())
+
+    def update_total_cost(self):
+        """
+        Recalculates total costs of the applications from their merch items.
+        The applications are marked as modified as well.
+        """
+        merch_cost = (
+            MerchInApplication.objects.filter(application=OuterRef("pk"))
+            .values("application")
+            .annotate(total=Sum(F("quantity") * F("unit_cost")))
+            .values("total")
+        )
+        return self.update(
+            total_cost=Coalesce(Subquery(merch_cost), 0.0), modified=Now()
+        )
+
+
 class MerchApplication(models.Model):
-    """Describes applications for sending merch to ambassadors."""
+    """
+    Describes applications for sending merch to ambassadors.
+    The total cost of the merch in the application is stored in the total_cost
+    field and has to be updated after changing merch items.
+    """
 
     application_number = models.CharField("Number", max_length=50, unique=True)
     ambassador = models.ForeignKey(
@@ -107,16 +145,29 @@ class MerchApplication(models.Model):
         verbose_name="User",
     )
     created = models.DateTimeField("Creation time", default=timezone.now)
+    modified = models.DateTimeField("Modification time", auto_now=True, db_index=True)
     merch = models.ManyToManyField(
         Merch,
         through="MerchInApplication",
         related_name="applications",
         verbose_name="Merch",
     )
+    total_cost = models.FloatField(
+        "Total cost", default=0, editable=False, db_index=True
+    )
+
+    objects = MerchApplicationQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Заявка на мерч"
         verbose_name_plural = "Заявки на мерч"
+        indexes = [
+            # Trigram index for the number search.
+            TrigramIndex(
+                Upper("application_number"),
+                name="application_number_trgm",
+            )
+        ]
 
     def __str__(self):
         return self.application_number
@@ -143,9 +194,347 @@ class MerchInApplication(models.Model):
         validators=[MinValueValidator(1), MaxValueValidator(100)],
     )
 
+    unit_cost = models.FloatField(
+        "Unit cost", blank=True, validators=[MinValueValidator(0)]
+    )
+
     class Meta:
         verbose_name = "Мерч в заявках"
         verbose_name_plural = "Мерч в заявках"
 
+    def save(self, *args, **kwargs):
+        """Stores the current merch cost if the unit cost is not set."""
+        if self.unit_cost is None:
+            self.unit_cost = self.merch.cost
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.application}-{self.merch}-{self.quantity}"
+
+
+class ApplicationNumberCounterManager(models.Manager):
+    def reserve(self, day, count: int = 1) -> range:
+        """
+        Reserves the next count numbers of merch applications of the day and
+        returns them. The counter row is created or incremented by a single
+        upsert statement, so the numbers are unique across all processes
+        without reading the table first.
+        """
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        table = quote_name(self.model._meta.db_table)
+        day_column = quote_name("day")
+        last_number_column = quote_name("last_number")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} ({day_column}, {last_number_column}) "
+                f"VALUES (%s, %s) ON CONFLICT ({day_column}) DO UPDATE SET "
+                f"{last_number_column} = {table}.{last_number_column} + %s "
+                f"RETURNING {last_number_column}",
+                [connection.ops.adapt_datefield_value(day), count, count],
+            )
+            last_number = cursor.fetchone()[0]
+        return range(last_number - count + 1, last_number + 1)
+
+
+class ApplicationNumberCounter(models.Model):
+    """Keeps the last number of merch applications given out on a day."""
+
+    day = models.DateField("Day", primary_key=True)
+    last_number = models.PositiveIntegerField("Last number", default=0)
+
+    objects = ApplicationNumberCounterManager()
+
+    class Meta:
+        verbose_name = "Счётчик номеров заявок"
+        verbose_name_plural = "Счётчики номеров заявок"
+        ordering = ["-day"]
+
+    def __str__(self):
+        return f"{self.day}: {self.last_number}"
+
+
+ZERO_SPEND_TOLERANCE = 0.005
+
+
+class MerchSpendMonthlyManager(models.Manager):
+    """
+    Keeps monthly merch expenses of ambassadors in sync with merch applications.
+
+    Every change of merch applications (or merch items inside them) should be
+    wrapped into the track() context manager, new applications should be passed
+    to add_applications() after their merch items have been saved. Expenses are
+    taken from the total_cost field, so it has to be updated beforehand.
+    The numbers of applications and the expenses in AmbassadorStats are
+    updated together with the monthly expenses.
+    """
+
+    def spend_by_month(self, applications):
+        """
+        Returns merch expenses of the given applications grouped by ambassador,
+        year and month (calculated from the stored total costs).
+        """
+        return (
+            applications.annotate(
+                year=ExtractYear("created"), month=ExtractMonth("created")
+            )
+            .values("ambassador_id", "year", "month")
+            .annotate(total=Sum("total_cost", default=0))
+            .order_by("ambassador_id", "year", "month")
+        )
+
+    def add(self, ambassador_id, year, month, amount):
+        """Adds the amount (can be negative) to the monthly ambassador expenses."""
+        if not amount:
+            return
+        spend = self.filter(ambassador_id=ambassador_id, year=year, month=month)
+        if spend.update(total=F("total") + amount):
+            if amount < 0:
+                spend.filter(
+                    total__gt=-ZERO_SPEND_TOLERANCE, total__lt=ZERO_SPEND_TOLERANCE
+                ).delete()
+            return
+        try:
+            with transaction.atomic():
+                self.create(
+                    ambassador_id=ambassador_id, year=year, month=month, total=amount
+                )
+        except IntegrityError:
+            spend.update(total=F("total") + amount)
+
+    def add_many(self, amounts: dict):
+        """
+        Adds the amounts to the monthly expenses with a constant number of
+        queries. Takes {(ambassador_id, year, month): amount} dict.
+        """
+        amounts = {key: amount for key, amount in amounts.items() if amount}
+        if not amounts:
+            return
+        keys = Q()
+        for ambassador_id, year, month in amounts:
+            keys |= Q(ambassador_id=ambassador_id, year=year, month=month)
+        spend = self.filter(keys)
+        with transaction.atomic():
+            existing = set(spend.values_list("ambassador_id", "year", "month"))
+            if existing:
+                spend.update(
+                    total=F("total")
+                    + Case(
+                        *(
+                            When(
+                                ambassador_id=ambassador_id,
+                                year=year,
+                                month=month,
+                                then=Value(amounts[ambassador_id, year, month]),
+                            )
+                            for ambassador_id, year, month in existing
+                        ),
+                        default=Value(0.0),
+                    )
+                )
+            missing = [key for key in amounts if key not in existing]
+            if missing:
+                self._create_many({key: amounts[key] for key in missing})
+            if any(amount < 0 for amount in amounts.values()):
+                spend.filter(
+                    total__gt=-ZERO_SPEND_TOLERANCE, total__lt=ZERO_SPEND_TOLERANCE
+                ).delete()
+
+    def _create_many(self, amounts: dict):
+        try:
+            with transaction.atomic():
+                self.bulk_create(
+                    self.model(
+                        ambassador_id=ambassador_id,
+                        year=year,
+                        month=month,
+                        total=amount,
+                    )
+                    for (ambassador_id, year, month), amount in amounts.items()
+                )
+        except IntegrityError:
+            # Some rows have just been created by a concurrent request.
+            for key, amount in amounts.items():
+                self.add(*key, amount)
+
+    def get_key(self, application):
+        """Returns (ambassador_id, year, month) of the application expenses."""
+        created = timezone.localtime(application.created)
+        return application.ambassador_id, created.year, created.month
+
+    def move(self, old_key, old_total, new_key, new_total):
+        """
+        Replaces the old expenses of an application with the new ones
+        (the month or the ambassador can change too). Nothing is written
+        if the expenses stay the same.
+        """
+        amounts = {old_key: -old_total}
+        amounts[new_key] = amounts.get(new_key, 0) + new_total
+        self.add_many(amounts)
+        stats = {old_key[0]: {"merch_application_count": -1, "merch_spend": -old_total}}
+        new_stats = stats.setdefault(
+            new_key[0], {"merch_application_count": 0, "merch_spend": 0}
+        )
+        new_stats["merch_application_count"] += 1
+        new_stats["merch_spend"] += new_total
+        AmbassadorStats.objects.add_many(stats)
+
+    def add_applications(self, applications, sign=1):
+        """Adds merch expenses of the applications to the monthly expenses."""
+        rows = self.spend_by_month(applications).annotate(count=Count("pk"))
+        amounts = {}
+        stats = {}
+        for row in rows:
+            amounts[row["ambassador_id"], row["year"], row["month"]] = (
+                sign * row["total"]
+            )
+            ambassador_stats = stats.setdefault(
+                row["ambassador_id"], {"merch_application_count": 0, "merch_spend": 0}
+            )
+            ambassador_stats["merch_application_count"] += sign * row["count"]
+            ambassador_stats["merch_spend"] += sign * row["total"]
+        self.add_many(amounts)
+        AmbassadorStats.objects.add_many(stats)
+
+    def remove_applications(self, applications):
+        """Subtracts merch expenses of the applications from the monthly expenses."""
+        self.add_applications(applications, sign=-1)
+
+    @contextmanager
+    def track(self, application_ids):
+        """
+        Takes into account all the changes made to the applications inside the block:
+        their expenses are subtracted before the block and added after it.
+        """
+        application_ids = [pk for pk in application_ids if pk is not None]
+        with transaction.atomic():
+            self.remove_applications(
+                MerchApplication.objects.filter(pk__in=application_ids)
+            )
+            yield
+            self.add_applications(
+                MerchApplication.objects.filter(pk__in=application_ids)
+            )
+
+    @contextmanager
+    def track_merch(self, merch):
+        """
+        Takes into account the changes made inside the block to the applications
+        containing the merch (e.g. deleting the merch deletes their merch items),
+        total costs of the applications are recalculated too.
+        """
+        application_ids = list(
+            MerchInApplication.objects.filter(merch__in=merch)
+            .values_list("application_id", flat=True)
+            .distinct()
+        )
+        with self.track(application_ids):
+            yield
+            MerchApplication.objects.filter(pk__in=application_ids).update_total_cost()
+
+    def _ambassador_ids_chunks(self, chunk_size):
+        last_id = 0
+        while True:
+            chunk = list(
+                Ambassador.objects.filter(pk__gt=last_id)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:chunk_size]
+            )
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1]
+
+    def rebuild(self, ambassador_ids=None, chunk_size=500, update_total_cost=False):
+        """
+        Recalculates monthly expenses from merch applications. All the ambassadors
+        are processed by chunks, one transaction per chunk. Total costs
+        of the applications can be recalculated from their merch items beforehand.
+        Returns the number of processed ambassadors.
+        """
+        chunks = (
+            [ambassador_ids]
+            if ambassador_ids is not None
+            else self._ambassador_ids_chunks(chunk_size)
+        )
+        processed = 0
+        for chunk in chunks:
+            with transaction.atomic():
+                if update_total_cost:
+                    MerchApplication.objects.filter(
+                        ambassador_id__in=chunk
+                    ).update_total_cost()
+                self.filter(ambassador_id__in=chunk).delete()
+                self.bulk_create(
+                    self.model(**row)
+                    for row in self.spend_by_month(
+                        MerchApplication.objects.filter(ambassador_id__in=chunk)
+                    )
+                    if row["total"]
+                )
+                AmbassadorStats.objects.refresh(chunk, MERCH_STATS_FIELDS)
+            processed += len(chunk)
+        return processed
+
+    def find_inconsistencies(self, chunk_size=500, tolerance=ZERO_SPEND_TOLERANCE):
+        """
+        Compares monthly expenses with merch applications.
+        Returns a list of (ambassador_id, year, month, stored, expected) tuples.
+        """
+        inconsistencies = []
+        for chunk in self._ambassador_ids_chunks(chunk_size):
+            expected = {
+                (row["ambassador_id"], row["year"], row["month"]): row["total"]
+                for row in self.spend_by_month(
+                    MerchApplication.objects.filter(ambassador_id__in=chunk)
+                )
+            }
+            stored = {
+                (ambassador_id, year, month): total
+                for ambassador_id, year, month, total in self.filter(
+                    ambassador_id__in=chunk
+                ).values_list("ambassador_id", "year", "month", "total")
+            }
+            for key in sorted(expected.keys() | stored.keys()):
+                if abs(stored.get(key, 0) - expected.get(key, 0)) > tolerance:
+                    inconsistencies.append(
+                        (*key, stored.get(key, 0), expected.get(key, 0))
+                    )
+        return inconsistencies
+
+
+class MerchSpendMonthly(models.Model):
+    """
+    Describes monthly merch expenses of ambassadors.
+    The table is maintained by MerchSpendMonthlyManager, it can be recalculated
+    with the rebuild_merch_spend management command.
+    """
+
+    ambassador = models.ForeignKey(
+        Ambassador,
+        on_delete=models.CASCADE,
+        related_name="merch_spend_monthly",
+        verbose_name="Ambassador",
+    )
+    year = models.PositiveSmallIntegerField("Year")
+    month = models.PositiveSmallIntegerField(
+        "Month", validators=[MinValueValidator(1), MaxValueValidator(12)]
+    )
+    total = models.FloatField("Total", default=0)
+
+    objects = MerchSpendMonthlyManager()
+
+    class Meta:
+        verbose_name = "Расходы на мерч за месяц"
+        verbose_name_plural = "Расходы на мерч по месяцам"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["ambassador", "year", "month"],
+                name="ambassador_year_month_unique_merch_spend",
+            )
+        ]
+        indexes = [models.Index(fields=["year", "ambassador"])]
+        ordering = ["ambassador", "year", "month"]
+
+    def __str__(self):
+        return f"{self.ambassador}-{self.year}-{self.month}: {self.total}"
@@ -0,0 +1,210 @@
+import csv
+import io
+import json
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ambassadors.models import Activity, Ambassador, AmbassadorActivity, Status
+from api import imports
+from api.dictionaries import dictionaries
+from api.imports import ADDRESS_IMPORT_FIELDS, import_ambassadors, iter_json_records
+
+URL = reverse("api:ambassador-import-file")
+CSV_COLUMNS = (
+    "name",
+    "gender",
+    "clothing_size",
+    "shoe_size",
+    "education",
+    "job",
+    "email",
+    "phone_number",
+    "telegram_id",
+    "program",
+    "purpose",
+    "activity",
+    *ADDRESS_IMPORT_FIELDS,
+)
+
+
+def make_record(number, **kwargs):
+    return {
+        "name": f"Амбассадор {number}",
+        "gender": "Ж",
+        "clothing_size": "S",
+        "shoe_size": "38",
+        "education": "МГУ",
+        "job": "аналитик",
+        "email": f"import{number}@test.com",
+        "phone_number": f"8900{number:07d}",
+        "telegram_id": f"@import{number}",
+        "program": "Python-разработчик",
+        "purpose": "сменить работу",
+        "activity": "вести блог,Писать статьи",
+        "postal_code": "420000",
+        "country": "Россия",
+        "city": "Казань",
+        "street": f"Улица {number}",
+        **kwargs,
+    }
+
+
+def make_csv(records):
+    file = io.StringIO()
+    writer = csv.DictWriter(file, CSV_COLUMNS)
+    writer.writeheader()
+    writer.writerows(records)
+    return file.getvalue().encode()
+
+
+@pytest.fixture
+def active_status():
+    return Status.objects.create(name="Активный", slug="active")
+
+
+@pytest.mark.django_db
+def test_import_ambassadors_from_csv(auth_client, ambassadors, active_status):
+    petya = ambassadors[0]
+    petya_status = petya.status
+    records = [
+        make_record(1),
+        make_record(2, job="", gender="X"),
+        make_record(3, email=petya.email, telegram_id=petya.telegram_id, job="Повар"),
+        make_record(4, email="import1@test.com"),
+        make_record(5, telegram_id=ambassadors[1].telegram_id),
+    ]
+    file = SimpleUploadedFile("ambassadors.csv", make_csv(records))
+
+    response = auth_client.post(URL, {"file": file}, format="multipart")
+
+    assert response.status_code == 200
+    assert response.data["total"] == 5
+    assert response.data["created"] == 1
+    assert response.data["updated"] == 1
+    assert [error["row"] for error in response.data["errors"]] == [2, 4, 5]
+    assert set(response.data["errors"][0]["errors"]) == {"job", "gender"}
+    assert "email" in response.data["errors"][1]["errors"]
+    assert "telegram_id" in response.data["errors"][2]["errors"]
+
+    created = Ambassador.objects.get(email="import1@test.com")
+    assert created.status == active_status
+    assert created.address.city == "Казань"
+    assert "казань" in created.search_document
+    assert sorted(created.activity.values_list("name", flat=True)) == [
+        "Писать статьи",
+        "вести блог",
+    ]
+
+    petya.refresh_from_db()
+    assert petya.job == "Повар"
+    assert petya.status == petya_status
+    assert petya.address.street == "Улица 3"
+    assert AmbassadorActivity.objects.filter(ambassador=petya).count() == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("file_format", ["json", "ndjson"])
+def test_import_ambassadors_from_json(auth_client, active_status, file_format):
+    records = [make_record(1, activity=["Новая активность"]), make_record(2)]
+    if file_format == "json":
+        content = json.dumps(records)
+    else:
+        content = "\n".join([*map(json.dumps, records), "{broken"])
+    file = SimpleUploadedFile("ambassadors.txt", content.encode())
+
+    response = auth_client.post(
+        f"{URL}?file_format={file_format}", {"file": file}, format="multipart"
+    )
+
+    assert response.status_code == 200
+    assert response.data["created"] == 2
+    assert Activity.objects.filter(name="Новая активность").exists()
+    if file_format == "ndjson":
+        assert response.data["errors"][0]["row"] == 3
+
+
+@pytest.mark.django_db
+def test_import_rejects_unknown_format(auth_client):
+    file = SimpleUploadedFile("ambassadors.xml", b"<ambassadors/>")
+
+    response = auth_client.post(URL, {"file": file}, format="multipart")
+
+    assert response.status_code == 400
+    assert response.data["errors"][0]["attr"] == "file_format"
+
+
+def test_json_records_are_read_by_chunks():
+    records = [{"number": number, "text": "ы" * number} for number in range(50)]
+    file = io.StringIO(json.dumps(records, ensure_ascii=False))
+
+    assert list(iter_json_records(file, chunk_size=16)) == records
+
+
+@pytest.mark.django_db
+def test_import_queries_do_not_depend_on_rows(ambassadors, active_status):
+    dictionaries.get_snapshot()
+    # The links to the old activities are deleted by the first update only.
+    import_ambassadors([make_record(0, email=ambassadors[0].email)])
+    query_counts = []
+    # SQLite splits bulk inserts of more than 999 parameters into several queries.
+    for start, count in ((1, 5), (100, 30)):
+        records = [make_record(number) for number in range(start, start + count)]
+        records.append(make_record(start + count, email=ambassadors[0].email))
+        with CaptureQueriesContext(connection) as queries:
+            report = import_ambassadors(records)
+        assert report.created == count
+        assert report.updated == 1
+        query_counts.append(len(queries))
+
+    assert query_counts[0] == query_counts[1]
+
+
+@pytest.mark.django_db
+def test_failed_batch_is_rolled_back_and_reported(active_status, monkeypatch):
+    import_batch = imports.import_batch
+
+    def fail_second_batch(rows, report):
+        import_batch(rows, report)
+        if rows[0][0] == 3:
+            raise IntegrityError("broken batch")
+
+    monkeypatch.setattr(imports, "import_batch", fail_second_batch)
+    records = [make_record(number) for number in range(1, 6)]
+
+    report = import_ambassadors(records, batch_size=2)
+
+    assert (report.total, report.created, report.updated) == (5, 3, 0)
+    assert [error["row"] for error in report.errors] == [3, 4]
+    assert "broken batch" in report.errors[0]["errors"]["non_field_errors"][0]
+    assert set(Ambassador.objects.values_list("email", flat=True)) == {
+        records[number]["email"] for number in (0, 1, 4)
+    }
+
+
+@pytest.mark.django_db
+def test_import_ambassadors_command(tmp_path, active_status):
+    path = tmp_path / "ambassadors.ndjson"
+    records = [make_record(1), make_record(2, email="wrong")]
+    path.write_text("\n".join(map(json.dumps, records)))
+    report_path = tmp_path / "errors.csv"
+    out = io.StringIO()
+
+    call_command(
+        "import_ambassadors",
+        str(path),
+        batch_size=1,
+        report=str(report_path),
+        stdout=out,
+    )
+
+    assert "created: 1" in out.getvalue()
+    assert "rejected: 1" in out.getvalue()
+    with open(report_path, encoding="utf-8") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == ["row", "field", "error"]
+    assert rows[1][:2] == ["2", "email"]
@@ -0,0 +1,205 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ambassadors.models import STATS_FIELDS, AmbassadorStats
+from content.models import Content, Guide, GuideKit
+from promo.models import Promocode
+
+
+def get_stats():
+    return {
+        row.pop("ambassador_id"): {
+            **row,
+            "merch_spend": round(row["merch_spend"], 2),
+        }
+        for row in AmbassadorStats.objects.values("ambassador_id", *STATS_FIELDS)
+    }
+
+
+def assert_stats_are_consistent():
+    """The maintained stats are the same as the recalculated ones."""
+    maintained = get_stats()
+    AmbassadorStats.objects.rebuild()
+    assert maintained == get_stats()
+
+
+@pytest.mark.django_db
+def test_stats_are_created_with_ambassadors(ambassadors):
+    assert get_stats()[ambassadors[0].pk] == {
+        "review_count": 0,
+        "content_count": 0,
+        "last_content_date": None,
+        "active_promocode_count": 0,
+        "merch_application_count": 0,
+        "merch_spend": 0,
+        "guide_status": "",
+    }
+
+
+@pytest.mark.django_db
+def test_stats_follow_content(ambassadors):
+    petya, sonya, _ = ambassadors
+    review = Content.objects.create(
+        ambassador=petya, link="https://otzovik.com/1", type="review"
+    )
+    content = Content.objects.create(
+        ambassador=petya, link="https://habr.com/1", type="content"
+    )
+    Content.objects.create(ambassador=petya, link="https://habr.com/2", type="content")
+
+    stats = AmbassadorStats.objects.get(ambassador=petya)
+    assert (stats.review_count, stats.content_count) == (1, 2)
+    assert stats.last_content_date == Content.objects.latest("created").created
+    assert_stats_are_consistent()
+
+    content.type = "review"
+    content.save()
+    review.ambassador = sonya
+    review.save()
+    Content.objects.filter(link="https://habr.com/2").delete()
+
+    stats = get_stats()
+    assert (stats[petya.pk]["review_count"], stats[petya.pk]["content_count"]) == (
+        1,
+        0,
+    )
+    assert stats[petya.pk]["last_content_date"] == content.created
+    assert stats[sonya.pk]["review_count"] == 1
+    assert_stats_are_consistent()
+
+
+@pytest.mark.django_db
+def test_ambassador_is_read_only_when_it_can_change(ambassadors):
+    petya, sonya, _ = ambassadors
+
+    def ambassador_reads(queries):
+        return [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith('SELECT "content_content"."ambassador_id"')
+        ]
+
+    with CaptureQueriesContext(connection) as queries:
+        content = Content.objects.create(
+            pk=100, ambassador=petya, link="https://habr.com/1", type="content"
+        )
+        content.type = "review"
+        content.save(update_fields=["type"])
+    assert ambassador_reads(queries) == []
+
+    with CaptureQueriesContext(connection) as queries:
+        content.ambassador = sonya
+        content.save()
+    assert len(ambassador_reads(queries)) == 1
+
+    stats = get_stats()
+    assert stats[petya.pk]["review_count"] == 0
+    assert stats[sonya.pk]["review_count"] == 1
+    assert_stats_are_consistent()
+
+
+@pytest.mark.django_db
+def test_stats_follow_promocodes(ambassadors, promocodes):
+    petya = ambassadors[0]
+    assert get_stats()[petya.pk]["active_promocode_count"] == 2
+
+    promocode = Promocode.objects.filter(ambassador=petya).first()
+    promocode.is_active = False
+    promocode.save()
+    assert get_stats()[petya.pk]["active_promocode_count"] == 1
+
+    Promocode.objects.filter(ambassador=petya, is_active=True).get().delete()
+    assert get_stats()[petya.pk]["active_promocode_count"] == 0
+    assert_stats_are_consistent()
+
+
+@pytest.mark.django_db
+def test_stats_follow_merch_applications(auth_client, ambassadors, merch):
+    petya, sonya, _ = ambassadors
+    url = reverse("api:merchapplication-list")
+    application_id = auth_client.post(
+        url,
+        {"ambassador": petya.pk, "merch": [{"id": merch[0].pk, "quantity": 2}]},
+        format="json",
+    ).data["id"]
+    auth_client.post(
+        reverse("api:merchapplication-bulk-create"),
+        {
+            "applications": [
+                {"ambassador": ambassador.pk, "merch": [{"id": merch[1].pk}]}
+                for ambassador in (petya, sonya)
+            ]
+        },
+        format="json",
+    )
+
+    stats = get_stats()
+    assert stats[petya.pk]["merch_application_count"] == 2
+    assert stats[petya.pk]["merch_spend"] == round(2 * merch[0].cost + merch[1].cost, 2)
+    assert stats[sonya.pk]["merch_application_count"] == 1
+    assert_stats_are_consistent()
+
+    detail_url = reverse("api:merchapplication-detail", kwargs={"pk": application_id})
+    auth_client.patch(detail_url, {"ambassador": sonya.pk}, format="json")
+    assert get_stats()[sonya.pk]["merch_application_count"] == 2
+    assert_stats_are_consistent()
+
+    auth_client.delete(detail_url)
+    stats = get_stats()
+    assert stats[sonya.pk]["merch_application_count"] == 1
+    assert stats[sonya.pk]["merch_spend"] == round(merch[1].cost, 2)
+    assert_stats_are_consistent()
+
+
+@pytest.mark.django_db
+def test_stats_follow_guides(ambassadors):
+    petya = ambassadors[0]
+    guide = Guide.objects.create(
+        ambassador=petya,
+        guide_kit=GuideKit.objects.create(name="Набор"),
+        status="started",
+    )
+    assert get_stats()[petya.pk]["guide_status"] == "started"
+
+    guide.delete()
+    assert get_stats()[petya.pk]["guide_status"] == ""
+
+
+@pytest.mark.django_db
+def test_rebuild_ambassador_stats_command(ambassadors, merch_applications, promocodes):
+    expected = get_stats()
+    AmbassadorStats.objects.all().delete()
+
+    call_command("rebuild_ambassador_stats", chunk_size=2)
+
+    assert get_stats() == expected
+    assert all(stats["merch_application_count"] == 1 for stats in expected.values())
+
+
+@pytest.mark.django_db
+def test_filter_and_sort_ambassadors_by_stats(auth_client, ambassadors):
+    petya, sonya, makar = ambassadors
+    old = Content.objects.create(ambassador=sonya, link="https://habr.com/1")
+    Content.objects.filter(pk=old.pk).update(
+        created=timezone.now() - timedelta(days=100)
+    )
+    AmbassadorStats.objects.refresh([sonya.pk])
+    for number in range(2):
+        Content.objects.create(
+            ambassador=makar, link=f"https://habr.com/{number}", type="content"
+        )
+
+    response = auth_client.get("/api/v1/ambassadors/?no_content_days=90")
+    assert {item["id"] for item in response.data["results"]} == {petya.pk, sonya.pk}
+
+    response = auth_client.get(
+        "/api/v1/ambassadors/?min_content_count=1&ordering=-stats__content_count"
+    )
+    assert [item["id"] for item in response.data["results"]] == [makar.pk]
+    assert response.data["results"][0]["stats"]["content_count"] == 2
@@ -1,29 +1,208 @@
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.fixtures import ADDRESS_COUNTRY, TEST_PAST_DATETIME
+
+from ambassadors.models import Address, Ambassador, AmbassadorActivity, Status
 
 
 @pytest.mark.django_db
 def test_get_ambassador_list(auth_client, ambassadors):
     response = auth_client.get("/api/v1/ambassadors/")
     assert response.status_code == 200
-    assert len(response.data) == 3
-    assert response.data[0]["name"] == ambassadors[2].name
-    assert response.data[0]["created"] != ""
-    assert response.data[0]["gender"] == ambassadors[2].gender
-    assert response.data[0]["clothing_size"] == ambassadors[2].clothing_size
-    assert response.data[0]["shoe_size"] == ambassadors[2].shoe_size
-    assert response.data[0]["education"] == ambassadors[2].education
-    assert response.data[0]["job"] == ambassadors[2].job
-    assert response.data[0]["email"] == ambassadors[2].email
-    assert response.data[0]["phone_number"] == ambassadors[2].phone_number
-    assert response.data[0]["telegram_id"] == ambassadors[2].telegram_id
-    assert response.data[0]["whatsapp"] is None
-    assert len(response.data[0]["activity"]) == 2
-    assert response.data[0]["blog_link"] is None
-    assert response.data[0]["onboarding_status"] is False
-    assert response.data[0]["purpose"]["name"] == ambassadors[2].purpose.name
-    assert response.data[0]["about_me"] is None
-    assert response.data[0]["tutor"] is None
-    assert response.data[0]["status"]["name"] == ambassadors[2].status.name
-    assert response.data[0]["program"]["name"] == ambassadors[2].program.name
-    assert response.data[0]["address"]["street"] == ambassadors[2].address.street
-    assert response.data[0]["promocodes"] == []
+    assert len(response.data["results"]) == 3
+    assert response.data["results"][0]["name"] == ambassadors[2].name
+    assert response.data["results"][0]["created"] != ""
+    assert response.data["results"][0]["gender"] == ambassadors[2].gender
+    assert response.data["results"][0]["clothing_size"] == ambassadors[2].clothing_size
+    assert response.data["results"][0]["shoe_size"] == ambassadors[2].shoe_size
+    assert response.data["results"][0]["education"] == ambassadors[2].education
+    assert response.data["results"][0]["job"] == ambassadors[2].job
+    assert response.data["results"][0]["email"] == ambassadors[2].email
+    assert response.data["results"][0]["phone_number"] == ambassadors[2].phone_number
+    assert response.data["results"][0]["telegram_id"] == ambassadors[2].telegram_id
+    assert response.data["results"][0]["whatsapp"] is None
+    assert len(response.data["results"][0]["activity"]) == 2
+    assert response.data["results"][0]["blog_link"] is None
+    assert response.data["results"][0]["onboarding_status"] is False
+    assert response.data["results"][0]["purpose"]["name"] == ambassadors[2].purpose.name
+    assert response.data["results"][0]["about_me"] is None
+    assert response.data["results"][0]["tutor"] is None
+    assert response.data["results"][0]["status"]["name"] == ambassadors[2].status.name
+    assert response.data["results"][0]["program"]["name"] == ambassadors[2].program.name
+    assert (
+        response.data["results"][0]["address"]["street"]
+        == ambassadors[2].address.street
+    )
+    assert response.data["results"][0]["promocodes"] == []
+
+
+def search_ambassadors(client, value):
+    response = client.get("/api/v1/ambassadors/", {"search": value})
+    assert response.status_code == 200
+    return [item["id"] for item in response.data["results"]]
+
+
+@pytest.mark.django_db
+def test_search_ambassadors_by_fields(auth_client, ambassadors):
+    petya, sonya, makar = ambassadors
+
+    assert search_ambassadors(auth_client, "соня") == [sonya.pk]
+    assert search_ambassadors(auth_client, "@MAKAR") == [makar.pk]
+    assert search_ambassadors(auth_client, "такси") == [sonya.pk]
+    assert search_ambassadors(auth_client, "88002222") == [petya.pk]
+    assert search_ambassadors(auth_client, "соня спбгу") == [sonya.pk]
+    assert search_ambassadors(auth_client, "соня мгу") == []
+    assert search_ambassadors(auth_client, petya.address.city) == [
+        makar.pk,
+        sonya.pk,
+        petya.pk,
+    ]
+
+
+@pytest.mark.django_db
+def test_search_ambassadors_ranks_name_prefix_first(auth_client, ambassadors):
+    petya, _, makar = ambassadors
+    makar.job = "помощник Петя"
+    makar.save()
+
+    assert search_ambassadors(auth_client, "петя") == [petya.pk, makar.pk]
+
+
+@pytest.mark.django_db
+def test_search_document_follows_ambassador_update(auth_client, ambassadors):
+    petya = ambassadors[0]
+    response = auth_client.patch(
+        f"/api/v1/ambassadors/{petya.pk}/",
+        {"job": "Повар", "name": "Пётр Вектор"},
+        format="json",
+    )
+
+    assert response.status_code == 200
+    assert search_ambassadors(auth_client, "повар") == [petya.pk]
+    assert search_ambassadors(auth_client, "логгист") == []
+    assert search_ambassadors(auth_client, "пётр") == [petya.pk]
+
+
+def filter_ambassadors(client, **params):
+    response = client.get("/api/v1/ambassadors/", params)
+    assert response.status_code == 200
+    return [item["id"] for item in response.data["results"]]
+
+
+@pytest.mark.django_db
+def test_filter_ambassadors(auth_client, user, ambassadors, activities, statuses):
+    petya, sonya, makar = ambassadors
+    Ambassador.objects.filter(pk=sonya.pk).update(tutor=user, onboarding_status=True)
+    Address.objects.filter(pk=makar.address_id).update(city="Казань")
+    petya.activity.set(activities[:1])
+
+    assert filter_ambassadors(auth_client, status=statuses[1].slug) == [makar.pk]
+    assert filter_ambassadors(
+        auth_client, program=f"{petya.program.slug},{makar.program.slug}"
+    ) == [makar.pk, petya.pk]
+    assert filter_ambassadors(auth_client, purpose=petya.purpose.slug) == [
+        sonya.pk,
+        petya.pk,
+    ]
+    assert filter_ambassadors(auth_client, gender=sonya.gender) == [sonya.pk]
+    assert filter_ambassadors(auth_client, onboarding_status=True) == [sonya.pk]
+    assert filter_ambassadors(auth_client, tutor=user.pk) == [sonya.pk]
+    assert filter_ambassadors(auth_client, city="Казань") == [makar.pk]
+    assert filter_ambassadors(auth_client, country=ADDRESS_COUNTRY, city="Москва") == [
+        sonya.pk,
+        petya.pk,
+    ]
+    assert filter_ambassadors(
+        auth_client, activity=f"{activities[1].slug},{activities[2].slug}"
+    ) == [makar.pk, sonya.pk]
+    assert filter_ambassadors(auth_client, end_date=TEST_PAST_DATETIME) == []
+    assert len(filter_ambassadors(auth_client, start_date=TEST_PAST_DATETIME)) == 3
+
+
+def ambassador_payload(number, activities):
+    return {
+        "name": f"Амбассадор {number}",
+        "gender": "М",
+        "clothing_size": "M",
+        "shoe_size": "42",
+        "education": "МФТИ",
+        "job": "инженер",
+        "email": f"ambassador{number}@test.com",
+        "phone_number": "88005555555",
+        "telegram_id": f"@ambassador{number}",
+        "activity": [{"name": name} for name in activities],
+        "purpose": {"name": "сменить работу"},
+        "program": {"name": "Python-разработчик"},
+        "address": {
+            "postal_code": "123456",
+            "country": "Россия",
+            "city": "Казань",
+            "street": "Улица 4",
+        },
+    }
+
+
+@pytest.mark.django_db
+def test_create_ambassador_queries_do_not_depend_on_activities(auth_client, user):
+    Status.objects.create(name="Активный", slug="active")
+    auth_client.post(
+        "/api/v1/ambassadors/", ambassador_payload(0, ["разминка"]), format="json"
+    )
+
+    query_counts = []
+    for number, activities in enumerate(
+        (["новая 1"], ["новая 2", "новая 3", "новая 4", "разминка"]), start=1
+    ):
+        with CaptureQueriesContext(connection) as queries:
+            response = auth_client.post(
+                "/api/v1/ambassadors/",
+                ambassador_payload(number, activities),
+                format="json",
+            )
+        assert response.status_code == 201
+        assert len(response.data["activity"]) == len(activities)
+        query_counts.append(len(queries))
+
+    assert query_counts[0] == query_counts[1]
+
+
+@pytest.mark.django_db
+def test_update_ambassador_activities_by_difference(
+    auth_client, ambassadors, activities
+):
+    sonya = ambassadors[1]
+    kept = AmbassadorActivity.objects.get(ambassador=sonya, activity=activities[1])
+
+    response = auth_client.patch(
+        f"/api/v1/ambassadors/{sonya.pk}/",
+        {"activity": [{"name": activities[1].name}, {"name": "Новая активность"}]},
+        format="json",
+    )
+
+    assert response.status_code == 200
+    links = AmbassadorActivity.objects.filter(ambassador=sonya)
+    assert sorted(links.values_list("activity__name", flat=True)) == sorted(
+        [activities[1].name, "Новая активность"]
+    )
+    assert links.filter(pk=kept.pk).exists()
+
+
+@pytest.mark.django_db
+def test_ambassador_email_must_be_unique(auth_client, ambassadors):
+    petya, sonya = ambassadors[:2]
+    payload = ambassador_payload(1, ["разминка"])
+    payload["email"] = petya.email
+
+    response = auth_client.post("/api/v1/ambassadors/", payload, format="json")
+
+    assert response.status_code == 400
+    assert response.data["errors"][0]["attr"] == "email"
+
+    response = auth_client.patch(
+        f"/api/v1/ambassadors/{sonya.pk}/", {"email": petya.email}, format="json"
+    )
+
+    assert response.status_code == 400
+    assert response.data["errors"][0]["attr"] == "email"
@@ -0,0 +1,169 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ambassadors.models import AmbassadorStats
+from api import content_serializers
+from content.models import Content
+
+URL = "/api/v1/content/ingest/"
+
+
+def submission(key, ambassador, link, **data):
+    return {"idempotency_key": key, "ambassador": ambassador, "link": link, **data}
+
+
+@pytest.mark.django_db
+def test_ingest_reports_every_submission(auth_client, ambassadors):
+    petya, sonya, _ = ambassadors
+    existing = Content.objects.create(
+        ambassador=sonya, link="https://habr.com/1", type="content"
+    )
+    submissions = [
+        submission("1", petya.pk, "https://otzovik.com/1", is_guide_content="Да"),
+        submission("1", petya.pk, "https://otzovik.com/2"),
+        submission("2", petya.pk, "http://www.otzovik.com/1/?utm_source=form"),
+        submission("3", sonya.pk, "https://habr.com/1/"),
+        submission("4", sonya.pk, "https://habr.com/2", is_guide_content="Нет"),
+        submission("5", 0, "https://habr.com/3"),
+        submission("6", sonya.pk, "not a link"),
+        {"ambassador": sonya.pk, "link": "https://habr.com/4"},
+    ]
+
+    response = auth_client.post(URL, {"submissions": submissions}, format="json")
+
+    assert response.status_code == 200
+    assert (
+        response.data["created"],
+        response.data["duplicates"],
+        response.data["invalid"],
+    ) == (2, 3, 3)
+    results = response.data["results"]
+    assert [result["status"] for result in results] == [
+        "created",
+        "duplicate",
+        "duplicate",
+        "duplicate",
+        "created",
+        "invalid",
+        "invalid",
+        "invalid",
+    ]
+    review = Content.objects.get(ambassador=petya)
+    assert [result["id"] for result in results[:4]] == [review.pk] * 3 + [existing.pk]
+    assert (review.platform, review.type, review.is_guide_content) == (
+        "otzovik.com",
+        "review",
+        True,
+    )
+    assert results[4]["id"] == Content.objects.get(link="https://habr.com/2").pk
+    assert set(results[5]["errors"]) == {"ambassador"}
+    assert set(results[6]["errors"]) == {"link"}
+    assert results[7]["idempotency_key"] is None
+    assert set(results[7]["errors"]) == {"idempotency_key"}
+    assert Content.objects.count() == 3
+    stats = AmbassadorStats.objects.get(ambassador=petya)
+    assert (stats.review_count, stats.last_content_date) == (1, review.created)
+    assert AmbassadorStats.objects.get(ambassador=sonya).content_count == 2
+
+
+@pytest.mark.django_db
+def test_ingest_is_idempotent(auth_client, ambassadors):
+    submissions = [
+        submission(str(number), ambassadors[number % 3].pk, f"https://vc.ru/{number}")
+        for number in range(10)
+    ]
+
+    response = auth_client.post(URL, {"submissions": submissions}, format="json")
+    repeated = auth_client.post(URL, {"submissions": submissions}, format="json")
+
+    assert response.data["created"] == 10
+    assert repeated.data["duplicates"] == 10
+    assert [result["id"] for result in repeated.data["results"]] == [
+        result["id"] for result in response.data["results"]
+    ]
+    assert Content.objects.count() == 10
+
+
+@pytest.mark.django_db
+def test_ingest_keys_are_stored(auth_client, ambassadors):
+    petya, sonya, _ = ambassadors
+    response = auth_client.post(
+        URL,
+        {"submissions": [submission("1", petya.pk, "https://vc.ru/1")]},
+        format="json",
+    )
+    content_id = response.data["results"][0]["id"]
+
+    # The same key with changed answers returns the original result.
+    repeated = auth_client.post(
+        URL,
+        {"submissions": [submission("1", sonya.pk, "https://vc.ru/2")]},
+        format="json",
+    )
+
+    assert repeated.data["results"][0]["status"] == "duplicate"
+    assert repeated.data["results"][0]["id"] == content_id
+    assert Content.objects.get().ingest_key == "1"
+
+
+@pytest.mark.django_db
+def test_ingest_reports_concurrent_content_as_duplicate(
+    auth_client, ambassadors, monkeypatch
+):
+    petya = ambassadors[0]
+    get_content_ids = content_serializers.get_content_ids
+
+    def get_content_ids_before_concurrent_insert(link_keys):
+        monkeypatch.setattr(content_serializers, "get_content_ids", get_content_ids)
+        try:
+            return get_content_ids(link_keys)
+        finally:
+            # Another request inserts the link right after the lookup.
+            Content.objects.create(ambassador=petya, link="https://vc.ru/1")
+
+    monkeypatch.setattr(
+        content_serializers,
+        "get_content_ids",
+        get_content_ids_before_concurrent_insert,
+    )
+    response = auth_client.post(
+        URL,
+        {"submissions": [submission("1", petya.pk, "https://vc.ru/1")]},
+        format="json",
+    )
+
+    assert response.data["created"] == 0
+    assert response.data["results"][0]["status"] == "duplicate"
+    assert response.data["results"][0]["id"] == Content.objects.get().pk
+    assert Content.objects.get().ingest_key is None
+
+
+@pytest.mark.django_db
+def test_ingest_queries_do_not_depend_on_submissions(auth_client, ambassadors):
+    def ingest(count, prefix):
+        submissions = [
+            submission(f"{prefix}{number}", ambassadors[number % 3].pk, link)
+            for number in range(count)
+            for link in [f"https://vc.ru/{prefix}/{number}"]
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = auth_client.post(
+                URL, {"submissions": submissions}, format="json"
+            )
+        assert response.data["created"] == count
+        return len(queries)
+
+    ingest(1, "warm-up")
+    assert ingest(5, "a") == ingest(100, "b")
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "data",
+    [{}, {"submissions": []}, {"submissions": "https://vc.ru/"}, {"submissions": [1]}],
+)
+def test_ingest_rejects_malformed_request(auth_client, data):
+    response = auth_client.post(URL, data, format="json")
+
+    assert response.status_code == 400
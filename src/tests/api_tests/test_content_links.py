@@ -0,0 +1,108 @@
+import pytest
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+
+from ambassadors.models import AmbassadorStats
+from content.models import Content, get_link_hash, normalize_link
+
+URL = "/api/v1/content/"
+
+
+@pytest.mark.parametrize(
+    "link",
+    [
+        "https://habr.com/ru/articles/1/",
+        "http://www.HABR.com/ru/articles/1",
+        "habr.com/ru/articles/1",
+        "https://user@habr.com:443/ru/articles/1/#comments",
+        "https://habr.com/ru/articles/1/?utm_source=vk&utm_medium=post",
+    ],
+)
+def test_link_variants_have_one_hash(link):
+    assert normalize_link(link) == "habr.com/ru/articles/1"
+    assert get_link_hash(link) == get_link_hash("https://habr.com/ru/articles/1/")
+
+
+@pytest.mark.parametrize(
+    "link, other",
+    [
+        ("https://youtu.be/dQw4w9WgXcQ", "https://youtu.be/dqw4w9wgxcq"),
+        ("https://vk.com/wall?w=1", "https://vk.com/wall?w=2"),
+        ("https://habr.com/1", "https://habr.com:8080/1"),
+    ],
+)
+def test_different_links_have_different_hashes(link, other):
+    assert get_link_hash(link) != get_link_hash(other)
+
+
+def test_query_parameters_are_sorted():
+    assert (
+        normalize_link("https://vk.com/wall?b=2&a=1&yclid=3") == "vk.com/wall?a=1&b=2"
+    )
+
+
+@pytest.mark.django_db
+def test_create_content_is_idempotent(auth_client, ambassadors):
+    petya = ambassadors[0]
+    data = {
+        "ambassador": petya.pk,
+        "link": "https://otzovik.com/review_1.html",
+        "is_guide_content": "Да",
+    }
+
+    response = auth_client.post(URL, data, format="json")
+    repeated = auth_client.post(
+        URL,
+        {**data, "link": "http://www.otzovik.com/review_1.html?utm_source=form"},
+        format="json",
+    )
+
+    assert (response.status_code, repeated.status_code) == (201, 200)
+    assert repeated.data["id"] == response.data["id"]
+    assert repeated.data["link"] == "https://otzovik.com/review_1.html"
+    assert Content.objects.filter(ambassador=petya).count() == 1
+    assert AmbassadorStats.objects.get(ambassador=petya).review_count == 1
+
+    response = auth_client.post(
+        URL, {**data, "ambassador": ambassadors[1].pk}, format="json"
+    )
+    assert response.status_code == 201
+
+
+@pytest.mark.django_db
+def test_update_content_to_duplicate_link(auth_client, ambassadors):
+    petya = ambassadors[0]
+    Content.objects.create(ambassador=petya, link="https://habr.com/1")
+    content = Content.objects.create(ambassador=petya, link="https://habr.com/2")
+
+    response = auth_client.patch(
+        f"{URL}{content.pk}/", {"link": "https://www.habr.com/1/"}, format="json"
+    )
+
+    assert response.status_code == 400
+    assert response.data["errors"][0]["attr"] == "link"
+
+    response = auth_client.patch(
+        f"{URL}{content.pk}/", {"link": "https://habr.com/3"}, format="json"
+    )
+    assert response.status_code == 200
+    content.refresh_from_db()
+    assert content.link_hash == get_link_hash("https://habr.com/3")
+
+
+@pytest.mark.django_db
+def test_duplicate_link_is_rejected_by_model(ambassadors):
+    petya = ambassadors[0]
+    content = Content.objects.create(ambassador=petya, link="https://habr.com/1")
+    other = Content.objects.create(ambassador=petya, link="https://habr.com/2")
+
+    other.link = "https://habr.com/1/"
+    with pytest.raises(ValidationError):
+        other.full_clean()
+    other.link = "https://habr.com/3"
+    other.save(update_fields=["link"])
+    other.refresh_from_db()
+    assert other.link_hash == get_link_hash("https://habr.com/3")
+
+    with pytest.raises(IntegrityError):
+        Content.objects.create(ambassador=petya, link=f"{content.link}#top")
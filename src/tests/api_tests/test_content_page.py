@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from content.models import Content
+
+URL = "/api/v1/content_page/"
+
+
+def add_content(ambassador, content_type, count, days_ago=0):
+    for number in range(count):
+        Content.objects.create(
+            ambassador=ambassador,
+            link=f"https://{content_type}.ru/{ambassador.pk}/{number}",
+            type=content_type,
+        )
+    # The last created link of each ambassador is the latest one.
+    for number, content in enumerate(
+        Content.objects.filter(ambassador=ambassador, type=content_type).order_by("pk")
+    ):
+        content.created = timezone.now() - timedelta(days=days_ago + count - number)
+        content.save(update_fields=["created"])
+
+
+@pytest.fixture
+def content(ambassadors):
+    petya, sonya, makar = ambassadors
+    add_content(petya, "review", 2)
+    add_content(petya, "content", 1)
+    add_content(makar, "content", 3)
+    return Content.objects.all()
+
+
+def get_results(response):
+    return {result["id"]: result for result in response.data["results"]}
+
+
+@pytest.mark.django_db
+def test_content_page_values(auth_client, ambassadors, content):
+    petya, sonya, makar = ambassadors
+
+    response = auth_client.get(URL)
+
+    assert response.status_code == 200
+    results = get_results(response)
+    assert results[petya.pk]["review"] == f"https://review.ru/{petya.pk}/1"
+    assert results[petya.pk]["content"] == f"https://content.ru/{petya.pk}/0"
+    assert (results[petya.pk]["review_count"], results[petya.pk]["content_count"]) == (
+        2,
+        1,
+    )
+    assert results[petya.pk]["sending_merch"] == 1
+    assert results[sonya.pk]["review"] == "Еще нет отзывов"
+    assert results[sonya.pk]["content"] == "Еще нет контента"
+    assert results[sonya.pk]["sending_merch"] == 0
+    assert results[makar.pk]["content"] == f"https://content.ru/{makar.pk}/2"
+    assert results[makar.pk]["content_count"] == 3
+    assert results[makar.pk]["sending_merch"] == 2
+
+
+@pytest.mark.django_db
+def test_content_page_queries_do_not_depend_on_content(
+    auth_client, ambassadors, content
+):
+    auth_client.get(URL)
+    with CaptureQueriesContext(connection) as queries:
+        auth_client.get(URL)
+    add_content(ambassadors[1], "review", 5, days_ago=10)
+    with CaptureQueriesContext(connection) as more_content_queries:
+        response = auth_client.get(URL)
+
+    assert get_results(response)[ambassadors[1].pk]["review_count"] == 5
+    assert len(more_content_queries) == len(queries)
+    # The whole page is one statement.
+    assert [query["sql"] for query in queries if "content" in query["sql"]] == [
+        queries[-1]["sql"]
+    ]
+
+
+@pytest.mark.django_db
+def test_content_page_filter_and_ordering(auth_client, ambassadors, content):
+    petya, sonya, makar = ambassadors
+
+    response = auth_client.get(f"{URL}?sending_merch=2")
+    assert list(get_results(response)) == [makar.pk]
+
+    response = auth_client.get(f"{URL}?min_content_count=1&ordering=-content_count")
+    assert list(get_results(response)) == [makar.pk, petya.pk]
+
+    response = auth_client.get(f"{URL}?ordering=-review_count&limit=1")
+    assert list(get_results(response)) == [petya.pk]
+    response = auth_client.get(response.data["next"])
+    assert petya.pk not in get_results(response)
+
+
+@pytest.mark.django_db
+def test_content_page_update_comment(auth_client, ambassadors, content):
+    petya = ambassadors[0]
+
+    response = auth_client.patch(
+        f"{URL}{petya.pk}/", {"comment": "Отправить мерч"}, format="json"
+    )
+
+    assert response.status_code == 200
+    assert response.data["comment"] == "Отправить мерч"
+    assert response.data["review_count"] == 2
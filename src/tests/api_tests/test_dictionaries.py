@@ -0,0 +1,151 @@
+import pytest
+from django.urls import reverse
+
+from ambassadors.models import Ambassador, Program, Status
+from api.dictionaries import DictionaryCache, dictionaries
+from promo.models import MerchCategory
+
+URL = reverse("api:dictionaries")
+
+
+@pytest.mark.django_db
+def test_get_dictionaries(auth_client, statuses, programs, merch_categories):
+    response = auth_client.get(URL)
+
+    assert response.status_code == 200
+    assert response["ETag"]
+    assert "max-age" in response["Cache-Control"]
+    assert [item["slug"] for item in response.data["statuses"]] == [
+        status.slug for status in statuses
+    ]
+    assert len(response.data["programs"]) == len(programs)
+    assert len(response.data["merch_categories"]) == len(merch_categories)
+    assert response.data["guide_tasks"] == []
+
+
+@pytest.mark.django_db
+def test_dictionaries_not_modified(
+    auth_client, statuses, django_assert_num_queries, monkeypatch
+):
+    # The version is not read again during the test.
+    monkeypatch.setattr(dictionaries, "check_interval", 60)
+    etag = auth_client.get(URL)["ETag"]
+
+    with django_assert_num_queries(0):
+        response = auth_client.get(URL, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+
+
+@pytest.mark.django_db
+def test_dictionaries_invalidated_on_change(auth_client, statuses):
+    etag = auth_client.get(URL)["ETag"]
+
+    MerchCategory.objects.create(name="Новая категория")
+    response = auth_client.get(URL, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+    assert response.data["merch_categories"][-1]["name"] == "Новая категория"
+
+    status = statuses[0]
+    status.delete()
+    assert dictionaries.get(Status, slug=status.slug) is None
+
+
+@pytest.mark.django_db
+def test_dictionaries_invalidated_by_another_process(
+    monkeypatch, django_capture_on_commit_callbacks
+):
+    # Another process with its own copy of the dictionaries.
+    other_process = DictionaryCache()
+    assert other_process.get(Status, slug="active") is None
+    dictionaries.get_snapshot()
+
+    # bulk_create() sends no signals, the version is changed explicitly.
+    Status.objects.bulk_create([Status(name="Активный", slug="active")])
+    with django_capture_on_commit_callbacks(execute=True):
+        dictionaries.invalidate()
+
+    assert dictionaries.get(Status, slug="active").name == "Активный"
+    # The version read by the other process is trusted for a while.
+    assert other_process.get(Status, slug="active") is None
+    monkeypatch.setattr(other_process, "check_interval", 0)
+    assert other_process.get(Status, slug="active").name == "Активный"
+
+    Status.objects.filter(slug="active").update(name="Действующий")
+    with django_capture_on_commit_callbacks(execute=True):
+        other_process.invalidate()
+
+    assert other_process.get(Status, slug="active").name == "Действующий"
+    monkeypatch.setattr(dictionaries, "check_interval", 0)
+    assert dictionaries.get(Status, slug="active").name == "Действующий"
+
+
+@pytest.mark.django_db
+def test_version_is_stored_after_commit(django_capture_on_commit_callbacks):
+    other_process = DictionaryCache(check_interval=0)
+    version = other_process.get_version()
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        dictionaries.invalidate()
+
+    assert other_process.get_version() == version
+    callbacks[0]()
+    assert other_process.get_version() == dictionaries.get_version() != version
+
+
+@pytest.mark.django_db
+def test_get_dictionary_object_from_memory(
+    statuses, django_assert_num_queries, monkeypatch
+):
+    monkeypatch.setattr(dictionaries, "check_interval", 60)
+    expected = statuses[1]
+    dictionaries.get_snapshot()
+
+    with django_assert_num_queries(0):
+        status = dictionaries.get(Status, slug=expected.slug)
+
+    assert status == expected
+    assert status.name == expected.name
+    assert not status._state.adding
+
+
+@pytest.mark.django_db
+def test_create_ambassador_resolves_dictionaries(
+    auth_client, addresses, activities, purposes, programs
+):
+    active = Status.objects.create(name="Активный", slug="active")
+    payload = {
+        "name": "Ваня Иванов",
+        "gender": "М",
+        "clothing_size": "M",
+        "shoe_size": "42",
+        "education": "МФТИ",
+        "job": "инженер",
+        "email": "vanya@test.com",
+        "phone_number": "88005555555",
+        "telegram_id": "@vanya",
+        "activity": [{"name": activities[0].name}, {"name": "Новая активность"}],
+        "purpose": {"name": purposes[0].name},
+        "program": {"name": "Новая программа"},
+        "address": {
+            "postal_code": "123456",
+            "country": "Россия",
+            "city": "Казань",
+            "street": "Улица 4",
+        },
+    }
+
+    response = auth_client.post("/api/v1/ambassadors/", payload, format="json")
+
+    assert response.status_code == 201
+    ambassador = Ambassador.objects.get(email=payload["email"])
+    assert ambassador.status == active
+    assert ambassador.purpose == purposes[0]
+    assert ambassador.program == Program.objects.get(name="Новая программа")
+    assert sorted(ambassador.activity.values_list("name", flat=True)) == sorted(
+        item["name"] for item in payload["activity"]
+    )
+    assert dictionaries.get(Program, name="Новая программа") == ambassador.program
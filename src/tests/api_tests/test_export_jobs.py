@@ -0,0 +1,180 @@
+from datetime import timedelta
+
+import pytest
+from django.db import IntegrityError
+from django.urls import reverse
+from django.utils import timezone
+
+from tests.google_fakes import FakeDriveService, FakeSheetsService
+
+from api.exports import run_export_job
+from api.models import (
+    EXPORT_MAX_ATTEMPTS,
+    EXPORT_MERCH_APPLICATIONS,
+    EXPORT_PROMOCODES,
+    EXPORT_RETRY_DELAY,
+    STATUS_DONE,
+    STATUS_FAILED,
+    STATUS_PENDING,
+    STATUS_RUNNING,
+    ExportJob,
+)
+
+
+@pytest.mark.django_db
+def test_identical_exports_collapse_into_one_job(auth_client, promocodes):
+    url = reverse("api:promocode-export-to-google-sheet")
+    first_response = auth_client.post(url)
+    second_response = auth_client.post(url)
+
+    assert first_response.status_code == 202
+    assert second_response.status_code == 202
+    assert first_response.data["id"] == second_response.data["id"]
+    assert first_response["Location"].endswith(
+        reverse("api:exportjob-detail", kwargs={"pk": first_response.data["id"]})
+    )
+    assert ExportJob.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_export_can_be_queued_by_deprecated_get(auth_client, promocodes):
+    url = reverse("api:merchapplication-export-to-google-sheet")
+
+    response = auth_client.get(url)
+
+    assert response.status_code == 202
+    assert response["Deprecation"] == "true"
+    assert auth_client.post(url).data["id"] == response.data["id"]
+
+
+@pytest.mark.django_db
+def test_active_export_job_is_unique():
+    ExportJob.objects.create(kind=EXPORT_PROMOCODES)
+    ExportJob.objects.create(kind=EXPORT_MERCH_APPLICATIONS)
+    ExportJob.objects.create(kind=EXPORT_PROMOCODES, status=STATUS_DONE)
+
+    with pytest.raises(IntegrityError):
+        ExportJob.objects.create(kind=EXPORT_PROMOCODES, status=STATUS_RUNNING)
+
+
+@pytest.mark.django_db
+def test_finished_export_can_be_queued_again(user):
+    job, _ = ExportJob.objects.enqueue(EXPORT_PROMOCODES, user)
+    job.finish("https://docs.google.com/spreadsheets/d/1/edit")
+
+    new_job, created = ExportJob.objects.enqueue(EXPORT_PROMOCODES, user)
+
+    assert created
+    assert new_job.pk != job.pk
+
+
+@pytest.mark.django_db
+def test_claim_takes_job_once():
+    job, _ = ExportJob.objects.enqueue(EXPORT_PROMOCODES)
+
+    claimed = ExportJob.objects.claim()
+
+    assert claimed.pk == job.pk
+    assert claimed.status == STATUS_RUNNING
+    assert claimed.attempts == 1
+    assert ExportJob.objects.claim() is None
+
+
+@pytest.mark.django_db
+def test_stale_running_job_is_requeued():
+    ExportJob.objects.enqueue(EXPORT_PROMOCODES)
+    job = ExportJob.objects.claim()
+
+    assert ExportJob.objects.requeue_stale(timedelta(minutes=10)) == 0
+    assert ExportJob.objects.requeue_stale(timedelta(seconds=-1)) == 1
+    job.refresh_from_db()
+    assert job.status == STATUS_PENDING
+
+
+@pytest.mark.django_db
+def test_failed_export_job_resumes(promocodes):
+    sheets = FakeSheetsService(failures={"batchUpdate": 1})
+    services = (sheets, FakeDriveService())
+    ExportJob.objects.enqueue(EXPORT_PROMOCODES)
+
+    job = run_export_job(ExportJob.objects.claim(), services, retries=0)
+
+    assert job.status == STATUS_PENDING
+    assert job.spreadsheet_id == "spreadsheet-1"
+    assert "503" in job.error
+    # The job waits for its retry time.
+    assert job.run_after > timezone.now()
+    assert ExportJob.objects.claim() is None
+    ExportJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+
+    job = run_export_job(ExportJob.objects.claim(), services, retries=0)
+
+    assert job.status == STATUS_DONE
+    assert job.processed == job.total == len(promocodes)
+    assert sheets.calls["create"] == 1
+    assert len(sheets.get_rows(job.spreadsheet_id, "Промокоды")) == len(promocodes) + 1
+
+
+@pytest.mark.django_db
+def test_export_job_fails_after_last_attempt(promocodes):
+    sheets = FakeSheetsService(failures={"batchUpdate": EXPORT_MAX_ATTEMPTS})
+    services = (sheets, FakeDriveService())
+    ExportJob.objects.enqueue(EXPORT_PROMOCODES)
+
+    delays = []
+    for _ in range(EXPORT_MAX_ATTEMPTS):
+        ExportJob.objects.update(run_after=None)
+        job = run_export_job(ExportJob.objects.claim(), services, retries=0)
+        if job.run_after is not None:
+            delays.append(job.run_after - job.updated)
+
+    assert job.status == STATUS_FAILED
+    assert job.finished is not None
+    assert ExportJob.objects.claim() is None
+    # The delay before the next attempt doubles.
+    assert [round(delay / EXPORT_RETRY_DELAY) for delay in delays] == [1, 2]
+
+
+@pytest.mark.django_db
+def test_get_export_job_status(auth_client, user):
+    job, _ = ExportJob.objects.enqueue(EXPORT_MERCH_APPLICATIONS, user)
+
+    response = auth_client.get(reverse("api:exportjob-detail", kwargs={"pk": job.pk}))
+
+    assert response.status_code == 200
+    assert response.data["status"] == STATUS_PENDING
+    assert response.data["kind"] == EXPORT_MERCH_APPLICATIONS
+    assert response.data["link"] == ""
+
+
+@pytest.mark.django_db
+def test_incremental_export_keeps_spreadsheet(auth_client, promocodes, monkeypatch):
+    sheets = FakeSheetsService()
+    monkeypatch.setattr(
+        "api.exports.get_google_services", lambda: (sheets, FakeDriveService())
+    )
+    url = reverse("api:promocode-export-to-google-sheet") + "?incremental=true"
+
+    links = []
+    for _ in range(2):
+        response = auth_client.post(url)
+        assert response.data["incremental"] is True
+        job = run_export_job(ExportJob.objects.claim())
+        assert job.status == STATUS_DONE
+        assert job.processed == len(promocodes)
+        links.append(job.link)
+
+    assert links[0] == links[1]
+    assert sheets.calls["create"] == 1
+    assert sheets.calls["batchUpdate"] == 2
+
+
+@pytest.mark.django_db
+def test_incremental_and_full_exports_are_separate_jobs():
+    job, _ = ExportJob.objects.enqueue(EXPORT_PROMOCODES)
+    incremental_job, created = ExportJob.objects.enqueue(
+        EXPORT_PROMOCODES, incremental=True
+    )
+
+    assert created
+    assert incremental_job.pk != job.pk
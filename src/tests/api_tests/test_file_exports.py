@@ -0,0 +1,186 @@
+import csv
+import io
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from ambassadors.models import Ambassador
+from api.exports import AMBASSADOR_EXPORT_COLUMNS
+from api.google_sheets_examples import MERCH_APPLICATIONS_SHEET, PROMOCODES_SHEET
+from promo.models import MerchApplication, MerchInApplication
+
+
+def read_csv(response):
+    content = b"".join(response.streaming_content).decode("utf-8-sig")
+    return list(csv.reader(io.StringIO(content)))
+
+
+@pytest.mark.django_db
+def test_export_merch_applications_csv_row_per_merch(
+    auth_client, user, merch, merch_applications
+):
+    application = merch_applications[0]
+    MerchInApplication.objects.create(
+        application=application, merch=merch[1], quantity=3
+    )
+    empty_application = MerchApplication.objects.create(
+        ambassador=application.ambassador, tutor=user, application_number="no-merch"
+    )
+
+    response = auth_client.get("/api/v1/send_merch/export/")
+
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/csv")
+    assert "attachment" in response["Content-Disposition"]
+    rows = read_csv(response)
+    assert rows[0] == list(MERCH_APPLICATIONS_SHEET.columns)
+    assert len(rows) == 1 + 4 + 1
+    first_lines = [row for row in rows[1:] if row[0] == str(application.pk)]
+    assert [(row[3], row[5]) for row in first_lines] == [
+        (merch[0].name, "2"),
+        (merch[1].name, "3"),
+    ]
+    assert rows[-1][:6] == [
+        str(empty_application.pk),
+        "no-merch",
+        f"{user.first_name} {user.last_name}".strip(),
+        "Заявка без мерча",
+        "-",
+        "0",
+    ]
+
+
+@pytest.mark.django_db
+def test_export_merch_applications_applies_filters(
+    auth_client, merch_applications, ambassadors
+):
+    response = auth_client.get(
+        f"/api/v1/send_merch/export/?ambassador={ambassadors[1].pk}"
+    )
+
+    rows = read_csv(response)
+    assert [row[1] for row in rows[1:]] == [merch_applications[1].application_number]
+
+
+@pytest.mark.django_db
+def test_export_merch_applications_keeps_ordering(
+    auth_client, merch, merch_applications
+):
+    application = merch_applications[0]
+    MerchInApplication.objects.create(application=application, merch=merch[1])
+    expected = [
+        application.application_number
+        for application in merch_applications.order_by("-total_cost", "pk")
+    ]
+
+    response = auth_client.get("/api/v1/send_merch/export/?ordering=-total_cost")
+
+    rows = read_csv(response)
+    assert list(dict.fromkeys(row[1] for row in rows[1:])) == expected
+    assert len(rows) == 1 + 4
+
+    response = auth_client.get("/api/v1/send_merch/export/?ordering=merch__name")
+
+    assert len(read_csv(response)) == 1 + 4
+
+
+@pytest.mark.django_db
+def test_export_promocodes_xlsx(auth_client, promocodes):
+    response = auth_client.get("/api/v1/promocodes/export/?file_format=xlsx")
+
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith(
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+    workbook = load_workbook(io.BytesIO(b"".join(response.streaming_content)))
+    rows = list(workbook[PROMOCODES_SHEET.worksheet_name].values)
+    assert rows[0] == PROMOCODES_SHEET.columns
+    assert [row[1] for row in rows[1:]] == [promocode.code for promocode in promocodes]
+
+
+@pytest.mark.django_db
+def test_export_budget_csv(auth_client, merch_applications):
+    year = timezone.localdate().year
+
+    response = auth_client.get(f"/api/v1/send_merch/budget_info/export/?year={year}")
+
+    rows = read_csv(response)
+    assert len(rows) == 1 + len(merch_applications) + 1
+    assert rows[-1][0] == "Итого"
+    total = sum(application.total_cost for application in merch_applications)
+    assert float(rows[-1][-1]) == total
+
+
+@pytest.mark.django_db
+def test_export_invalid_file_format(auth_client, promocodes):
+    response = auth_client.get("/api/v1/promocodes/export/?file_format=pdf")
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_export_ambassadors_csv(auth_client, ambassadors, statuses):
+    petya = ambassadors[0]
+
+    response = auth_client.get(f"/api/v1/ambassadors/export/?status={statuses[0].slug}")
+
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/csv")
+    rows = read_csv(response)
+    assert rows[0] == list(AMBASSADOR_EXPORT_COLUMNS)
+    records = {row[rows[0].index("email")]: dict(zip(rows[0], row)) for row in rows[1:]}
+    assert list(records) == list(
+        Ambassador.objects.filter(status=statuses[0])
+        .order_by("-created")
+        .values_list("email", flat=True)
+    )
+    record = records[petya.email]
+    assert record["status"] == statuses[0].name
+    assert record["city"] == petya.address.city
+    assert record["activity"].split(",") == sorted(
+        petya.activity.values_list("name", flat=True)
+    )
+
+
+@pytest.mark.django_db
+def test_export_ambassadors_ndjson_fields(
+    auth_client, ambassadors, promocodes, monkeypatch
+):
+    # Several chunks for three ambassadors.
+    monkeypatch.setattr("api.exports.EXPORT_CHUNK_SIZE", 2)
+
+    response = auth_client.get(
+        "/api/v1/ambassadors/export/"
+        "?file_format=ndjson&fields=email,promocodes,program"
+    )
+    with CaptureQueriesContext(connection) as queries:
+        content = b"".join(response.streaming_content).decode()
+
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in content.splitlines()]
+    expected = [
+        {
+            "email": ambassador.email,
+            "promocodes": sorted(ambassador.promocodes.values_list("code", flat=True)),
+            "program": ambassador.program.name,
+        }
+        for ambassador in sorted(
+            ambassadors, key=lambda ambassador: ambassador.created, reverse=True
+        )
+    ]
+    assert records == expected
+    # The ambassadors and promocodes of each of two chunks.
+    assert len(queries) == 1 + 2
+
+
+@pytest.mark.django_db
+def test_export_ambassadors_unknown_field(auth_client, ambassadors):
+    response = auth_client.get("/api/v1/ambassadors/export/?fields=email,password")
+
+    assert response.status_code == 400
+    assert response.data["errors"][0]["attr"] == "fields"
@@ -0,0 +1,340 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from tests.google_fakes import FakeDriveService, FakeSheetsService
+
+from ambassadors.models import Ambassador
+from api.exports import SYNC_MODIFIED_FIELDS, get_merch_applications_queryset
+from api.google_sheets_examples import (
+    MERCH_APPLICATIONS_SHEET,
+    PROMOCODES_SHEET,
+    GoogleClientProvider,
+    SheetExportError,
+    export_queryset_to_sheet,
+    get_merch_application_row,
+    get_promocode_row,
+    sync_queryset_to_sheet,
+)
+from api.models import EXPORT_MERCH_APPLICATIONS, EXPORT_PROMOCODES, SheetSync
+from promo.models import MerchApplication, MerchInApplication, Promocode
+
+PROMOCODES_COUNT = 1200
+
+
+@pytest.fixture
+def many_promocodes(ambassadors):
+    Promocode.objects.bulk_create(
+        Promocode(code=f"code{number}", ambassador=ambassadors[number % 3])
+        for number in range(PROMOCODES_COUNT)
+    )
+    return Promocode.objects.select_related("ambassador__status")
+
+
+def export_promocodes(queryset, sheets, **kwargs):
+    return export_queryset_to_sheet(
+        queryset,
+        get_promocode_row,
+        PROMOCODES_SHEET,
+        services=(sheets, FakeDriveService()),
+        backoff=0,
+        **kwargs,
+    )
+
+
+@pytest.mark.django_db
+def test_export_writes_rows_in_chunks(many_promocodes):
+    sheets = FakeSheetsService()
+    progress = []
+
+    link = export_promocodes(
+        many_promocodes, sheets, chunk_size=500, progress=progress.append
+    )
+
+    rows = sheets.get_rows("spreadsheet-1", PROMOCODES_SHEET.worksheet_name)
+    assert link == "https://docs.google.com/spreadsheets/d/spreadsheet-1/edit"
+    assert sheets.calls["batchUpdate"] == 3
+    assert progress == [500, 1000, PROMOCODES_COUNT + 1]
+    assert rows[0] == list(PROMOCODES_SHEET.columns)
+    assert [row[0] for row in rows[1:]] == list(
+        many_promocodes.values_list("id", flat=True)
+    )
+
+
+@pytest.mark.django_db
+def test_export_retries_failed_chunks(many_promocodes):
+    sheets = FakeSheetsService(failures={"batchUpdate": 2, "create": 1})
+
+    export_promocodes(many_promocodes, sheets, chunk_size=500)
+
+    rows = sheets.get_rows("spreadsheet-1", PROMOCODES_SHEET.worksheet_name)
+    assert sheets.calls["batchUpdate"] == 5
+    assert len(rows) == PROMOCODES_COUNT + 1
+
+
+@pytest.mark.django_db
+def test_export_resumes_after_error(many_promocodes):
+    sheets = FakeSheetsService()
+    original_batch_update = sheets.batchUpdate
+
+    def batch_update(spreadsheetId, body):  # noqa: N803
+        if sheets.calls["batchUpdate"] == 1:
+            sheets.failures["batchUpdate"] = 10
+        return original_batch_update(spreadsheetId, body)
+
+    sheets.batchUpdate = batch_update
+    with pytest.raises(SheetExportError) as error:
+        export_promocodes(many_promocodes, sheets, chunk_size=500, retries=1)
+    assert error.value.rows_written == 500
+
+    sheets.failures.clear()
+    export_promocodes(
+        many_promocodes,
+        sheets,
+        chunk_size=500,
+        spreadsheet_id=error.value.spreadsheet_id,
+        rows_written=error.value.rows_written,
+    )
+
+    assert sheets.calls["create"] == 1
+    rows = sheets.get_rows("spreadsheet-1", PROMOCODES_SHEET.worksheet_name)
+    assert rows[0] == list(PROMOCODES_SHEET.columns)
+    assert [row[0] for row in rows[1:]] == list(
+        many_promocodes.values_list("id", flat=True)
+    )
+
+
+@pytest.mark.django_db
+def test_export_merch_applications_streams_queryset(
+    merch_applications, django_assert_num_queries
+):
+    sheets = FakeSheetsService()
+    queryset = MerchApplication.objects.select_related(
+        "ambassador__address", "tutor"
+    ).prefetch_related("merch_in_applications__merch")
+
+    # One query for the applications and two prefetch queries per chunk.
+    with django_assert_num_queries(5):
+        export_queryset_to_sheet(
+            queryset,
+            get_merch_application_row,
+            MERCH_APPLICATIONS_SHEET,
+            services=(sheets, FakeDriveService()),
+            chunk_size=2,
+        )
+
+    rows = sheets.get_rows("spreadsheet-1", MERCH_APPLICATIONS_SHEET.worksheet_name)
+    assert sheets.calls["batchUpdate"] == 2
+    assert [row[1] for row in rows[1:]] == [
+        application.application_number for application in merch_applications
+    ]
+
+
+class FakeCredentials:
+    def __init__(self, expires_in):
+        self.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + expires_in
+        self.refreshes = 0
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.expiry += timedelta(hours=1)
+
+    def to_json(self):
+        return "{}"
+
+
+def test_client_provider_loads_credentials_once():
+    loads = []
+
+    def load_credentials():
+        loads.append(FakeCredentials(timedelta(hours=1)))
+        return loads[-1]
+
+    provider = GoogleClientProvider(load_credentials)
+    services = provider.get_services()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        thread_services = list(
+            executor.map(lambda _: provider.get_services(), range(8))
+        )
+
+    assert len(loads) == 1
+    assert provider.get_services() is services
+    assert all(item is not services for item in thread_services)
+    assert loads[0].refreshes == 0
+
+
+def test_client_provider_refreshes_expiring_credentials(tmp_path):
+    credentials = FakeCredentials(timedelta(minutes=1))
+    provider = GoogleClientProvider(
+        lambda: credentials, token_path=tmp_path / "token.json"
+    )
+
+    provider.get_credentials()
+    provider.get_credentials()
+    provider.get_credentials()
+
+    assert credentials.refreshes == 1
+    assert (tmp_path / "token.json").read_text() == "{}"
+
+
+def sync_promocodes(sync, sheets, get_row=get_promocode_row, **kwargs):
+    return sync_queryset_to_sheet(
+        sync,
+        Promocode.objects.select_related("ambassador__status"),
+        get_row,
+        PROMOCODES_SHEET,
+        services=(sheets, FakeDriveService()),
+        modified_fields=("modified", "ambassador__modified"),
+        backoff=0,
+        **kwargs,
+    )
+
+
+@pytest.mark.django_db
+def test_sync_writes_only_changed_rows(promocodes, ambassadors):
+    sheets = FakeSheetsService()
+    sync = SheetSync.objects.create(kind=EXPORT_PROMOCODES)
+
+    link = sync_promocodes(sync, sheets)
+
+    assert sheets.calls["create"] == 1
+    assert sheets.calls["batchUpdate"] == 2
+    assert sync.rows.count() == len(promocodes)
+
+    assert sync_promocodes(sync, sheets) == link
+    assert sheets.calls["create"] == 1
+    assert sheets.calls["batchUpdate"] == 2
+
+    changed, deleted = promocodes[0], promocodes[1]
+    Promocode.objects.filter(pk=changed.pk).update(
+        is_active=False, modified=datetime.now(timezone.utc)
+    )
+    deleted.delete()
+    new = Promocode.objects.create(code="newcode", ambassador=ambassadors[0])
+
+    assert sync_promocodes(sync, sheets) == link
+    assert sheets.calls["batchUpdate"] == 3
+
+    rows = sheets.get_rows("spreadsheet-1", PROMOCODES_SHEET.worksheet_name)
+    assert rows[0] == list(PROMOCODES_SHEET.columns)
+    assert rows[1][:3] == [changed.pk, changed.code, False]
+    assert rows[2] == [""] * len(PROMOCODES_SHEET.columns)
+    assert rows[-1][:2] == [new.pk, new.code]
+    assert len(rows) == len(promocodes) + 2
+    assert not sync.rows.filter(object_id=deleted.pk).exists()
+
+
+@pytest.mark.django_db
+def test_sync_continues_after_error(many_promocodes):
+    sheets = FakeSheetsService()
+    sync = SheetSync.objects.create(kind=EXPORT_PROMOCODES)
+    sync_promocodes(sync, sheets, chunk_size=500)
+    old_hashes = dict(sync.rows.values_list("object_id", "content_hash"))
+    many_promocodes.update(is_active=False, modified=datetime.now(timezone.utc))
+
+    original_batch_update = sheets.batchUpdate
+
+    def batch_update(spreadsheetId, body):  # noqa: N803
+        # Header and three chunks of the first sync, then the first new chunk.
+        if sheets.calls["batchUpdate"] == 5:
+            sheets.failures["batchUpdate"] = 1
+        return original_batch_update(spreadsheetId, body)
+
+    sheets.batchUpdate = batch_update
+    with pytest.raises(SheetExportError):
+        sync_promocodes(sync, sheets, chunk_size=500, retries=0)
+
+    new_hashes = dict(sync.rows.values_list("object_id", "content_hash"))
+    assert sum(new_hashes[pk] != old_hashes[pk] for pk in old_hashes) == 500
+
+    sheets.batchUpdate = original_batch_update
+    sheets.calls.clear()
+    sync_promocodes(sync, sheets, chunk_size=500)
+
+    rows = sheets.get_rows("spreadsheet-1", PROMOCODES_SHEET.worksheet_name)
+    assert sheets.calls["batchUpdate"] == 2
+    assert len(rows) == PROMOCODES_COUNT + 1
+    assert all(row[2] is False for row in rows[1:])
+
+
+@pytest.mark.django_db
+def test_sync_reads_only_modified_objects(promocodes, ambassadors):
+    sheets = FakeSheetsService()
+    sync = SheetSync.objects.create(kind=EXPORT_PROMOCODES)
+    sync_promocodes(sync, sheets)
+    # The objects have not changed since the sync.
+    day_ago = datetime.now(timezone.utc) - timedelta(days=1)
+    Promocode.objects.update(modified=day_ago)
+    Ambassador.objects.update(modified=day_ago)
+    read = []
+
+    def get_row(item):
+        read.append(item.pk)
+        return get_promocode_row(item)
+
+    sync_promocodes(sync, sheets, get_row=get_row)
+    assert read == []
+
+    petya = ambassadors[0]
+    petya.name = "Петр"
+    petya.save()
+    sync_promocodes(sync, sheets, get_row=get_row)
+
+    petya_promocodes = set(petya.promocodes.values_list("pk", flat=True))
+    assert set(read) == petya_promocodes
+    rows = sheets.get_rows("spreadsheet-1", PROMOCODES_SHEET.worksheet_name)
+    assert {row[0] for row in rows[1:] if row[3] == "Петр"} == petya_promocodes
+
+
+def sync_merch_applications(sync, sheets):
+    return sync_queryset_to_sheet(
+        sync,
+        get_merch_applications_queryset(),
+        get_merch_application_row,
+        MERCH_APPLICATIONS_SHEET,
+        services=(sheets, FakeDriveService()),
+        modified_fields=SYNC_MODIFIED_FIELDS[EXPORT_MERCH_APPLICATIONS],
+        backoff=0,
+    )
+
+
+@pytest.mark.django_db
+def test_sync_follows_merch_changes(admin, auth_client, merch_applications):
+    sheets = FakeSheetsService()
+    sync = SheetSync.objects.create(kind=EXPORT_MERCH_APPLICATIONS)
+    sync_merch_applications(sync, sheets)
+    # The objects have not changed since the sync.
+    day_ago = datetime.now(timezone.utc) - timedelta(days=1)
+    MerchApplication.objects.update(modified=day_ago)
+    Ambassador.objects.update(modified=day_ago)
+
+    admin.is_superuser = True
+    admin.save()
+    admin_client = Client()
+    admin_client.force_login(admin)
+    line = MerchInApplication.objects.get(application=merch_applications[0])
+    response = admin_client.post(
+        reverse("admin:promo_merchinapplication_change", args=[line.pk]),
+        {
+            "application": line.application_id,
+            "merch": line.merch_id,
+            "quantity": 5,
+            "unit_cost": line.unit_cost,
+        },
+    )
+    assert response.status_code == 302
+    auth_client.patch(
+        reverse(
+            "api:merch-detail", kwargs={"pk": merch_applications[1].merch.get().pk}
+        ),
+        {"name": "Новое имя"},
+        format="json",
+    )
+    sync_merch_applications(sync, sheets)
+
+    rows = sheets.get_rows("spreadsheet-1", MERCH_APPLICATIONS_SHEET.worksheet_name)
+    assert rows[1][5] == 5
+    assert rows[2][3] == "Новое имя"
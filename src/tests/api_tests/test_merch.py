@@ -3,17 +3,19 @@ from django.urls import reverse
 
 from tests.fixtures import TEST_COST, TEST_NAME, TEST_SIZE, TEST_SLUG
 
+from ambassadors.models import AmbassadorStats
 from api.mixins import MESSAGE_ON_DELETE
+from promo.models import Merch, MerchApplication, MerchInApplication, MerchSpendMonthly
 
 
 @pytest.mark.django_db
 def test_get_merch_list(auth_client, merch):
     response = auth_client.get(reverse("api:merch-list"))
     assert response.status_code == 200
-    assert len(response.data) == 6
-    assert response.data[0]["name"] == merch[0].name
-    assert response.data[0]["size"] == merch[0].size
-    assert response.data[0]["cost"] == merch[0].cost
+    assert len(response.data["results"]) == 6
+    assert response.data["results"][0]["name"] == merch[0].name
+    assert response.data["results"][0]["size"] == merch[0].size
+    assert response.data["results"][0]["cost"] == merch[0].cost
 
 
 @pytest.mark.django_db
@@ -207,3 +209,131 @@ def test_delete_merch(auth_client, merch):
 
     assert response.status_code == 200
     assert response.data["message"] == MESSAGE_ON_DELETE
+
+
+@pytest.mark.django_db
+def test_delete_merch_used_in_applications(auth_client, merch, merch_applications):
+    application = merch_applications[0]
+    kept_merch = merch[1]
+    MerchInApplication.objects.create(application=application, merch=kept_merch)
+    MerchApplication.objects.filter(pk=application.pk).update_total_cost()
+    MerchSpendMonthly.objects.rebuild()
+
+    response = auth_client.delete(
+        reverse("api:merch-detail", kwargs={"pk": merch[0].pk})
+    )
+
+    assert response.status_code == 200
+    application.refresh_from_db()
+    assert application.total_cost == kept_merch.cost
+    assert MerchSpendMonthly.objects.find_inconsistencies() == []
+    stats = AmbassadorStats.objects.get(ambassador=application.ambassador)
+    assert stats.merch_spend == kept_merch.cost
+    assert stats.merch_application_count == 1
+
+
+@pytest.mark.django_db
+def test_delete_merch_category_used_in_applications(
+    auth_client, merch, merch_categories, merch_applications
+):
+    kept_merch = merch[2]
+    response = auth_client.delete(
+        reverse("api:merchcategory-detail", kwargs={"pk": merch_categories[1].pk})
+    )
+
+    assert response.status_code == 200
+    assert list(
+        merch_applications.order_by("pk").values_list("total_cost", flat=True)
+    ) == [0, 0, kept_merch.cost * 10]
+    assert MerchSpendMonthly.objects.find_inconsistencies() == []
+    assert AmbassadorStats.objects.filter(merch_spend__gt=0).count() == 1
+
+
+@pytest.mark.django_db
+def test_filter_merch_by_cost(auth_client, merch):
+    response = auth_client.get(reverse("api:merch-list") + "?min_cost=300&max_cost=555")
+
+    assert response.status_code == 200
+    assert [item["cost"] for item in response.data["results"]] == [
+        item.cost for item in merch if 300 <= item.cost <= 555
+    ]
+
+
+@pytest.mark.django_db
+def test_get_merch_facets(
+    auth_client, merch, merch_categories, django_assert_num_queries
+):
+    with django_assert_num_queries(1):
+        response = auth_client.get(reverse("api:merch-facets"))
+
+    assert response.status_code == 200
+    assert response.data["count"] == 6
+    assert response.data["min_cost"] == min(item.cost for item in merch)
+    assert response.data["max_cost"] == max(item.cost for item in merch)
+    assert [
+        (bucket["min_cost"], bucket["count"])
+        for bucket in response.data["cost_buckets"]
+    ] == [(200, 1), (300, 3), (500, 2)]
+    assert {
+        category["slug"]: category["count"] for category in response.data["categories"]
+    } == {category.slug: 2 for category in merch_categories}
+    assert {size["size"]: size["count"] for size in response.data["sizes"]} == {
+        "S": 2,
+        "M": 1,
+        "L": 1,
+        "39-40": 1,
+        "41-42": 1,
+    }
+
+
+@pytest.mark.django_db
+def test_get_merch_facets_with_filters(auth_client, merch):
+    response = auth_client.get(
+        reverse("api:merch-facets") + "?min_cost=300&size=S,M&bucket_size=250"
+    )
+
+    assert response.status_code == 200
+    assert response.data["count"] == 3
+    assert [
+        (bucket["min_cost"], bucket["max_cost"], bucket["count"])
+        for bucket in response.data["cost_buckets"]
+    ] == [(250, 500, 1), (500, 750, 2)]
+
+
+@pytest.mark.django_db
+def test_get_merch_facets_invalid_bucket_size(auth_client, merch):
+    response = auth_client.get(reverse("api:merch-facets") + "?bucket_size=0")
+
+    assert response.status_code == 400
+    assert response.data["errors"][0]["attr"] == "bucket_size"
+
+
+@pytest.mark.django_db
+def test_search_merch_by_name_ranks_prefix_first(auth_client, merch, merch_categories):
+    sticker = Merch.objects.create(
+        name="логотип-наклейка", category=merch_categories[0], cost=50
+    )
+
+    response = auth_client.get(reverse("api:merch-list") + "?name=логотип")
+
+    assert response.status_code == 200
+    assert [item["id"] for item in response.data["results"]] == [
+        sticker.pk,
+        merch[0].pk,
+        merch[1].pk,
+    ]
+
+
+@pytest.mark.django_db
+def test_search_merch_by_name_with_ordering(auth_client, merch, merch_categories):
+    Merch.objects.create(name="логотип-наклейка", category=merch_categories[0], cost=50)
+
+    response = auth_client.get(
+        reverse("api:merch-list") + "?name=логотип&ordering=-cost"
+    )
+
+    assert [item["cost"] for item in response.data["results"]] == [
+        merch[1].cost,
+        merch[0].cost,
+        50,
+    ]
@@ -1,9 +1,15 @@
 import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
 from tests.fixtures import TEST_NUMBER, TEST_PAST_DATETIME
+from tests.google_fakes import FakeDriveService, FakeSheetsService
 
 from api.mixins import MESSAGE_ON_DELETE
+from promo.models import MerchApplication, MerchInApplication, MerchSpendMonthly
 
 
 @pytest.mark.django_db
@@ -13,20 +19,21 @@ def test_get_merch_applications_list(
     response = auth_client.get(reverse("api:merchapplication-list"))
 
     assert response.status_code == 200
-    assert len(response.data) == 3
+    assert len(response.data["results"]) == 3
     assert (
-        response.data[0]["application_number"]
+        response.data["results"][0]["application_number"]
         == merch_applications[0].application_number
     )
     assert (
-        response.data[0]["ambassador"]["name"] == merch_applications[0].ambassador.name
+        response.data["results"][0]["ambassador"]["name"]
+        == merch_applications[0].ambassador.name
     )
     assert (
-        response.data[0]["tutor"]["full_name"]
+        response.data["results"][0]["tutor"]["full_name"]
         == merch_applications[0].tutor.get_full_name()
     )
     assert (
-        response.data[0]["merch"][0]["name"]
+        response.data["results"][0]["merch"][0]["name"]
         == merch_applications[0].merch.all()[0].name
     )
 
@@ -70,11 +77,12 @@ def test_create_merch_applications(auth_client, ambassadors, user, merch):
         reverse("api:merchapplication-list"), payload, format="json"
     )
 
+    today = timezone.localdate()
     assert response.status_code == 201
-    assert "2024" in response.data["application_number"]
+    assert response.data["application_number"] == f"{today}-000001"
     assert response.data["ambassador"] == ambassadors[0].pk
     assert response.data["tutor"] == user.pk
-    assert "2024" in response.data["created"]
+    assert str(today.year) in response.data["created"]
     assert response.data["merch"][0]["id"] == merch[0].pk
     assert response.data["merch"][0]["name"] == merch[0].name
     assert response.data["merch"][0]["category"] == merch[0].category.name
@@ -191,6 +199,109 @@ def test_edit_merch_applications_merch(auth_client, merch_applications, merch):
     assert response.data["id"] == merch_applications[0].pk
 
 
+@pytest.mark.django_db
+def test_edit_merch_applications_merch_diff(
+    auth_client, merch_applications, merch, ambassadors
+):
+    application = merch_applications[0]
+    MerchInApplication.objects.create(
+        application=application, merch=merch[1], quantity=1
+    )
+    kept_line, removed_line = application.merch_in_applications.order_by("pk")
+    payload = {
+        "merch": [
+            {"id": merch[0].pk, "quantity": 5},
+            {"id": merch[2].pk},
+            {"id": merch[2].pk, "quantity": 2},
+        ]
+    }
+    response = auth_client.patch(
+        reverse("api:merchapplication-detail", kwargs={"pk": application.pk}),
+        payload,
+        format="json",
+    )
+
+    assert response.status_code == 200
+    assert [(item["id"], item["quantity"]) for item in response.data["merch"]] == [
+        (merch[0].pk, 5),
+        (merch[2].pk, 3),
+    ]
+    assert application.merch_in_applications.filter(pk=kept_line.pk).exists()
+    assert not MerchInApplication.objects.filter(pk=removed_line.pk).exists()
+    total_cost = merch[0].cost * 5 + merch[2].cost * 3
+    assert response.data["merch_cost"] == total_cost
+    today = timezone.localdate()
+    assert MerchSpendMonthly.objects.get(
+        ambassador=ambassadors[0], year=today.year, month=today.month
+    ).total == pytest.approx(total_cost)
+
+
+@pytest.mark.django_db
+def test_repeated_merch_quantity_is_validated(auth_client, merch_applications, merch):
+    application = merch_applications[0]
+    lines = list(application.merch_in_applications.values_list("merch", "quantity"))
+    payload = {
+        "merch": [
+            {"id": merch[0].pk, "quantity": 100},
+            {"id": merch[1].pk, "quantity": 100},
+            {"id": merch[0].pk, "quantity": 100},
+        ]
+    }
+
+    response = auth_client.patch(
+        reverse("api:merchapplication-detail", kwargs={"pk": application.pk}),
+        payload,
+        format="json",
+    )
+
+    assert response.status_code == 400
+    assert sorted(error["attr"] for error in response.data["errors"]) == [
+        "merch.0.quantity",
+        "merch.2.quantity",
+    ]
+    assert (
+        list(application.merch_in_applications.values_list("merch", "quantity"))
+        == lines
+    )
+
+
+@pytest.mark.django_db
+def test_edit_merch_applications_merch_constant_queries(
+    auth_client, merch_applications, merch
+):
+    merch = list(merch)
+    queries = []
+    for application, count in zip(merch_applications, (1, len(merch))):
+        payload = {
+            "merch": [
+                {"id": item.pk, "quantity": number + 1}
+                for number, item in enumerate(merch[:count])
+            ]
+        }
+        url = reverse("api:merchapplication-detail", kwargs={"pk": application.pk})
+        with CaptureQueriesContext(connection) as context:
+            response = auth_client.patch(url, payload, format="json")
+        assert response.status_code == 200
+        assert len(response.data["merch"]) == count
+        queries.append(len(context))
+
+    assert queries[0] == queries[1]
+
+
+@pytest.mark.django_db
+def test_edit_merch_applications_unknown_merch(auth_client, merch_applications, merch):
+    payload = {"merch": [{"id": merch[0].pk}, {"id": 0}]}
+    response = auth_client.patch(
+        reverse("api:merchapplication-detail", kwargs={"pk": merch_applications[0].pk}),
+        payload,
+        format="json",
+    )
+
+    assert response.status_code == 400
+    assert response.data["errors"][0]["attr"] == "merch.1.id"
+    assert response.data["errors"][0]["code"] == "does_not_exist"
+
+
 @pytest.mark.django_db
 def test_delete_merch_applications(auth_client, merch_applications):
     response = auth_client.delete(
@@ -203,9 +314,269 @@ def test_delete_merch_applications(auth_client, merch_applications):
 
 @pytest.mark.django_db
 def test_delete_merch_budget_info(auth_client, merch, merch_applications):
+    year = timezone.localdate().year
     year_total = merch[0].cost * 2 + merch[1].cost * 4 + merch[2].cost * 10
-    response = auth_client.get("/api/v1/send_merch/budget_info/?year=2024")
+    response = auth_client.get(f"/api/v1/send_merch/budget_info/?year={year}")
 
     assert response.status_code == 200
-    assert response.data["year"] == 2024
+    assert response.data["year"] == year
     assert response.data["year_total"] == year_total
+
+
+@pytest.mark.django_db
+def test_merch_budget_info_by_months_and_ambassadors(
+    auth_client, merch, merch_applications, ambassadors, django_assert_num_queries
+):
+    today = timezone.localdate()
+    url = (
+        f"/api/v1/send_merch/budget_info/?year={today.year}"
+        f"&ambassadors={ambassadors[0].pk},{ambassadors[1].pk}"
+    )
+    with django_assert_num_queries(1):
+        response = auth_client.get(url)
+
+    assert response.status_code == 200
+    assert response.data["year_total"] == merch[0].cost * 2 + merch[1].cost * 4
+    assert len(response.data["months"]) == 12
+    assert response.data["months"][today.month - 1]["month_total"] == (
+        merch[0].cost * 2 + merch[1].cost * 4
+    )
+    assert len(response.data["ambassadors"]) == 2
+    assert response.data["ambassadors"][0]["ambassador_name"] == ambassadors[0].name
+    assert response.data["ambassadors"][0]["ambassador_year_total"] == (
+        merch[0].cost * 2
+    )
+
+
+@pytest.mark.django_db
+def test_merch_budget_info_skips_ambassadors_without_merch(
+    auth_client, merch, merch_applications, ambassadors
+):
+    auth_client.delete(
+        reverse("api:merchapplication-detail", kwargs={"pk": merch_applications[2].pk})
+    )
+    response = auth_client.get(
+        f"/api/v1/send_merch/budget_info/?year={timezone.localdate().year}"
+    )
+
+    assert response.status_code == 200
+    assert [item["ambassador_name"] for item in response.data["ambassadors"]] == [
+        ambassadors[0].name,
+        ambassadors[1].name,
+    ]
+
+
+@pytest.mark.django_db
+def test_merch_budget_info_empty_year(auth_client, merch_applications):
+    response = auth_client.get("/api/v1/send_merch/budget_info/?year=2000")
+
+    assert response.status_code == 200
+    assert response.data == []
+
+
+@pytest.mark.django_db
+def test_merch_budget_info_follows_application_changes(auth_client, merch, ambassadors):
+    year = timezone.localdate().year
+    url = f"/api/v1/send_merch/budget_info/?year={year}"
+    payload = {
+        "ambassador": ambassadors[0].pk,
+        "merch": [{"id": merch[0].pk, "quantity": 2}],
+    }
+    application_id = auth_client.post(
+        reverse("api:merchapplication-list"), payload, format="json"
+    ).data["id"]
+
+    assert auth_client.get(url).data["year_total"] == merch[0].cost * 2
+
+    auth_client.patch(
+        reverse("api:merchapplication-detail", kwargs={"pk": application_id}),
+        {
+            "ambassador": ambassadors[1].pk,
+            "merch": [{"id": merch[1].pk, "quantity": 1}],
+        },
+        format="json",
+    )
+    response = auth_client.get(url)
+
+    assert response.data["year_total"] == merch[1].cost
+    assert len(response.data["ambassadors"]) == 1
+    assert response.data["ambassadors"][0]["ambassador_name"] == ambassadors[1].name
+
+    auth_client.delete(
+        reverse("api:merchapplication-detail", kwargs={"pk": application_id})
+    )
+
+    assert auth_client.get(url).data == []
+
+
+@pytest.mark.django_db
+def test_merch_applications_keep_merch_cost_after_price_change(
+    auth_client, ambassadors, merch
+):
+    payload = {
+        "ambassador": ambassadors[0].pk,
+        "merch": [{"id": merch[0].pk, "quantity": 3}],
+    }
+    response = auth_client.post(
+        reverse("api:merchapplication-list"), payload, format="json"
+    )
+
+    assert response.data["merch_cost"] == merch[0].cost * 3
+
+    old_cost = merch[0].cost
+    merch.filter(pk=merch[0].pk).update(cost=old_cost * 2)
+    response = auth_client.get(
+        reverse("api:merchapplication-detail", kwargs={"pk": response.data["id"]})
+    )
+
+    assert response.data["merch_cost"] == old_cost * 3
+    assert response.data["merch"][0]["cost"] == old_cost
+
+
+@pytest.mark.django_db
+def test_merch_applications_ordering_by_total_cost(
+    auth_client, merch_applications, django_assert_num_queries
+):
+    url = reverse("api:merchapplication-list") + "?ordering=-total_cost"
+    with django_assert_num_queries(2):
+        response = auth_client.get(url)
+
+    costs = [item["merch_cost"] for item in response.data["results"]]
+    assert costs == sorted(costs, reverse=True)
+
+
+@pytest.mark.django_db
+def test_export_merch_applications_to_google_sheet(
+    auth_client, merch_applications, monkeypatch
+):
+    sheets = FakeSheetsService()
+    monkeypatch.setattr(
+        "api.exports.get_google_services", lambda: (sheets, FakeDriveService())
+    )
+    response = auth_client.post(reverse("api:merchapplication-export-to-google-sheet"))
+    assert response.status_code == 202
+
+    call_command("run_export_worker", "--once")
+    response = auth_client.get(response["Location"])
+
+    rows = sheets.get_rows("spreadsheet-1", "Заявки на мерч")
+    assert response.data["status"] == "done"
+    assert response.data["link"].endswith("/spreadsheet-1/edit")
+    assert [row[0] for row in rows[1:]] == [item.pk for item in merch_applications]
+    assert sheets.calls["batchUpdate"] == 1
+
+
+def bulk_payload(ambassadors, merch, count):
+    ambassadors, merch = list(ambassadors), list(merch)
+    return {
+        "applications": [
+            {
+                "ambassador": ambassadors[number % len(ambassadors)].pk,
+                "merch": [
+                    {"id": merch[0].pk, "quantity": 2},
+                    {"id": merch[1].pk},
+                ],
+            }
+            for number in range(count)
+        ]
+    }
+
+
+@pytest.mark.django_db
+def test_bulk_create_merch_applications(auth_client, user, ambassadors, merch):
+    url = reverse("api:merchapplication-bulk-create")
+    response = auth_client.post(url, bulk_payload(ambassadors, merch, 5), format="json")
+
+    today = timezone.localdate()
+    expected_cost = 2 * merch[0].cost + merch[1].cost
+    assert response.status_code == 201
+    assert [item["application_number"] for item in response.data["applications"]] == [
+        f"{today}-{number:06d}" for number in range(1, 6)
+    ]
+    assert [item["ambassador"] for item in response.data["applications"]] == [
+        ambassadors[number % len(ambassadors)].pk for number in range(5)
+    ]
+    assert all(
+        item["merch_cost"] == expected_cost for item in response.data["applications"]
+    )
+    assert MerchApplication.objects.filter(tutor=user).count() == 5
+    assert MerchInApplication.objects.count() == 10
+    assert MerchSpendMonthly.objects.get(
+        ambassador=ambassadors[0], year=today.year, month=today.month
+    ).total == pytest.approx(2 * expected_cost)
+
+
+@pytest.mark.django_db
+def test_bulk_create_merch_applications_constant_queries(
+    auth_client, ambassadors, merch
+):
+    url = reverse("api:merchapplication-bulk-create")
+    # Monthly expenses rows of the ambassadors are created by the first request.
+    auth_client.post(url, bulk_payload(ambassadors, merch, 3), format="json")
+    queries = []
+    for count in (3, 40):
+        payload = bulk_payload(ambassadors, merch, count)
+        with CaptureQueriesContext(connection) as context:
+            response = auth_client.post(url, payload, format="json")
+        assert response.status_code == 201
+        queries.append(len(context))
+
+    assert queries[0] == queries[1]
+
+
+@pytest.mark.django_db
+def test_bulk_create_merch_applications_reports_item_errors(
+    auth_client, ambassadors, merch
+):
+    payload = bulk_payload(ambassadors, merch, 3)
+    payload["applications"][1]["ambassador"] = 0
+    payload["applications"][2]["merch"][1]["id"] = 0
+
+    response = auth_client.post(
+        reverse("api:merchapplication-bulk-create"), payload, format="json"
+    )
+
+    assert response.status_code == 400
+    assert [(error["attr"], error["code"]) for error in response.data["errors"]] == [
+        ("applications.1.ambassador", "does_not_exist"),
+        ("applications.2.merch", "does_not_exist"),
+    ]
+    assert not MerchApplication.objects.exists()
+
+
+@pytest.mark.django_db
+def test_bulk_create_merch_applications_sums_repeated_merch(
+    auth_client, ambassadors, merch
+):
+    url = reverse("api:merchapplication-bulk-create")
+    payload = {
+        "applications": [
+            {
+                "ambassador": ambassadors[0].pk,
+                "merch": [
+                    {"id": merch[0].pk, "quantity": 60},
+                    {"id": merch[1].pk},
+                    {"id": merch[0].pk, "quantity": 50},
+                ],
+            }
+        ]
+    }
+
+    response = auth_client.post(url, payload, format="json")
+
+    assert response.status_code == 400
+    assert [error["attr"] for error in response.data["errors"]] == [
+        "applications.0.merch.0.quantity",
+        "applications.0.merch.2.quantity",
+    ]
+    assert not MerchApplication.objects.exists()
+
+    payload["applications"][0]["merch"][2]["quantity"] = 40
+    response = auth_client.post(url, payload, format="json")
+
+    assert response.status_code == 201
+    application = MerchApplication.objects.get()
+    assert sorted(
+        application.merch_in_applications.values_list("merch", "quantity")
+    ) == sorted([(merch[0].pk, 100), (merch[1].pk, 1)])
+    assert application.total_cost == merch[0].cost * 100 + merch[1].cost
@@ -0,0 +1,94 @@
+import pytest
+from django.urls import reverse
+
+from promo.models import MerchApplication
+
+
+def walk(client, url, link="next"):
+    """Follows pagination links and returns ids of all received objects."""
+    ids = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        page = [item["id"] for item in response.data["results"]]
+        ids = ids + page if link == "next" else page + ids
+        url = response.data[link]
+    return ids
+
+
+@pytest.mark.django_db
+def test_pagination_walks_all_pages(auth_client, merch):
+    ids = walk(auth_client, reverse("api:merch-list") + "?limit=4")
+
+    assert ids == list(merch.order_by("pk").values_list("pk", flat=True))
+
+
+@pytest.mark.django_db
+def test_pagination_default_page_size(auth_client, merch):
+    response = auth_client.get(reverse("api:merch-list"))
+
+    assert len(response.data["results"]) == 6
+    assert response.data["next"] is None
+    assert response.data["previous"] is None
+
+
+@pytest.mark.django_db
+def test_pagination_with_ordering_ties(auth_client, merch):
+    merch.filter(pk__in=[item.pk for item in merch[:4]]).update(cost=100)
+    url = reverse("api:merch-list") + "?ordering=-cost&limit=2"
+
+    ids = walk(auth_client, url)
+
+    assert ids == list(merch.order_by("-cost", "pk").values_list("pk", flat=True))
+
+
+@pytest.mark.django_db
+def test_pagination_previous_link(auth_client, merch):
+    url = reverse("api:merch-list") + "?ordering=-cost&limit=2"
+    first_page = auth_client.get(url).data
+    second_page = auth_client.get(first_page["next"]).data
+    last_page = auth_client.get(second_page["next"]).data
+
+    assert walk(auth_client, last_page["previous"], link="previous") == [
+        item["id"] for item in first_page["results"] + second_page["results"]
+    ]
+
+
+@pytest.mark.django_db
+def test_pagination_with_null_values(auth_client, user, merch_applications):
+    MerchApplication.objects.create(
+        ambassador=merch_applications[0].ambassador,
+        tutor=user,
+        application_number="2024-01-01-000001",
+    )
+    url = reverse("api:merchapplication-list")
+
+    for ordering in ("merch__name", "-merch__name"):
+        ids = walk(auth_client, f"{url}?ordering={ordering}&limit=1")
+        assert sorted(ids) == sorted(
+            MerchApplication.objects.values_list("pk", flat=True)
+        )
+
+
+@pytest.mark.django_db
+def test_pagination_page_costs_the_same_queries(
+    auth_client, merch_applications, django_assert_num_queries
+):
+    url = reverse("api:merchapplication-list") + "?limit=1"
+    with django_assert_num_queries(2):
+        next_url = auth_client.get(url).data["next"]
+    next_url = auth_client.get(next_url).data["next"]
+    with django_assert_num_queries(2):
+        response = auth_client.get(next_url)
+
+    assert response.data["results"][0]["id"] == merch_applications.last().pk
+    assert response.data["next"] is None
+
+
+@pytest.mark.django_db
+def test_pagination_invalid_cursor(auth_client, merch):
+    url = reverse("api:merch-list")
+    next_url = auth_client.get(url + "?limit=2").data["next"]
+
+    assert auth_client.get(url + "?cursor=invalid").status_code == 404
+    assert auth_client.get(next_url + "&ordering=cost").status_code == 404
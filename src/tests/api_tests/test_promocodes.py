@@ -1,7 +1,9 @@
 import pytest
+from django.core.management import call_command
 from django.urls import reverse
 
 from tests.fixtures import TEST_NAME, TEST_PAST_DATETIME
+from tests.google_fakes import FakeDriveService, FakeSheetsService
 
 from api.mixins import MESSAGE_ON_DELETE
 
@@ -11,18 +13,21 @@ def test_get_promocode_list(auth_client, promocodes):
     response = auth_client.get(reverse("api:promocode-list"))
 
     assert response.status_code == 200
-    assert len(response.data) == 4
-    assert response.data[0]["code"] == promocodes[0].code
-    assert response.data[0]["created"] != ""
-    assert response.data[0]["is_active"] == promocodes[0].is_active
-    assert response.data[0]["ambassador"]["name"] == promocodes[0].ambassador.name
+    assert len(response.data["results"]) == 4
+    assert response.data["results"][0]["code"] == promocodes[0].code
+    assert response.data["results"][0]["created"] != ""
+    assert response.data["results"][0]["is_active"] == promocodes[0].is_active
     assert (
-        response.data[0]["ambassador"]["status"]["name"]
+        response.data["results"][0]["ambassador"]["name"]
+        == promocodes[0].ambassador.name
+    )
+    assert (
+        response.data["results"][0]["ambassador"]["status"]["name"]
         == promocodes[0].ambassador.status.name
     )
-    assert response.data[0]["ambassador"]["created"] != ""
+    assert response.data["results"][0]["ambassador"]["created"] != ""
     assert (
-        response.data[0]["ambassador"]["telegram"]
+        response.data["results"][0]["ambassador"]["telegram"]
         == promocodes[0].ambassador.telegram_id
     )
 
@@ -167,13 +172,21 @@ def test_delete_promocode(auth_client, promocodes):
     assert response.data["message"] == MESSAGE_ON_DELETE
 
 
-@pytest.mark.skip(
-    "Does not work during CI/CD workflow as GitHub Actions can't find credentials.json "
-    "(it is in gitignore)"
-)
 @pytest.mark.django_db
-def test_get_promocode_google_sheet_link(auth_client, promocodes):
-    response = auth_client.get("/api/v1/promocodes/export_to_google_sheet/")
+def test_get_promocode_google_sheet_link(auth_client, promocodes, monkeypatch):
+    sheets = FakeSheetsService()
+    monkeypatch.setattr(
+        "api.exports.get_google_services", lambda: (sheets, FakeDriveService())
+    )
+    response = auth_client.post("/api/v1/promocodes/export_to_google_sheet/")
 
-    assert response.status_code == 200
+    assert response.status_code == 202
+    assert response.data["status"] == "pending"
+
+    call_command("run_export_worker", "--once")
+    response = auth_client.get(response["Location"])
+
+    assert response.data["status"] == "done"
+    assert response.data["processed"] == len(promocodes)
     assert "https://docs.google.com/spreadsheets/d/" in response.data["link"]
+    assert len(sheets.get_rows("spreadsheet-1", "Промокоды")) == len(promocodes) + 1
@@ -2,11 +2,13 @@ import pytest
 from rest_framework.test import APIClient
 
 from ambassadors.models import Activity, Address, Ambassador, Program, Purpose, Status
+from api.dictionaries import dictionaries
 from promo.models import (
     Merch,
     MerchApplication,
     MerchCategory,
     MerchInApplication,
+    MerchSpendMonthly,
     Promocode,
 )
 from users.models import User
@@ -108,6 +110,12 @@ MERCH_APP_NUMBER_2 = "222"
 MERCH_APP_NUMBER_3 = "333"
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # The cached dictionaries must not outlive the rolled back test data.
+    dictionaries.forget()
+
+
 @pytest.fixture
 def admin(django_user_model):
     return django_user_model.objects.create_user(
@@ -317,4 +325,6 @@ def merch_applications(user, merch, ambassadors):
         ambassador=ambassadors[2], tutor=user, application_number=MERCH_APP_NUMBER_3
     )
     MerchInApplication.objects.create(application=app_3, merch=merch[2], quantity=10)
+    MerchApplication.objects.update_total_cost()
+    MerchSpendMonthly.objects.rebuild()
     return MerchApplication.objects.all()
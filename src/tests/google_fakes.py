@@ -0,0 +1,95 @@
+import re
+from collections import Counter, defaultdict
+
+from googleapiclient.errors import HttpError
+from httplib2 import Response
+
+RANGE_PATTERN = re.compile(r"^(?P<worksheet>.+)!A(?P<row>\d+)$")
+
+
+class FakeRequest:
+    """Request object which runs a callback on execute()."""
+
+    def __init__(self, service, method, callback):
+        self.service = service
+        self.method = method
+        self.callback = callback
+
+    def execute(self):
+        self.service.calls[self.method] += 1
+        if self.service.failures[self.method]:
+            self.service.failures[self.method] -= 1
+            raise HttpError(Response({"status": 503}), b"Service Unavailable")
+        return self.callback()
+
+
+class FakeSheetsService:
+    """
+    In-memory replacement of the Google Sheets service.
+    Keeps written cells of every worksheet and counts API calls. Pass
+    failures={"batchUpdate": 2} to make the first calls of a method fail
+    with a retryable error.
+    """
+
+    def __init__(self, failures=None):
+        self.calls = Counter()
+        self.failures = Counter(failures or {})
+        self.spreadsheets_data = {}
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def create(self, body):
+        def callback():
+            spreadsheet_id = f"spreadsheet-{len(self.spreadsheets_data) + 1}"
+            self.spreadsheets_data[spreadsheet_id] = defaultdict(dict)
+            return {
+                "spreadsheetId": spreadsheet_id,
+                "spreadsheetUrl": (
+                    f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/edit"
+                ),
+                "properties": body["properties"],
+            }
+
+        return FakeRequest(self, "create", callback)
+
+    def batchUpdate(self, spreadsheetId, body):  # noqa: N802, N803
+        def callback():
+            for value_range in body["data"]:
+                match = RANGE_PATTERN.match(value_range["range"])
+                worksheet = self.spreadsheets_data[spreadsheetId][
+                    match.group("worksheet")
+                ]
+                first_row = int(match.group("row"))
+                for offset, values in enumerate(value_range["values"]):
+                    worksheet[first_row + offset] = values
+            return {"spreadsheetId": spreadsheetId}
+
+        return FakeRequest(self, "batchUpdate", callback)
+
+    def get_rows(self, spreadsheet_id, worksheet_name):
+        """Returns the worksheet rows in order of their numbers."""
+        worksheet = self.spreadsheets_data[spreadsheet_id][worksheet_name]
+        return [worksheet[row] for row in sorted(worksheet)]
+
+
+class FakeDriveService:
+    """In-memory replacement of the Google Drive service."""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.failures = Counter()
+        self.permissions_data = []
+
+    def permissions(self):
+        return self
+
+    def create(self, fileId, body):  # noqa: N803
+        def callback():
+            self.permissions_data.append((fileId, body))
+            return {"id": str(len(self.permissions_data))}
+
+        return FakeRequest(self, "create", callback)
@@ -0,0 +1,63 @@
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.db import OperationalError, connection
+
+from api.utils import generate_application_number, generate_application_numbers
+from promo.models import ApplicationNumberCounter
+
+THREADS = 8
+NUMBERS_PER_THREAD = 25
+
+
+@pytest.mark.django_db
+def test_application_numbers_are_sequential_per_day(django_assert_num_queries):
+    day = datetime.date(2024, 3, 1)
+
+    with django_assert_num_queries(1):
+        assert ApplicationNumberCounter.objects.reserve(day) == range(1, 2)
+    assert ApplicationNumberCounter.objects.reserve(day, 3) == range(2, 5)
+    assert ApplicationNumberCounter.objects.reserve(
+        day + datetime.timedelta(days=1)
+    ) == range(1, 2)
+
+
+@pytest.mark.django_db
+def test_generate_application_numbers_format(django_assert_num_queries):
+    with django_assert_num_queries(1):
+        numbers = generate_application_numbers(2)
+
+    day, _, number = generate_application_number().rpartition("-")
+    assert numbers == [f"{day}-000001", f"{day}-000002"]
+    assert number == "000003"
+
+
+def generate_with_retries():
+    # The in-memory SQLite test database locks the whole table for concurrent
+    # writers, a locked upsert changes nothing and can be repeated.
+    while True:
+        try:
+            return generate_application_number()
+        except OperationalError as error:
+            if "locked" not in str(error):
+                raise
+
+
+@pytest.mark.django_db(transaction=True)
+def test_application_numbers_are_unique_under_concurrency():
+    def generate(_):
+        try:
+            return [generate_with_retries() for _ in range(NUMBERS_PER_THREAD)]
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        numbers = [
+            number
+            for thread_numbers in executor.map(generate, range(THREADS))
+            for number in thread_numbers
+        ]
+
+    assert len(set(numbers)) == len(numbers) == THREADS * NUMBERS_PER_THREAD
+    assert ApplicationNumberCounter.objects.get().last_number == len(numbers)
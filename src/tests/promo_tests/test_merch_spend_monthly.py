@@ -0,0 +1,62 @@
+import pytest
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+from promo.models import MerchApplication, MerchInApplication, MerchSpendMonthly
+
+
+@pytest.mark.django_db
+def test_rebuild_merch_spend(merch, merch_applications, ambassadors):
+    MerchSpendMonthly.objects.all().delete()
+    call_command("rebuild_merch_spend", chunk_size=2)
+    today = timezone.localdate()
+
+    assert MerchSpendMonthly.objects.count() == 3
+    spend = MerchSpendMonthly.objects.get(ambassador=ambassadors[2])
+    assert (spend.year, spend.month) == (today.year, today.month)
+    assert spend.total == merch[2].cost * 10
+
+
+@pytest.mark.django_db
+def test_check_merch_spend(merch, merch_applications, ambassadors):
+    call_command("check_merch_spend")
+    MerchSpendMonthly.objects.filter(ambassador=ambassadors[0]).update(total=1)
+
+    with pytest.raises(CommandError):
+        call_command("check_merch_spend")
+
+    call_command("check_merch_spend", fix=True)
+    call_command("check_merch_spend")
+    assert MerchSpendMonthly.objects.get(ambassador=ambassadors[0]).total == (
+        merch[0].cost * 2
+    )
+
+
+@pytest.mark.django_db
+def test_rebuild_merch_spend_with_total_cost(merch, merch_applications, ambassadors):
+    MerchInApplication.objects.filter(application=merch_applications[0]).update(
+        quantity=5
+    )
+    call_command("rebuild_merch_spend", total_cost=True)
+
+    assert MerchApplication.objects.get(pk=merch_applications[0].pk).total_cost == (
+        merch[0].cost * 5
+    )
+    assert MerchSpendMonthly.objects.get(ambassador=ambassadors[0]).total == (
+        merch[0].cost * 5
+    )
+
+
+@pytest.mark.django_db
+def test_track_merch_spend(merch, merch_applications, ambassadors):
+    application = merch_applications[0]
+    with MerchSpendMonthly.objects.track([application.pk]):
+        MerchApplication.objects.filter(pk=application.pk).update(
+            ambassador=ambassadors[1]
+        )
+
+    assert not MerchSpendMonthly.objects.filter(ambassador=ambassadors[0]).exists()
+    assert MerchSpendMonthly.objects.get(ambassador=ambassadors[1]).total == (
+        merch[0].cost * 2 + merch[1].cost * 4
+    )
+    assert MerchSpendMonthly.objects.find_inconsistencies() == []